@@ -2,5 +2,5 @@ from flask import Blueprint
 
 api = Blueprint('api', __name__)
 
-from . import user, device
+from . import user, device, energy
 
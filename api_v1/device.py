@@ -1,18 +1,88 @@
 # api_v1/device.py
-import requests
 import json
 from flask import jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Fcuser, db, Energy, Card, Scheduled
 from . import api
-from ocpp16.data_manager import JsonConfigManager
+from ocpp16.data_manager import open_config_manager, ID_TAGS_KEY, PM_DEVICES_KEY, SCHEDULES_KEY
+from ocpp16.csms_client import CsmsClient, CircuitOpenError
+from ocpp16.jobs import FINISHED_STATUSES
 from datetime import datetime, timezone, timedelta
 
-SERVER_URL = "https://127.0.0.1:443/send"   # FastAPI 서버 주소
+SERVER_URL = "https://127.0.0.1:443"   # FastAPI 서버 주소
+CALLBACK_BASE_URL = "http://127.0.0.1:5001/"  # FastAPI 서버가 완료 통지를 보낼 이 앱의 주소 (ocpp_message.CALLBACK_ALLOWLIST 에 있어야 함)
+JOB_POLL_INTERVAL = 2 # 끝나지 않은 작업을 브라우저가 다시 조회할 간격 (초). Flask 스레드는 기다리지 않습니다.
 CERT_FILE = 'certificate/cert.pem' 
 JSON_FILE = 'ocpp16/shared_data.json'
+FLUSH_INTERVAL = 0.5 # 연속된 변경 사항을 모아서 기록하는 주기 (초)
 
-manager = JsonConfigManager(JSON_FILE)
+manager = open_config_manager(JSON_FILE, cached=True, flush_interval=FLUSH_INTERVAL)
+csms = CsmsClient(SERVER_URL, verify=False) # verify=CERT_FILE
+
+def _record_id(uid):
+    """URL의 uid를 레코드 고정 ID(int)로 변환합니다. 숫자가 아니면 None."""
+    try:
+        return int(uid)
+    except (TypeError, ValueError):
+        return None
+
+def _device_list():
+    return [{'id': rid, 'serialnumber': serialnumber, 'maxcurrent': maxcurrent}
+            for rid, serialnumber, maxcurrent in manager.list_records(PM_DEVICES_KEY)]
+
+def _card_list():
+    return [{'id': rid, 'cardname': info.get('cardname', ''), 'cardnumber': id_tag, 'status': info.get('status', ''), 'expirydate': info.get('expiryDate', '')}
+            for rid, id_tag, info in manager.list_records(ID_TAGS_KEY)]
+
+def _send_to_server(message_id, charger_id, data, callback_url=None):
+    """FastAPI 서버에 명령을 전달합니다. (응답, 오류 응답) 중 하나만 값이 있습니다."""
+    try:
+        res = csms.send(message_id, charger_id, data, callback_url=callback_url)
+    except CircuitOpenError as e:
+        print(f"error: {e}")
+        return None, (jsonify({"error": "FastAPI server is unavailable.", "details": str(e)}), 503)
+    except Exception as e:
+        print(f"error: Failed to send command: {e}")
+        return None, (jsonify({"error": "Failed to communicate with FastAPI server.", "details": str(e)}), 502)
+
+    print(f"Response from server: {res.text}")
+    if res.status_code != 202:
+        print(f"error: Failed to send command, status: {res.status_code}")
+        return None, (jsonify({"error": "Failed to communicate with FastAPI server.", "details": res.text}), 502)
+    return res, None
+
+def _notify_schedules():
+    """시간대가 바뀌었음을 서버에 알려 예약 충전 전환 시각을 다시 계산하게 합니다 (실패해도 무시)."""
+    data = manager.load_data()
+    _send_to_server("scheduledCharging", "schedules", {
+        "enabled": bool(data.get('scheduled_charging', False)),
+        "schedules": data.get('schedules', {})
+    })
+
+def _save_registered_card(job):
+    """uvCardRegister 작업이 성공했으면 카드를 저장합니다. 같은 작업이 여러 번 들어와도 한 번만 저장합니다."""
+    if job.get('messageId') != 'uvCardRegister' or job.get('status') != 'succeeded':
+        return False
+    cardnumber = (job.get('result') or {}).get('cardnumber')
+    if cardnumber is None:
+        print("error: Card number is not retrieved.")
+        return False
+    cardname = (job.get('data') or {}).get('cardname', '')
+    info = manager.get_id_tag_info(cardnumber)
+    if info and info.get('cardname') == cardname:
+        return True
+    manager.update_id_tag(
+        id_tag=cardnumber, 
+        status="Accepted", 
+        cardname=cardname, 
+        expiry_days=365 # 1년 후 만료
+    )
+    return True
+
+def _schedule_list():
+    schedule_enabled = manager.snapshot().get('scheduled_charging', False)
+    return [{'id': rid, 'schedule_enabled': schedule_enabled, 'priority': desc, 'timezone': info.get('timezone', ''), 'starttime': info.get('starttime', ''), 'endtime': info.get('endtime', '')}
+            for rid, desc, info in manager.list_records(SCHEDULES_KEY)]
 
 @api.route('/devices', methods=['GET', 'POST'])
 def devices():
@@ -25,7 +95,7 @@ def devices():
             return jsonify({"error": "All fields are required."}), 201
         
         # Check if a device already exists
-        devices = manager.load_data()
+        devices = manager.snapshot()
         print(devices.get('pm_devices'))
         if devices.get('pm_devices'):
             return jsonify({"error": "One device is allowed and already exists."}), 201
@@ -38,74 +108,44 @@ def devices():
         )
         return jsonify({"message": "PM device added successfully."}), 201
     
-    devices = manager.load_data()
-    count = 0
-    response = []
-    for serialnumber, maxcurrent in devices.get('pm_devices', {}).items():
-        device = {'id': count, 'serialnumber': serialnumber, 'maxcurrent': maxcurrent}
-        response.append(device)
-        count += 1
-    return jsonify(response)
+    return jsonify(_device_list())
            
 @api.route('/devices/<uid>', methods=['GET', 'PUT', 'DELETE'])
 def device_detail(uid):
+    record_id = _record_id(uid)
     if request.method == 'GET':
-        device = manager.get_nth_pm_device(int(uid))
-        if device:
-            response = []
-            data = manager.load_data()
-            devices = data.get('pm_devices', {})
-            device = {'id': uid, 'serialnumber': device, 'maxcurrent': devices[device]}
-            response.append(device)
-            return jsonify(response)
+        record = manager.get_record(PM_DEVICES_KEY, record_id)
+        if record:
+            serialnumber, maxcurrent = record
+            return jsonify([{'id': record_id, 'serialnumber': serialnumber, 'maxcurrent': maxcurrent}])
         else:
             return jsonify({"error": "Device not found."}), 404
     elif request.method == 'DELETE':
-        device = manager.get_nth_pm_device(int(uid))
-        if device:
-            manager.delete_pm_device(device)
+        if manager.delete_record(PM_DEVICES_KEY, record_id):
             return jsonify({"message": "Device deleted successfully."}), 200
         else:
             return jsonify({"error": "Device not found."}), 404
 
-    devices = manager.load_data()
-    count = 0
-    response = []
-    for serialnumber, maxcurrent in devices.get('pm_devices', {}).items():
-        device = {'id': count, 'serialnumber': serialnumber, 'maxcurrent': maxcurrent}
-        response.append(device)
-        count += 1
-    return jsonify(response)
+    return jsonify(_device_list())
            
 @api.route('/cards/<uid>', methods=['GET', 'PUT', 'DELETE'])
 def card_detail(uid):
+    record_id = _record_id(uid)
     if request.method == 'GET':
-        device = manager.get_nth_pm_device(int(uid))
-        if device:
-            response = []
-            data = manager.load_data()
-            devices = data.get('pm_devices', {})
-            device = {'id': uid, 'serialnumber': device, 'maxcurrent': devices[device]}
-            response.append(device)
-            return jsonify(response)
+        record = manager.get_record(ID_TAGS_KEY, record_id)
+        if record:
+            id_tag, info = record
+            card = {'id': record_id, 'cardname': info.get('cardname', ''), 'cardnumber': id_tag, 'status': info.get('status', ''), 'expirydate': info.get('expiryDate', '')}
+            return jsonify([card])
         else:
             return jsonify({"error": "Card not found."}), 404
     elif request.method == 'DELETE':
-        card = manager.get_nth_id_tag(int(uid))
-        if card:
-            manager.delete_id_tag(card)
+        if manager.delete_record(ID_TAGS_KEY, record_id):
             return jsonify({"message": "Card deleted successfully."}), 200
         else:
             return jsonify({"error": "Card not found."}), 404
     
-    cards = manager.load_data()
-    count = 0
-    response = []
-    for id_tag, info in cards.get('registered_id_tags', {}).items():
-        card = {'id': count, 'cardname': info.get('cardname', ''), 'cardnumber': id_tag, 'status': info.get('status', ''), 'expirydate': info.get('expiryDate', '')}
-        response.append(card)
-        count += 1
-    return jsonify(response)
+    return jsonify(_card_list())
 
 @api.route('/cards', methods=['GET', 'POST'])
 def cards():
@@ -127,14 +167,7 @@ def cards():
         )
         return jsonify({"message": "Card added successfully."}), 201
 
-    cards = manager.load_data()
-    count = 0
-    response = []
-    for id_tag, info in cards.get('registered_id_tags', {}).items():
-        card = {'id': count, 'cardname': info.get('cardname', ''), 'cardnumber': id_tag, 'status': info.get('status', ''), 'expirydate': info.get('expiryDate', '')}
-        response.append(card)
-        count += 1
-    return jsonify(response)
+    return jsonify(_card_list())
 
 @api.route('/registeronline', methods=['GET', 'POST'])
 def cards_online():
@@ -146,41 +179,40 @@ def cards_online():
         if not charger_id or not cardname:
             return jsonify({"error": "Charger ID and Card name are both required."}), 400
         
-        # 서버에 메시지 전달
-        payload = {"messageId": "uvCardRegister", "chargerId": charger_id, "data": {"cardname": cardname}}
-
-        res = requests.post(SERVER_URL, 
-            json=payload,
-            # verify=CERT_FILE
-            verify=False
+        # 서버에 메시지 전달: 카드 태깅을 기다리지 않고 작업 ID만 받아 옵니다.
+        res, error = _send_to_server(
+            "uvCardRegister", charger_id, {"cardname": cardname},
+            callback_url=CALLBACK_BASE_URL + 'api/v1/registeronline/callback'
         )
+        if error:
+            return error
 
-        print(f"Response from server: {res.json()}")
+        return jsonify({"message": "Touch the card on the charger.", "jobId": res.json().get('jobId')}), 202
+    return jsonify(_card_list())
 
-        if res.status_code != 200:
-            print(f"error: Failed to send command, status: {res.status_code}")
-            return jsonify({"error": "Failed to communicate with FastAPI server.", "details": res.text}), 502
+@api.route('/registeronline/jobs/<job_id>', methods=['GET'])
+def cards_online_job(job_id):
+    """
+    브라우저 폴링용: 작업 상태를 즉시 조회하고, 성공했으면 카드를 저장합니다.
+    끝나지 않았으면 retryAfter 초 뒤에 다시 조회하도록 알려 줍니다 (등록 대기 중에 Flask 스레드를 잡아 두지 않음).
+    """
+    job = csms.get_job(job_id, wait=0)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    _save_registered_card(job)
+    if job.get('status') in FINISHED_STATUSES:
+        return jsonify(job)
+    return jsonify({**job, "retryAfter": JOB_POLL_INTERVAL}), 200, {"Retry-After": str(JOB_POLL_INTERVAL)}
 
-        cardnumber = res.json().get('cardnumber')
-        if cardnumber is None:
-            print("error: Card number is not retrieved.")
-            return
-        
-        manager.update_id_tag(
-            id_tag=cardnumber, 
-            status="Accepted", 
-            cardname=cardname, 
-            expiry_days=365 # 1년 후 만료
-        )
-        return jsonify({"message": "Card added successfully."}), 201
-    cards = manager.load_data()
-    count = 0
-    response = []
-    for id_tag, info in cards.get('registered_id_tags', {}).items():
-        card = {'id': count, 'cardname': info.get('cardname', ''), 'cardnumber': id_tag, 'status': info.get('status', ''), 'expirydate': info.get('expiryDate', '')}
-        response.append(card)
-        count += 1
-    return jsonify(response)
+@api.route('/registeronline/callback', methods=['POST'])
+def cards_online_callback():
+    """FastAPI 서버의 완료 통지. 본문은 신뢰하지 않고 작업 ID로 서버에 다시 조회합니다."""
+    job_id = (request.get_json(silent=True) or {}).get('jobId')
+    job = csms.get_job(job_id) if job_id else None
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    _save_registered_card(job)
+    return jsonify({"status": job.get('status')}), 200
 
 @api.route('/scheduled', methods=['GET', 'POST'])
 def scheduled():
@@ -200,25 +232,17 @@ def scheduled():
             starttime=starttime, 
             endtime=endtime 
         )
+        _notify_schedules()
         return jsonify({"message": "Schedule added successfully."}), 201
-    data = manager.load_data()
-    schedule_enabled = data.get('scheduled_charging', False)    
-    count = 0
-    response = []
-    for desc, info in data.get('schedules', {}).items():
-        schedule = {'id': count, 'schedule_enabled': schedule_enabled, 'priority': desc, 'timezone': info.get('timezone', ''), 'starttime': info.get('starttime', ''), 'endtime': info.get('endtime', '')}
-        response.append(schedule)
-        count += 1
-    return jsonify(response)
+    return jsonify(_schedule_list())
            
 @api.route('/scheduled/<uid>', methods=['GET', 'PUT', 'DELETE'])
 def schedule_detail(uid):
     if request.method == 'GET':
         pass
     elif request.method == 'DELETE':
-        schedule = manager.get_nth_schedule(int(uid))
-        if schedule:
-            manager.delete_schedule(schedule)
+        if manager.delete_record(SCHEDULES_KEY, _record_id(uid)):
+            _notify_schedules()
             return jsonify({"message": "Schedule deleted successfully."}), 200
         else:
             return jsonify({"error": "Schedule not found."}), 404
@@ -243,34 +267,22 @@ def schedule_detail(uid):
         starttime = schedules[priority].get('starttime', '')
         endtime = schedules[priority].get('endtime', '')
 
-        payload = {
-            "messageId": "scheduledCharging", 
-            "chargerId": uid,
-            "data": {
-                "timezone": timezone,
-                "starttime": starttime,
-                "endtime": endtime
-            }
-        }
-        res = requests.post(SERVER_URL, 
-            json=payload,
-            # verify=CERT_FILE
-            verify=False
-        )
-        print(f"Response from server: {res.json()}")
-        if res.status_code != 200:
-            print(f"error: Failed to send command, status: {res.status_code}")
-            return jsonify({"error": "Failed to communicate with FastAPI server.", "details": res.text}), 502
+        res, error = _send_to_server("scheduledCharging", uid, {
+            "timezone": timezone,
+            "starttime": starttime,
+            "endtime": endtime,
+            "enabled": data['scheduled_charging'],
+            "schedules": schedules
+        })
+        if error:
+            return error
 
         manager.save_data(data)
         return jsonify({"message": "Scheduled Charging enable/disable status toggled successfully."}), 200
     
-    data = manager.load_data()
-    schedule_enabled = data.get('scheduled_charging', False)    
-    count = 0
-    response = []
-    for desc, info in data.get('schedules', {}).items():
-        schedule = {'id': count, 'schedule_enabled': schedule_enabled, 'priority': desc, 'timezone': info.get('timezone', ''), 'starttime': info.get('starttime', ''), 'endtime': info.get('endtime', '')}
-        response.append(schedule)
-        count += 1
-    return jsonify(response)
\ No newline at end of file
+    return jsonify(_schedule_list())
+
+@api.route('/csms/metrics', methods=['GET'])
+def csms_metrics():
+    """FastAPI 서버 호출의 명령별 지연 시간과 회로 차단기 상태."""
+    return jsonify(csms.metrics())
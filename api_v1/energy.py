@@ -0,0 +1,65 @@
+# api_v1/energy.py
+from datetime import datetime, timezone
+from flask import jsonify, request
+from . import api
+from ocpp16.timeseries import TimeSeriesStore, TS_DIR, RESOLUTIONS
+from ocpp16.energy_analytics import analyze_meter, analyze_site, choose_resolution
+
+DEFAULT_RANGE = 3600 # from이 없을 때 조회 구간 (초)
+DEFAULT_ANALYTICS_RANGE = 7 * 86400 # 분석 API에서 from이 없을 때 조회 구간 (초)
+
+history_store = TimeSeriesStore(TS_DIR) # pm_server가 기록한 세그먼트를 읽기만 합니다.
+
+def _parse_time(value, default):
+    """UNIX 초 또는 ISO 8601 문자열을 UNIX 초로 변환합니다."""
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+@api.route('/energy/history', methods=['GET'])
+def energy_history():
+    serial = request.args.get('serial')
+    if not serial:
+        return jsonify({"error": "serial is required.", "serials": history_store.serials()}), 400
+
+    try:
+        end = _parse_time(request.args.get('to'), datetime.now(timezone.utc).timestamp())
+        start = _parse_time(request.args.get('from'), end - DEFAULT_RANGE)
+        step = request.args.get('step', type=float)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid time: {e}"}), 400
+    if start >= end:
+        return jsonify({"error": "'from' must be earlier than 'to'."}), 400
+
+    return jsonify(history_store.query(serial, start, end, step))
+
+@api.route('/energy/analytics', methods=['GET'])
+def energy_analytics():
+    """serial=A 는 계측기 분석, serial=A,B,C 는 사이트(합산 수요, 계측기 간 불평형) 분석."""
+    serials = [s for s in request.args.get('serial', '').split(',') if s]
+    if not serials:
+        return jsonify({"error": "serial is required.", "serials": history_store.serials()}), 400
+
+    now = datetime.now(timezone.utc).timestamp()
+    try:
+        end = _parse_time(request.args.get('to'), now)
+        start = _parse_time(request.args.get('from'), end - DEFAULT_ANALYTICS_RANGE)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid time: {e}"}), 400
+    if start >= end:
+        return jsonify({"error": "'from' must be earlier than 'to'."}), 400
+
+    resolution = request.args.get('resolution', type=int) or choose_resolution(start, now, history_store.retention)
+    if resolution not in RESOLUTIONS:
+        return jsonify({"error": f"resolution must be one of {list(RESOLUTIONS)}."}), 400
+
+    if len(serials) == 1:
+        return jsonify(analyze_meter(TS_DIR, serials[0], start, end, resolution))
+    return jsonify(analyze_site(TS_DIR, serials, start, end, resolution))
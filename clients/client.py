@@ -3,9 +3,8 @@ import asyncio
 import websockets
 import time
 import sys
-import json
 import ssl
-from ocpp_utils import CALL, CALL_RESULT, create_call, create_call_result, parse_ocpp_message
+from ocpp_utils import CALL, CALL_RESULT, codec, create_call, create_call_result, parse_ocpp_message
 
 CHARGER_ID = sys.argv[1] if len(sys.argv) > 1 else "CHG-TEST-002"
 WEBSOCKET_URL = f"wss://localhost:443/openocpp/{CHARGER_ID}"
@@ -43,8 +42,8 @@ async def heartbeat_loop(websocket):
     global HEARTBEAT_INTERVAL
     while True:
         await asyncio.sleep(HEARTBEAT_INTERVAL)
-        payload = {"currentTime": time.strftime("%Y-%m-%dT%H:%M:%S") + "Z"}
-        message, _ = create_call("Heartbeat", payload)
+        # OCPP 1.6 Heartbeat.req는 빈 payload입니다 (추가 필드는 FormationViolation).
+        message, _ = create_call("Heartbeat", {})
         await websocket.send(message)
         print(f"-> Message sent: {message}")
 
@@ -138,7 +137,7 @@ async def ocpp_client():
                     if action == "DataTransfer":
                         messageId = payload.get('messageId')
                         message_data = payload.get('data')
-                        charger_id = json.loads(message_data).get('targetcp') if message_data else None
+                        charger_id = codec.loads(message_data).get('targetcp') if message_data else None
                         print(f"DataTransfer payload with messageId: {messageId}, charger_id: {charger_id}")
 
                         if messageId == "uvCardRegister":
@@ -1,7 +1,12 @@
 # ocpp_utils.py
-import json
+import os
+import sys
 import uuid
 
+# 서버와 같은 OCPP 프레임 코덱(ocpp16/codec.py)을 사용하기 위해 저장소 최상위를 경로에 추가합니다.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ocpp16 import codec
+
 # OCPP 1.6 Message Type IDs
 CALL = 2
 CALL_RESULT = 3
@@ -16,7 +21,7 @@ def create_call(action, payload):
         action,
         payload
     ]
-    return json.dumps(message), message_id
+    return codec.dumps(message), message_id
 
 def create_call_result(message_id, payload):
     """OCPP CALL RESULT (응답) 메시지를 생성합니다."""
@@ -25,12 +30,12 @@ def create_call_result(message_id, payload):
         message_id,
         payload
     ]
-    return json.dumps(message)
+    return codec.dumps(message)
 
 def parse_ocpp_message(raw_message):
     """수신된 JSON 메시지를 파싱합니다."""
     try:
-        data = json.loads(raw_message)
+        data = codec.loads(raw_message)
         message_type_id = data[0]
         message_id = data[1]
         
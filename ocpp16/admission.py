@@ -0,0 +1,113 @@
+# admission.py
+"""
+재연결 폭주(reconnect storm) 시 BootNotification 수락 조절.
+
+CSMS 재시작이나 네트워크 단절 후에는 모든 충전기가 동시에 접속해 BootNotification 을 보내고,
+Accepted 직후 StatusNotification/MeterValues 를 한꺼번에 보냅니다.
+수락한 충전기는 settle_time 초 동안 슬롯 하나를 차지하며, 슬롯이 max_inflight 개 모두 차 있으면
+Pending 과 함께 다시 시도할 interval 을 돌려줍니다.
+
+interval 은 min_interval 에 0 ~ 2 x (대기 중인 충전기 수 / 수락 속도) 사이의 무작위 값을 더해,
+다음 시도가 한 시점에 몰리지 않고 수락 속도에 맞춰 퍼지게 합니다. 수락 속도는 max_inflight / settle_time 입니다.
+퍼지는 폭 자체를 max_interval - min_interval 로 줄인 뒤 뽑으므로, 큰 값이 max_interval 한 시점에 몰리지 않습니다.
+
+    $ python -m ocpp16.admission     # 10,000 대 동시 재접속 시뮬레이션
+"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional, Set
+
+
+class BootAdmission:
+    def __init__(self, max_inflight: int = 50, settle_time: float = 2.0,
+                 min_interval: float = 5.0, max_interval: float = 300.0):
+        self.max_inflight = max_inflight
+        self.settle_time = settle_time
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.accepted = 0
+        self.deferred = 0
+        self._inflight: Set[str] = set()
+        self._waiting: Set[str] = set()
+
+    @property
+    def rate(self) -> float:
+        """초당 수락할 수 있는 BootNotification 수."""
+        return self.max_inflight / self.settle_time
+
+    def admit(self, charger_id: str) -> Optional[float]:
+        """
+        수락하면 None, 아니면 다시 시도할 때까지의 interval (초) 를 반환합니다.
+        이벤트 루프 안에서 호출해야 합니다 (슬롯은 settle_time 후 자동으로 반환).
+        """
+        if charger_id in self._inflight:
+            # 같은 충전기가 settle_time 안에 다시 보낸 BootNotification 은 그대로 수락합니다.
+            return None
+        if len(self._inflight) < self.max_inflight:
+            self._inflight.add(charger_id)
+            self._waiting.discard(charger_id)
+            self.accepted += 1
+            asyncio.get_running_loop().call_later(self.settle_time, self._inflight.discard, charger_id)
+            return None
+        self._waiting.add(charger_id)
+        self.deferred += 1
+        spread = min(2 * len(self._waiting) / self.rate, self.max_interval - self.min_interval)
+        return self.min_interval + random.uniform(0, spread)
+
+    def forget(self, charger_id: str) -> None:
+        """대기 중에 연결이 끊긴 충전기를 대기 수에서 뺍니다."""
+        self._waiting.discard(charger_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'inflight': len(self._inflight), 'waiting': len(self._waiting),
+                'accepted': self.accepted, 'deferred': self.deferred}
+
+
+# --- 사용 예시: 10,000 대 동시 재접속 (시간은 1/100 로 축소) ---
+if __name__ == '__main__':
+    N = 10_000
+    SCALE = 0.01  # interval 1초 → 10ms
+
+    async def main() -> None:
+        # ocpp_message.py 의 BOOT_MAX_INFLIGHT / BOOT_SETTLE_TIME / BOOT_PENDING_MIN / BOOT_PENDING_MAX
+        # (50개 / 2초 = 초당 25대, Pending 5~300초) 를 SCALE 만큼 축소합니다.
+        admission = BootAdmission(max_inflight=50, settle_time=2.0 * SCALE,
+                                  min_interval=5.0 * SCALE, max_interval=300.0 * SCALE)
+        attempts = [0]
+        worst_lag = [0.0]
+        done = asyncio.Event()
+
+        async def lag_probe():
+            while not done.is_set():
+                expected = time.perf_counter() + 0.005
+                await asyncio.sleep(0.005)
+                worst_lag[0] = max(worst_lag[0], time.perf_counter() - expected)
+
+        async def charger(i: int) -> float:
+            charger_id = f"CP{i:05d}"
+            while True:
+                attempts[0] += 1
+                interval = admission.admit(charger_id)
+                if interval is None:
+                    return time.perf_counter()
+                await asyncio.sleep(interval)
+
+        probe = asyncio.create_task(lag_probe())
+        started = time.perf_counter()
+        tasks = []
+        for i in range(N):
+            tasks.append(asyncio.create_task(charger(i)))
+            if i % 500 == 499:
+                await asyncio.sleep(0)  # 접속은 accept 루프를 거쳐 조금씩 들어옵니다.
+        finished = await asyncio.gather(*tasks)
+        done.set()
+        await probe
+        elapsed = max(finished) - started
+        ideal = N / admission.rate
+        print(f"{N} chargers accepted in {elapsed:.2f}s (ideal {ideal:.2f}s), "
+              f"{attempts[0]} BootNotifications, max loop lag {worst_lag[0] * 1000:.1f} ms")
+        print(f"= {elapsed / SCALE:.0f}s / ideal {ideal / SCALE:.0f}s at {admission.rate * SCALE:.0f}/s (real scale); "
+              f"{admission.stats()}")
+
+    asyncio.run(main())
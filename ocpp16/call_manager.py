@@ -0,0 +1,114 @@
+# call_manager.py
+"""
+CSMS → 충전기 요청(CALL)의 응답 대기 관리.
+
+요청마다 OCPP unique id를 키로 Future를 등록하고, 충전기가 보낸 CALLRESULT/CALLERROR로
+해당 Future를 완료합니다. 충전기별로 동시에 여러 요청을 보낼 수 있습니다.
+"""
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from ocpp16 import codec
+
+CALL = 2
+
+# CSMS가 충전기로 보낼 수 있는 OCPP 1.6 action
+OUTBOUND_ACTIONS = frozenset([
+    "CancelReservation", "ChangeAvailability", "ChangeConfiguration", "ClearCache",
+    "ClearChargingProfile", "DataTransfer", "GetCompositeSchedule", "GetConfiguration",
+    "GetDiagnostics", "GetLocalListVersion", "RemoteStartTransaction", "RemoteStopTransaction",
+    "ReserveNow", "Reset", "SendLocalList", "SetChargingProfile", "TriggerMessage",
+    "UnlockConnector", "UpdateFirmware",
+])
+
+
+class CallError(Exception):
+    """충전기가 CALLERROR로 응답했을 때 발생합니다."""
+    def __init__(self, error_code: str, description: str, details: Optional[dict] = None):
+        super().__init__(f"{error_code}: {description}")
+        self.error_code = error_code
+        self.description = description
+        self.details = details or {}
+
+
+class ChargerDisconnected(Exception):
+    """응답을 기다리는 중에 충전기 연결이 끊어졌을 때 발생합니다."""
+
+
+class OutboundCallManager:
+    """
+    unique id → (충전기 ID, action, Future) 를 관리합니다.
+
+    call()은 CALL 프레임을 전송하고 응답 payload를 반환하며, 시간 초과 시 asyncio.TimeoutError,
+    CALLERROR 수신 시 CallError, 연결 해제 시 ChargerDisconnected를 발생시킵니다.
+    """
+    def __init__(self, default_timeout: float = 30.0):
+        self.default_timeout = default_timeout
+        self._pending: Dict[str, Tuple[str, str, asyncio.Future]] = {}
+        self._by_charger: Dict[str, Set[str]] = {}
+
+    def pending_count(self, charger_id: Optional[str] = None) -> int:
+        if charger_id is None:
+            return len(self._pending)
+        return len(self._by_charger.get(charger_id, ()))
+
+    async def call(self, charger_id: str, send: Callable[[str], Awaitable[Any]], action: str,
+                   payload: dict, timeout: Optional[float] = None) -> dict:
+        """CALL을 보내고 같은 unique id의 CALLRESULT payload를 기다립니다."""
+        unique_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending[unique_id] = (charger_id, action, future)
+        self._by_charger.setdefault(charger_id, set()).add(unique_id)
+        try:
+            await send(codec.dumps([CALL, unique_id, action, payload]))
+            return await asyncio.wait_for(future, timeout if timeout is not None else self.default_timeout)
+        finally:
+            self._forget(charger_id, unique_id)
+
+    def _forget(self, charger_id: str, unique_id: str) -> None:
+        self._pending.pop(unique_id, None)
+        ids = self._by_charger.get(charger_id)
+        if ids is not None:
+            ids.discard(unique_id)
+            if not ids:
+                del self._by_charger[charger_id]
+
+    def _take(self, charger_id: str, unique_id: str) -> Optional[Tuple[str, asyncio.Future]]:
+        entry = self._pending.get(unique_id)
+        # 다른 충전기가 같은 unique id로 응답한 경우는 무시합니다.
+        if entry is None or entry[0] != charger_id:
+            return None
+        _, action, future = entry
+        self._forget(charger_id, unique_id)
+        return action, future
+
+    def resolve(self, charger_id: str, unique_id: str, payload: Any) -> Optional[str]:
+        """CALLRESULT로 대기 중인 요청을 완료합니다. 대기 중인 요청의 action을, 없으면 None을 반환합니다."""
+        taken = self._take(charger_id, unique_id)
+        if taken is None:
+            return None
+        action, future = taken
+        if not future.done():
+            future.set_result(payload)
+        return action
+
+    def reject(self, charger_id: str, unique_id: str, error_code: str, description: str,
+               details: Optional[dict] = None) -> Optional[str]:
+        """CALLERROR로 대기 중인 요청을 실패 처리합니다. 대기 중인 요청의 action을, 없으면 None을 반환합니다."""
+        taken = self._take(charger_id, unique_id)
+        if taken is None:
+            return None
+        action, future = taken
+        if not future.done():
+            future.set_exception(CallError(error_code, description, details))
+        return action
+
+    def cancel_charger(self, charger_id: str) -> int:
+        """충전기 연결 해제 시 그 충전기로 보낸 모든 요청을 실패 처리합니다. 취소한 개수를 반환합니다."""
+        unique_ids = self._by_charger.pop(charger_id, set())
+        for unique_id in unique_ids:
+            entry = self._pending.pop(unique_id, None)
+            if entry is not None and not entry[2].done():
+                entry[2].set_exception(ChargerDisconnected(charger_id))
+        return len(unique_ids)
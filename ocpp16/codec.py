@@ -0,0 +1,88 @@
+# codec.py
+"""
+OCPP 프레임 JSON 인코더/디코더.
+
+orjson이 설치되어 있으면 orjson을, 없으면 표준 json을 사용합니다.
+서버(ocpp_message.py)와 충전기 시뮬레이터(clients/ocpp_utils.py)가 같은 모듈을 사용하며,
+두 백엔드 모두 공백 없는 같은 형식으로 인코딩합니다.
+
+    $ python -m ocpp16.codec     # 백엔드별 마이크로 벤치마크
+"""
+import json
+from typing import Any, Callable, Dict, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    return json.loads(data)
+
+
+def _json_dumps_bytes(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+BACKENDS: Dict[str, Tuple[Callable[[Union[str, bytes]], Any], Callable[[Any], bytes], Callable[[Any], str]]] = {
+    'json': (_json_loads, _json_dumps_bytes, _json_dumps),
+}
+if orjson is not None:
+    BACKENDS['orjson'] = (orjson.loads, orjson.dumps, lambda obj: orjson.dumps(obj).decode('utf-8'))
+
+BACKEND = ''
+loads: Callable[[Union[str, bytes]], Any]
+dumps_bytes: Callable[[Any], bytes]
+dumps: Callable[[Any], str]
+
+
+def use_backend(name: str) -> None:
+    """
+    사용할 백엔드를 선택합니다. 모듈 전역 함수를 교체하므로
+    `from ocpp16 import codec` 후 codec.loads(...) 형태로 호출해야 변경이 반영됩니다.
+    """
+    global BACKEND, loads, dumps_bytes, dumps
+    loads, dumps_bytes, dumps = BACKENDS[name]
+    BACKEND = name
+
+
+use_backend('orjson' if 'orjson' in BACKENDS else 'json')
+
+
+# --- 마이크로 벤치마크 ---
+if __name__ == '__main__':
+    import timeit
+
+    SAMPLE_FRAMES = {
+        'BootNotification': [2, "0f8a4c1e-6d1f-4c6b-9a55-1f3b1e0c9d21", "BootNotification", {
+            "chargePointVendor": "GRESYSTEM", "chargePointModel": "CP700P",
+            "chargePointSerialNumber": "PL10200787", "firmwareVersion": "1.4.2",
+            "meterType": "DC-METER", "meterSerialNumber": "MTR123456"}],
+        'Authorize': [2, "6b0c2d7e-93c8-4a7e-8a2c-3c9a2e41d5f0", "Authorize", {"idTag": "00000000F0C8FADD"}],
+        'MeterValues': [2, "a7d3e1b2-5c4f-4e2a-b1d9-8f6e2c3a4b5d", "MeterValues", {
+            "connectorId": 1, "transactionId": 42,
+            "meterValue": [{
+                "timestamp": "2025-01-01T12:00:00Z",
+                "sampledValue": [
+                    {"value": "1234.5", "measurand": "Energy.Active.Import.Register", "unit": "Wh", "context": "Sample.Periodic"},
+                    {"value": "7200", "measurand": "Power.Active.Import", "unit": "W", "context": "Sample.Periodic"},
+                    {"value": "31.8", "measurand": "Current.Import", "unit": "A", "phase": "L1", "context": "Sample.Periodic"},
+                    {"value": "229.4", "measurand": "Voltage", "unit": "V", "phase": "L1-N", "context": "Sample.Periodic"},
+                    {"value": "54", "measurand": "SoC", "unit": "Percent", "location": "EV", "context": "Sample.Periodic"},
+                ]}]}],
+    }
+    NUMBER = 100_000
+
+    print(f"Available backends: {', '.join(BACKENDS)} (default: {BACKEND})")
+    print(f"{'frame':<18}{'backend':<10}{'decode µs':>12}{'encode µs':>12}")
+    for frame_name, frame in SAMPLE_FRAMES.items():
+        raw = _json_dumps(frame)
+        for backend_name, (b_loads, b_dumps_bytes, b_dumps) in BACKENDS.items():
+            decode = min(timeit.repeat(lambda: b_loads(raw), number=NUMBER, repeat=3)) / NUMBER * 1e6
+            encode = min(timeit.repeat(lambda: b_dumps(frame), number=NUMBER, repeat=3)) / NUMBER * 1e6
+            print(f"{frame_name:<18}{backend_name:<10}{decode:>12.2f}{encode:>12.2f}")
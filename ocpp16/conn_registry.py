@@ -0,0 +1,210 @@
+# conn_registry.py
+"""
+여러 CSMS worker 프로세스가 공유하는 충전기 연결 등록부와 worker 간 요청 전달.
+
+    csms:conn:<charger_id>   → 웹소켓을 가진 worker ID (lease_ttl 초 임대, 살아 있는 동안 갱신)
+    csms:worker:<worker_id>  → 그 worker 가 구독하는 Pub/Sub 채널 (요청과 응답 모두)
+    csms:leader:<role>       → 한 worker 만 실행해야 하는 작업(role)의 leader worker ID (짧은 임대)
+    csms:broadcast           → 모든 worker 가 구독하는 Pub/Sub 채널 (응답 없는 알림)
+
+다른 worker 가 가진 충전기로 보낼 명령은 forward() 로 그 worker 에 전달하고,
+받은 worker 는 serve(handler) 의 handler 로 실행해 결과를 요청한 worker 의 채널로 돌려줍니다.
+broadcast() 는 같은 handler 를 보낸 worker 를 제외한 모든 worker 에서 실행합니다 (결과는 버림).
+채널을 구독하는 worker 가 없으면(종료됨) 즉시 WorkerUnavailable 이 발생하고 등록 정보를 지웁니다.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from ocpp16 import codec
+
+CONN_PREFIX = 'csms:conn:'
+WORKER_CHANNEL_PREFIX = 'csms:worker:'
+LEADER_PREFIX = 'csms:leader:'
+BROADCAST_CHANNEL = 'csms:broadcast'
+
+# 값이 내 worker ID 일 때만 임대를 갱신/삭제합니다 (다른 worker 로 재연결된 경우 보호).
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class WorkerUnavailable(Exception):
+    """충전기를 가진 worker 가 응답할 수 없을 때 발생합니다."""
+
+
+class ConnectionRegistry:
+    def __init__(self, redis_factory, worker_id: Optional[str] = None, lease_ttl: float = 60.0,
+                 reconnect_delay: float = 3.0):
+        self.redis_factory = redis_factory
+        self.worker_id = worker_id or new_worker_id()
+        self.lease_ttl = lease_ttl
+        self.reconnect_delay = reconnect_delay
+        self.forwarded = 0
+        self.served = 0
+        self._redis = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()  # 처리 중인 요청 (GC 되지 않도록 참조 유지)
+        self._handler: Optional[Callable[[dict], Awaitable[Any]]] = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = self.redis_factory()
+        return self._redis
+
+    @property
+    def channel(self) -> str:
+        return WORKER_CHANNEL_PREFIX + self.worker_id
+
+    # =======================================================
+    # 연결 등록부
+    # =======================================================
+
+    async def claim(self, charger_id: str) -> None:
+        await self.redis.set(CONN_PREFIX + charger_id, self.worker_id, px=int(self.lease_ttl * 1000))
+
+    async def release(self, charger_id: str) -> None:
+        await self.redis.eval(_RELEASE_SCRIPT, 1, CONN_PREFIX + charger_id, self.worker_id)
+
+    async def renew(self, charger_ids: Iterable[str]) -> int:
+        """살아 있는 충전기들의 임대를 한 번의 pipeline 으로 갱신합니다. 갱신된 수를 반환합니다."""
+        charger_ids = list(charger_ids)
+        if not charger_ids:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        for charger_id in charger_ids:
+            pipe.eval(_RENEW_SCRIPT, 1, CONN_PREFIX + charger_id, self.worker_id, int(self.lease_ttl * 1000))
+        return sum(1 for renewed in await pipe.execute() if renewed)
+
+    async def owner(self, charger_id: str) -> Optional[str]:
+        return await self.redis.get(CONN_PREFIX + charger_id)
+
+    async def connected(self) -> Dict[str, str]:
+        """모든 worker 에 연결된 충전기 → 그 충전기를 가진 worker ID."""
+        keys = [key async for key in self.redis.scan_iter(match=CONN_PREFIX + '*', count=1000)]
+        if not keys:
+            return {}
+        owners = await self.redis.mget(keys)
+        return {key[len(CONN_PREFIX):]: owner for key, owner in zip(keys, owners) if owner}
+
+    # =======================================================
+    # leader 선출
+    # =======================================================
+
+    async def lead(self, role: str, ttl: float) -> bool:
+        """
+        role 의 leader 임대를 갱신하거나, 비어 있으면 가져옵니다. 이 worker 가 leader 이면 True.
+        ttl 보다 짧은 주기로 호출해야 하며, 호출이 멈추면 ttl 후 다른 worker 가 이어받습니다.
+        """
+        key = LEADER_PREFIX + role
+        if await self.redis.eval(_RENEW_SCRIPT, 1, key, self.worker_id, int(ttl * 1000)):
+            return True
+        return bool(await self.redis.set(key, self.worker_id, px=int(ttl * 1000), nx=True))
+
+    # =======================================================
+    # worker 간 요청 전달
+    # =======================================================
+
+    async def forward(self, worker_id: str, request: dict, timeout: float, charger_id: Optional[str] = None) -> Any:
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            receivers = await self.redis.publish(WORKER_CHANNEL_PREFIX + worker_id, codec.dumps({
+                'type': 'request', 'id': request_id, 'replyTo': self.worker_id, 'request': request,
+            }))
+            if not receivers:
+                if charger_id is not None:
+                    # 종료된 worker 의 등록 정보는 더 이상 유효하지 않습니다.
+                    await self.redis.eval(_RELEASE_SCRIPT, 1, CONN_PREFIX + charger_id, worker_id)
+                raise WorkerUnavailable(worker_id)
+            self.forwarded += 1
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def broadcast(self, request: dict) -> int:
+        """모든 다른 worker 에 request 를 알립니다. 받은 worker 수 (자신 포함) 를 반환합니다."""
+        return await self.redis.publish(BROADCAST_CHANNEL, codec.dumps({
+            'type': 'broadcast', 'from': self.worker_id, 'request': request,
+        }))
+
+    async def _handle_broadcast(self, message: dict) -> None:
+        try:
+            await self._handler(message['request'])
+        except Exception as e:
+            print(f"[REGISTRY] broadcast from {message.get('from')} failed: {e}")
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle_request(self, message: dict) -> None:
+        try:
+            result = await self._handler(message['request'])
+        except Exception as e:
+            result = {'error': str(e)}
+        self.served += 1
+        await self.redis.publish(WORKER_CHANNEL_PREFIX + message['replyTo'], codec.dumps({
+            'type': 'reply', 'id': message['id'], 'result': result,
+        }))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.redis_factory().pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel, BROADCAST_CHANNEL)
+                print(f"[REGISTRY] worker {self.worker_id} subscribed to {self.channel}")
+                async for raw in pubsub.listen():
+                    if raw.get('type') != 'message':
+                        continue
+                    message = codec.loads(raw['data'])
+                    if message.get('type') == 'request':
+                        self._spawn(self._handle_request(message))
+                    elif message.get('type') == 'broadcast':
+                        if message.get('from') != self.worker_id:
+                            self._spawn(self._handle_broadcast(message))
+                    elif message.get('type') == 'reply':
+                        future = self._pending.get(message.get('id'))
+                        if future is not None and not future.done():
+                            future.set_result(message.get('result'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[REGISTRY] channel error: {e}, retrying in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def serve(self, handler: Callable[[dict], Awaitable[Any]]) -> None:
+        """다른 worker 가 보낸 요청을 handler(request) 로 처리하기 시작합니다."""
+        self._handler = handler
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'workerId': self.worker_id, 'forwarded': self.forwarded, 'served': self.served,
+                'pending': len(self._pending)}
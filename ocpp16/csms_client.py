@@ -0,0 +1,285 @@
+# csms_client.py
+"""
+Flask API → CSMS(FastAPI) 호출용 공용 클라이언트.
+
+- requests.Session + HTTPAdapter 커넥션 풀로 keep-alive 연결과 TLS 세션을 재사용합니다.
+- 연결 실패는 지수 백오프로 재시도합니다. POST /send 는 중복 실행을 막기 위해
+  서버에 도달하지 못한 경우(연결 오류)만 재시도하고, GET은 502/503/504 응답도 재시도합니다.
+- 연속 실패가 일정 횟수를 넘으면 회로 차단기가 열려 reset_timeout 동안 즉시 실패합니다.
+- 명령(messageId)별 지연 시간 통계를 metrics()로 제공합니다.
+
+    $ python -m ocpp16.csms_client     # 사용 예시
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ocpp16 import codec
+
+CSMS_URL = "https://127.0.0.1:443"     # FastAPI 서버 주소
+CSMS_WS_URL = "ws://127.0.0.1:8003"    # 로컬 OCPP 서비스 주소
+
+
+class CircuitOpenError(Exception):
+    """회로 차단기가 열려 있어 요청을 보내지 않았을 때 발생합니다."""
+
+
+class CircuitBreaker:
+    """
+    closed → (연속 실패 failure_threshold 회) → open → (reset_timeout 경과) → half-open.
+    half-open 에서는 요청 하나만 통과시키고, 성공하면 closed, 실패하면 다시 open 으로 돌아갑니다.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"CSMS circuit open ({self.failures} consecutive failures)")
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError("CSMS circuit half-open, trial request in progress")
+                self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[CSMS] 회로 차단기 open - 연속 실패 {self.failures}회")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyMetrics:
+    """명령별 호출 수, 실패 수, 평균/최대/p50/p95 지연 시간(ms)을 집계합니다."""
+    def __init__(self, window: int = 256):
+        self.window = window
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, command: str, elapsed: float, ok: bool) -> None:
+        ms = elapsed * 1000.0
+        with self._lock:
+            stat = self._stats.get(command)
+            if stat is None:
+                stat = self._stats[command] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+                self._samples[command] = deque(maxlen=self.window)
+            stat['count'] += 1
+            if not ok:
+                stat['errors'] += 1
+            stat['total_ms'] += ms
+            stat['max_ms'] = max(stat['max_ms'], ms)
+            self._samples[command].append(ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for command, stat in self._stats.items():
+                samples = sorted(self._samples[command])
+                result[command] = {
+                    'count': stat['count'],
+                    'errors': stat['errors'],
+                    'avg_ms': round(stat['total_ms'] / stat['count'], 2),
+                    'max_ms': round(stat['max_ms'], 2),
+                    'p50_ms': round(samples[len(samples) // 2], 2),
+                    'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+                }
+            return result
+
+
+class CsmsClient:
+    """
+    CSMS HTTP API 클라이언트. 스레드 간에 하나의 인스턴스를 공유해서 사용합니다.
+
+    timeout은 (연결, 읽기) 초이며 호출마다 읽기 시간 제한을 따로 줄 수 있습니다.
+    """
+    def __init__(self, base_url: str = CSMS_URL, verify: Any = False, pool_size: int = 10,
+                 retries: int = 2, backoff: float = 0.2, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyMetrics()
+
+        retry = Retry(
+            total=retries, connect=retries, read=retries, status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),  # 읽기/상태 재시도는 GET만, 연결 오류는 모든 메서드
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method: str, path: str, command: str, timeout: Optional[float] = None,
+                **kwargs: Any) -> requests.Response:
+        """
+        요청을 보내고 응답을 반환합니다. 5xx 응답과 네트워크 오류는 회로 차단기에 실패로 기록하며,
+        네트워크 오류는 requests.RequestException, 회로가 열려 있으면 CircuitOpenError를 발생시킵니다.
+        """
+        self.breaker.before_call()
+        started = time.perf_counter()
+        ok = False
+        try:
+            res = self.session.request(
+                method, self.base_url + path,
+                timeout=(self.connect_timeout, timeout if timeout is not None else self.read_timeout),
+                **kwargs
+            )
+            ok = res.status_code < 500
+            return res
+        finally:
+            self.latency.record(command, time.perf_counter() - started, ok)
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def send(self, message_id: str, charger_id: str, data: Optional[dict] = None,
+             callback_url: Optional[str] = None, timeout: Optional[float] = None) -> requests.Response:
+        """POST /send 로 명령을 전달합니다 (서버는 202와 jobId를 반환)."""
+        payload: Dict[str, Any] = {"messageId": message_id, "chargerId": charger_id, "data": data or {}}
+        if callback_url:
+            payload["callbackUrl"] = callback_url
+        return self.request('POST', '/send', message_id, timeout=timeout, json=payload)
+
+    def get_job(self, job_id: str, wait: float = 0) -> Optional[dict]:
+        """GET /jobs/{job_id} 로 작업 상태를 조회합니다. 없거나 실패하면 None."""
+        try:
+            res = self.request('GET', f'/jobs/{job_id}', 'getJob', timeout=wait + self.read_timeout,
+                               params={"wait": wait})
+        except (requests.RequestException, CircuitOpenError) as e:
+            print(f"[CSMS] {job_id} 조회 실패: {e}")
+            return None
+        if res.status_code != 200:
+            return None
+        return res.json()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'circuit': {'state': self.breaker.state, 'failures': self.breaker.failures},
+            'commands': self.latency.snapshot(),
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class CsmsWebSocket:
+    """
+    로컬 OCPP 서비스(ws://127.0.0.1:8003)와의 요청/응답용 지속 WebSocket 연결.
+
+    요청마다 새로 연결하지 않고 연결 하나를 재사용합니다. 재사용한 연결이 끊어져 send() 가 실패한 경우에만
+    새 연결로 한 번 다시 보내며, 보낸 뒤의 실패(응답 timeout 등)는 명령이 두 번 실행되지 않도록 재시도하지 않습니다.
+    요청/응답 순서를 지키기 위해 한 번에 하나의 요청만 보냅니다.
+    """
+    def __init__(self, url: str = CSMS_WS_URL, timeout: float = 10.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyMetrics()
+        self._ws = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        import websocket  # websocket-client
+        return websocket.create_connection(self.url, timeout=self.timeout)
+
+    def _close(self) -> None:
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+    def _exchange(self, raw: str) -> Any:
+        reused = self._ws is not None
+        if not reused:
+            self._ws = self._connect()
+        try:
+            self._ws.send(raw)
+        except Exception:
+            if not reused:
+                raise
+            # 서버가 유휴 연결을 끊은 경우 등: 아직 보내지 못했으므로 새 연결로 한 번 다시 보냅니다.
+            self._close()
+            self._ws = self._connect()
+            self._ws.send(raw)
+        # 여기부터의 실패는 명령이 이미 실행됐을 수 있으므로 재시도하지 않습니다.
+        return codec.loads(self._ws.recv())
+
+    def request(self, message: Any, command: str = 'ws') -> Any:
+        self.breaker.before_call()
+        started = time.perf_counter()
+        ok = False
+        raw = codec.dumps(message)
+        try:
+            with self._lock:
+                result = self._exchange(raw)
+            ok = True
+            return result
+        except Exception:
+            with self._lock:
+                self._close()
+            raise
+        finally:
+            self.latency.record(command, time.perf_counter() - started, ok)
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+# --- 사용 예시 ---
+if __name__ == '__main__':
+    client = CsmsClient(retries=1, failure_threshold=2, reset_timeout=1.0)
+
+    res = None
+    for _ in range(3):
+        try:
+            res = client.send("Reset", "CP700P_001", {"type": "Soft"})
+            print(res.status_code, res.json())
+        except CircuitOpenError as e:
+            print(f"circuit open: {e}")
+        except requests.RequestException as e:
+            print(f"request failed: {e.__class__.__name__}")
+    if res is not None and res.status_code == 202:
+        print(client.get_job(res.json()["jobId"], wait=5))
+    print(codec.dumps(client.metrics()))
@@ -1,28 +1,202 @@
+import atexit
+import copy
+import functools
 import json
 import os
+import tempfile
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용합니다.
+    fcntl = None
 
 JSON_FILE = 'shared_data.json'
 ID_TAGS_KEY = 'registered_id_tags'
 CHARGERS_KEY = 'registered_chargers'
+PM_DEVICES_KEY = 'pm_devices'
+SCHEDULES_KEY = 'schedules'
+# 레코드별 고정 ID: {collection: {key: id}}. ID는 삭제 후에도 재사용하지 않습니다.
+RECORD_IDS_KEY = 'record_ids'
+NEXT_RECORD_ID_KEY = 'next_record_id'
+# StartTransaction 에 줄 다음 transactionId. 재시작 후에도 이어서 발급합니다.
+# JSON 백엔드는 문서 전체 저장(Flask)이 카운터를 되돌리지 않도록 별도 파일에 기록합니다.
+NEXT_TRANSACTION_ID_KEY = 'next_transaction_id'
+TRANSACTION_ID_SUFFIX = '.transaction_id'
+RECORD_COLLECTIONS = (ID_TAGS_KEY, PM_DEVICES_KEY, SCHEDULES_KEY)
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+def expiry_date_from_days(expiry_days: int) -> str:
+    """현재 시각으로부터 expiry_days 일 뒤의 만료일을 OCPP 형식 문자열로 반환합니다."""
+    # 만료일 계산 및 ISO 8601 형식으로 변환
+    expiry_date = (datetime.now(timezone.utc) + timedelta(days=expiry_days))
+    # 마이크로초 제거 및 OCPP 표준에 맞게 'Z'로 끝나는 ISO 형식으로 변환
+    return expiry_date.replace(microsecond=0).isoformat().replace('+00:00', 'Z')
+
+
+def open_config_manager(filename: str, **kwargs):
+    """
+    파일 확장자에 따라 저장소 백엔드를 선택하여 매니저를 생성합니다.
+
+    .sqlite/.sqlite3/.db 이면 SqliteConfigManager, 그 외에는 JsonConfigManager를 반환합니다.
+    두 클래스는 같은 공개 API를 제공합니다.
+    """
+    if filename.endswith(SQLITE_SUFFIXES):
+        from ocpp16.sqlite_manager import SqliteConfigManager
+        return SqliteConfigManager(filename)
+    return JsonConfigManager(filename, **kwargs)
+
+
+def _sync_record_ids(data: Dict[str, Any]) -> None:
+    """새 레코드에 고정 ID를 부여하고, 삭제된 레코드의 ID 항목을 정리합니다."""
+    record_ids = data.setdefault(RECORD_IDS_KEY, {})
+    next_id = data.get(NEXT_RECORD_ID_KEY, 1)
+    for collection in RECORD_COLLECTIONS:
+        next_id = max([next_id] + [rid + 1 for rid in record_ids.get(collection, {}).values()])
+    for collection in RECORD_COLLECTIONS:
+        ids = record_ids.get(collection, {})
+        synced = {}
+        for key in data.get(collection, {}):
+            if key in ids:
+                synced[key] = ids[key]
+            else:
+                synced[key] = next_id
+                next_id += 1
+        record_ids[collection] = synced
+    data[NEXT_RECORD_ID_KEY] = next_id
+
+
+def _freeze(value: Any) -> Any:
+    """dict/list를 읽기 전용 구조(MappingProxyType/tuple)로 변환합니다."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """_freeze로 만든 읽기 전용 구조를 수정 가능한 dict/list로 되돌립니다."""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _synchronized(method):
+    """읽기-수정-쓰기 작업이 스레드 간에 섞이지 않도록 매니저 락을 잡고 실행합니다."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class JsonConfigManager:
     """
     JSON 파일을 읽고 쓰며, OCPP 공유 데이터를 관리하는 클래스.
+
+    cached=True 이면 파싱된 문서를 메모리에 보관하고, 파일의 stat 시그니처
+    (mtime/size/inode)가 바뀐 경우에만 다시 파싱합니다.
+
+    파일은 항상 임시 파일에 쓴 뒤 rename 하여 원자적으로 교체됩니다.
+    flush_interval > 0 이면 그 시간 안에 발생한 저장 요청을 모아 한 번만 기록하며,
+    즉시 기록이 필요한 호출자는 flush()를 사용합니다.
     """
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, cached: bool = False, flush_interval: float = 0.0):
         self.filename = filename
+        self.cached = cached
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._snapshot: Optional[Mapping[str, Any]] = None
+        self._snapshot_sig: Optional[Tuple[int, int, int]] = None
+        # 아직 파일에 기록되지 않은 최신 데이터 (write coalescing)
+        self._pending: Optional[Dict[str, Any]] = None
+        self._flush_timer: Optional[threading.Timer] = None
+        # (고정 ID → 키 인덱스, 인덱스를 만든 스냅샷)
+        self._record_index: Optional[Tuple[Dict[str, Dict[int, str]], Mapping[str, Any]]] = None
+        if self.flush_interval > 0:
+            # 프로세스 종료 시 남은 변경 사항을 잃지 않도록 합니다.
+            atexit.register(self.flush)
+
+    def _stat_signature(self) -> Optional[Tuple[int, int, int]]:
+        """파일 변경 감지용 (mtime_ns, size, inode) 시그니처를 반환합니다."""
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_file(self) -> Dict[str, Any]:
+        """JSON 파일을 파싱합니다. 실패 시 예외를 그대로 전달합니다."""
+        with open(self.filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _refresh_snapshot(self) -> Mapping[str, Any]:
+        """파일 시그니처가 바뀐 경우에만 다시 파싱하여 캐시된 스냅샷을 반환합니다."""
+        if self._pending is not None:
+            # 기록 대기 중인 로컬 변경 사항이 파일보다 최신입니다.
+            return self._snapshot
+
+        sig = self._stat_signature()
+        snapshot = self._snapshot
+        if snapshot is not None and sig == self._snapshot_sig:
+            return snapshot
+
+        with self._lock:
+            # 락을 기다리는 동안 다른 스레드가 이미 갱신했을 수 있습니다.
+            if self._pending is not None:
+                return self._snapshot
+            if self._snapshot is not None and sig == self._snapshot_sig:
+                return self._snapshot
+            if sig is None:
+                print(f"Error: JSON file '{self.filename}' not found. Returning empty dictionary.")
+                self._snapshot = _freeze({})
+                self._snapshot_sig = None
+                return self._snapshot
+            try:
+                data = self._read_file()
+            except Exception as e:
+                # 파싱 실패 시 이전 스냅샷을 유지하고, 시그니처는 갱신하지 않아 다음 호출에서 재시도합니다.
+                print(f"Error decoding JSON file: {e}")
+                if self._snapshot is None:
+                    return _freeze({})
+                return self._snapshot
+            self._snapshot = _freeze(data)
+            self._snapshot_sig = sig
+            return self._snapshot
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """
+        전체 데이터의 읽기 전용 스냅샷을 반환합니다.
+
+        cached 모드에서는 파일이 바뀌지 않는 한 같은 객체를 그대로 돌려주므로
+        Authorize 처리와 같은 hot path에서 사용합니다. 반환값은 수정할 수 없습니다.
+        """
+        if self.cached:
+            return self._refresh_snapshot()
+        return _freeze(self.load_data())
 
     def load_data(self) -> Dict[str, Any]:
         """JSON 파일에서 모든 데이터를 읽어 딕셔너리로 반환합니다."""
+        if self.cached:
+            # 호출자가 결과를 수정할 수 있으므로 캐시의 수정 가능한 복사본을 돌려줍니다.
+            return _thaw(self._refresh_snapshot())
+
+        with self._lock:
+            if self._pending is not None:
+                return copy.deepcopy(self._pending)
+
         if not os.path.exists(self.filename):
             print(f"Error: JSON file '{self.filename}' not found. Returning empty dictionary.")
             return {}
             
         try:
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self._read_file()
         except json.JSONDecodeError as e:
             print(f"Error decoding JSON file: {e}")
             return {}
@@ -30,16 +204,137 @@ class JsonConfigManager:
             print(f"An unexpected error occurred while reading the file: {e}")
             return {}
 
+    def get_id_tag_info(self, id_tag: str) -> Optional[Mapping[str, Any]]:
+        """특정 ID Tag의 등록 정보를 스냅샷에서 읽습니다. 없으면 None."""
+        return self.snapshot().get(ID_TAGS_KEY, {}).get(id_tag)
+
+    def get_charger_info(self, charger_id: str) -> Optional[Mapping[str, Any]]:
+        """특정 충전기의 등록 정보를 스냅샷에서 읽습니다. 없으면 None."""
+        return self.snapshot().get(CHARGERS_KEY, {}).get(charger_id)
+
+    def _get_record_index(self) -> Tuple[Dict[str, Dict[int, str]], Mapping[str, Any]]:
+        """스냅샷이 바뀐 경우에만 고정 ID → 키 인덱스를 다시 만들어 (인덱스, 스냅샷)을 반환합니다."""
+        snapshot = self.snapshot()
+        cached_index = self._record_index
+        if cached_index is not None and cached_index[1] is snapshot:
+            return cached_index
+
+        record_ids = snapshot.get(RECORD_IDS_KEY, {})
+        if any(record_ids.get(c, {}).keys() != snapshot.get(c, {}).keys() for c in RECORD_COLLECTIONS):
+            # 고정 ID가 없는 레코드(이전 형식의 파일)가 있으면 ID를 부여하여 저장합니다.
+            with self._lock:
+                self.save_data(self.load_data())
+            snapshot = self.snapshot()
+            record_ids = snapshot.get(RECORD_IDS_KEY, {})
+
+        index = {
+            collection: {rid: key for key, rid in record_ids.get(collection, {}).items()}
+            for collection in RECORD_COLLECTIONS
+        }
+        self._record_index = (index, snapshot)
+        return self._record_index
+
+    def list_records(self, collection: str) -> List[Tuple[int, str, Any]]:
+        """collection의 레코드를 (고정 ID, 키, 값) 목록으로 반환합니다."""
+        _, snapshot = self._get_record_index()
+        ids = snapshot.get(RECORD_IDS_KEY, {}).get(collection, {})
+        return [(ids[key], key, value) for key, value in snapshot.get(collection, {}).items()]
+
+    def get_record(self, collection: str, record_id: int) -> Optional[Tuple[str, Any]]:
+        """고정 ID로 레코드를 찾아 (키, 값)을 반환합니다. 없으면 None."""
+        index, snapshot = self._get_record_index()
+        key = index.get(collection, {}).get(record_id)
+        if key is None:
+            return None
+        return key, snapshot[collection][key]
+
+    @_synchronized
+    def delete_record(self, collection: str, record_id: int) -> bool:
+        """고정 ID로 레코드를 삭제합니다. 락 안에서 ID를 해석하므로 동시 삭제에도 안전합니다."""
+        record = self.get_record(collection, record_id)
+        if record is None:
+            return False
+        delete = {
+            ID_TAGS_KEY: self.delete_id_tag,
+            PM_DEVICES_KEY: self.delete_pm_device,
+            SCHEDULES_KEY: self.delete_schedule,
+        }[collection]
+        delete(record[0])
+        return True
+
     def save_data(self, data: Dict[str, Any]):
-        """주어진 딕셔너리 데이터를 JSON 파일에 저장합니다."""
+        """
+        주어진 딕셔너리 데이터를 JSON 파일에 저장합니다.
+
+        flush_interval > 0 이면 즉시 기록하지 않고 대기 중인 데이터로 보관한 뒤,
+        flush_interval 초 후에 한 번만 기록합니다.
+        """
+        _sync_record_ids(data)
+        if self.flush_interval <= 0:
+            with self._lock:
+                self._write_atomic(data)
+            return
+
+        with self._lock:
+            self._pending = data
+            if self.cached:
+                self._snapshot = _freeze(data)
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """기록 대기 중인 데이터가 있으면 즉시 파일에 기록합니다."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            data = self._pending
+            if data is None:
+                return
+            if self._write_atomic(data):
+                self._pending = None
+            elif self.flush_interval > 0:
+                # 기록에 실패하면 대기 데이터를 유지하고 flush_interval 후에 다시 시도합니다.
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _write_atomic(self, data: Dict[str, Any]) -> bool:
+        """
+        임시 파일에 기록한 뒤 os.replace로 교체하여, 읽는 쪽이 반쯤 쓰인 파일을 보지 않게 합니다.
+        기록에 성공하면 True, 실패하면 False 를 반환합니다.
+        """
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.filename)}.", suffix=".tmp", dir=dirname)
         try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 # indent=4를 사용하여 파일에 저장 시 가독성을 높입니다.
                 json.dump(data, f, indent=4, ensure_ascii=False)
-            print(f"Success: JSON file '{self.filename}' updated.")
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp는 0600 권한으로 만들므로 기존 파일의 권한을 유지합니다.
+            if os.path.exists(self.filename):
+                os.chmod(tmp_path, os.stat(self.filename).st_mode & 0o777)
+            # rename은 mtime/inode를 유지하므로 교체 전에 시그니처를 구해 두면 재파싱이 필요 없습니다.
+            st = os.stat(tmp_path)
+            os.replace(tmp_path, self.filename)
         except Exception as e:
             print(f"An error occurred while writing the file: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
 
+        if self.cached:
+            self._snapshot = _freeze(data)
+            self._snapshot_sig = (st.st_mtime_ns, st.st_size, st.st_ino)
+        print(f"Success: JSON file '{self.filename}' updated.")
+        return True
+
+    @_synchronized
     def update_id_tag(self, id_tag: str, status: str, cardname: str, expiry_days: int = 365):
         """
         특정 ID Tag의 정보를 추가하거나 업데이트합니다.
@@ -52,10 +347,7 @@ class JsonConfigManager:
         """
         data = self.load_data()
         
-        # 만료일 계산 및 ISO 8601 형식으로 변환
-        expiry_date = (datetime.now(timezone.utc) + timedelta(days=expiry_days))
-        # 마이크로초 제거 및 OCPP 표준에 맞게 'Z'로 끝나는 ISO 형식으로 변환
-        expiry_date_str = expiry_date.replace(microsecond=0).isoformat().replace('+00:00', 'Z')
+        expiry_date_str = expiry_date_from_days(expiry_days)
         
         id_tags = data.get(ID_TAGS_KEY, {})
         
@@ -70,6 +362,56 @@ class JsonConfigManager:
         self.save_data(data)
         print(f"[ID Tag] '{id_tag}'이(가) 상태 '{status}'로 업데이트/추가되었습니다.")
 
+    @_synchronized
+    def update_connected(self, states: Dict[str, bool]):
+        """여러 충전기의 connected 값을 한 번에 갱신합니다. 등록되지 않은 충전기는 건너뜁니다."""
+        data = self.load_data()
+        chargers = data.get(CHARGERS_KEY, {})
+        changed = 0
+        for charger_id, connected in states.items():
+            info = chargers.get(charger_id)
+            if info is not None and info.get('connected') != connected:
+                info['connected'] = connected
+                changed += 1
+        if changed:
+            self.save_data(data)
+        return changed
+
+    def _update_transaction_id(self, update: Callable[[int], int]) -> int:
+        """
+        카운터 파일(<이름>.transaction_id)을 잠그고 다음 값을 update(다음 값) 으로 바꿉니다.
+        바꾸기 전의 다음 값을 반환합니다. 파일 잠금으로 다른 프로세스(worker)와도 겹치지 않습니다.
+        """
+        path = os.path.splitext(self.filename)[0] + TRANSACTION_ID_SUFFIX
+        with self._lock, open(path, 'a+', encoding='utf-8') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # 파일을 닫을 때 풀립니다.
+            f.seek(0)
+            text = f.read().strip()
+            # 이전 버전은 카운터를 문서 안에 기록했습니다.
+            current = int(text) if text else int(self.snapshot().get(NEXT_TRANSACTION_ID_KEY, 1))
+            new = update(current)
+            if new != current:
+                f.seek(0)
+                f.truncate()
+                f.write(str(new))
+                f.flush()
+                os.fsync(f.fileno())
+        return current
+
+    def next_transaction_id(self) -> int:
+        """transactionId 를 하나 발급합니다."""
+        return self._update_transaction_id(lambda current: current + 1)
+
+    def get_next_transaction_id(self) -> int:
+        """다음에 발급할 transactionId (발급하지 않음)."""
+        return self._update_transaction_id(lambda current: current)
+
+    def set_next_transaction_id(self, value: int) -> None:
+        """다음 transactionId 를 value 이상으로 올립니다. 카운터를 되돌리지는 않습니다."""
+        self._update_transaction_id(lambda current: max(current, int(value)))
+
+    @_synchronized
     def update_pm_device(self, serialnumber: str, maxcurrent: str):
         
         data = self.load_data()
@@ -83,6 +425,7 @@ class JsonConfigManager:
         self.save_data(data)
         print(f"[PM Device] '{serialnumber}'이(가) 업데이트/추가되었습니다.")
 
+    @_synchronized
     def update_schedules(self, priority: str, timezone: str, starttime: str, endtime: str):
         
         data = self.load_data()
@@ -121,6 +464,7 @@ class JsonConfigManager:
         self.save_data(data)
         print(f"[Schedules] '{priority} schedule'이(가) 업데이트/추가되었습니다.")
 
+    @_synchronized
     def delete_id_tag(self, id_tag: str):
         """특정 ID Tag를 데이터에서 삭제합니다."""
         data = self.load_data()
@@ -134,6 +478,7 @@ class JsonConfigManager:
         else:
             print(f"[ID Tag] '{id_tag}'을(를) 찾을 수 없어 삭제를 건너뜁니다.")
 
+    @_synchronized
     def delete_pm_device(self, serialnumber: str):
         """특정 device를 데이터에서 삭제합니다."""
         data = self.load_data()
@@ -147,6 +492,7 @@ class JsonConfigManager:
         else:
             print(f"[PM Device] '{serialnumber}'을(를) 찾을 수 없어 삭제를 건너뜁니다.")
 
+    @_synchronized
     def delete_schedule(self, schedule: str):
         """특정 device를 데이터에서 삭제합니다."""
         data = self.load_data()
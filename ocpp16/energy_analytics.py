@@ -0,0 +1,355 @@
+# energy_analytics.py
+"""
+계측기 시계열(ocpp16/timeseries.py 세그먼트)에 대한 NumPy 벡터화 에너지 분석.
+
+세그먼트 파일을 레코드 구조 그대로 np.fromfile로 읽어 열(column) 배열로 다루며,
+세그먼트 단위로 나눠 누적하므로 몇 주~1년 구간도 메모리 사용량이 세그먼트 하나 크기로 유지됩니다.
+
+- energy_kwh: 전력 평균 × 버킷이 덮은 시간을 적분한 에너지 (계측기 적산값 차이 register_kwh와 비교 가능).
+  덮은 시간은 버킷 길이가 아니라 샘플 수 (count, 1Hz 기준) 로 계산하므로, 일부만 채워진 분/시간 버킷이나
+  재시작 후 중복 기록된 부분 버킷을 온전한 구간으로 세지 않습니다.
+- peak_demand: 15분(demand_window) 고정 구간 평균 전력의 최대값
+- load_factor: 평균 전력 / 최대 수요
+- pf_distribution: 역률 구간별 시간 비율
+- phase_imbalance (사이트): 같은 시각 계측기 전류의 (최대 편차 / 평균) 통계
+
+    $ python -m ocpp16.energy_analytics     # 1년치 1Hz 합성 데이터 벤치마크
+"""
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from ocpp16.timeseries import FIELDS, RESOLUTIONS, SEGMENT_SPAN, TimeSeriesStore, _safe_name
+
+DEMAND_WINDOW = 900  # 수요 계산 구간 (초)
+PF_BINS = (0.0, 0.5, 0.7, 0.8, 0.9, 0.95, 1.0)
+IMBALANCE_LIMIT = 0.1  # 상 불평형 경고 기준 (10%)
+
+# timeseries.RECORD 와 같은 배치의 구조화 dtype
+RECORD_DTYPE = np.dtype(
+    [('t', '<u4'), ('count', '<u4')]
+    + [(f"{field}_{stat}", '<f4') for field in FIELDS for stat in ('min', 'max', 'avg', 'last')]
+)
+
+
+def iter_columns(directory: str, serial: str, resolution: int, start: float, end: float) -> Iterator[Dict[str, np.ndarray]]:
+    """[start, end) 구간의 레코드를 세그먼트별 열 배열로 반환합니다."""
+    span = SEGMENT_SPAN[resolution]
+    start_i, end_i = int(start), int(np.ceil(end))
+    for segment in range(start_i // span, (end_i - 1) // span + 1):
+        path = os.path.join(directory, _safe_name(serial), str(resolution), f"{segment}.seg")
+        try:
+            count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        except OSError:
+            continue
+        records = np.fromfile(path, dtype=RECORD_DTYPE, count=count)
+        lo, hi = np.searchsorted(records['t'], [start_i, end_i])
+        if hi > lo:
+            yield columns_from_records(records[lo:hi])
+
+
+def columns_from_records(records: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        't': records['t'].astype(np.int64),
+        'count': records['count'].astype(np.float64),
+        'power': records['power_avg'].astype(np.float64),
+        'current': records['current_avg'].astype(np.float64),
+        'pf': records['pf_avg'].astype(np.float64),
+        'energy': records['energy_last'].astype(np.float64),
+    }
+
+
+class _DemandWindows:
+    """고정 구간 평균 전력. 세그먼트 경계에 걸친 마지막 구간은 다음 update까지 보관합니다."""
+    def __init__(self, window: int):
+        self.window = window
+        self.peak_w = 0.0
+        self.peak_at: Optional[int] = None
+        self.windows = 0
+        self._pending: Optional[List[float]] = None  # [window index, 전력×초 합, 초 합]
+
+    def update(self, t: np.ndarray, power: np.ndarray, duration: Union[float, np.ndarray]) -> None:
+        """duration: 레코드별로 덮은 시간 (초). 모든 레코드가 같으면 스칼라."""
+        valid = ~np.isnan(power)
+        t, power = t[valid], power[valid]
+        if not len(t):
+            return
+        idx = t // self.window
+        first = idx[0]
+        rel = idx - first
+        if np.ndim(duration):
+            duration = duration[valid]
+            energy = np.bincount(rel, weights=power * duration)
+            covered = np.bincount(rel, weights=duration, minlength=len(energy))
+        else:
+            energy = np.bincount(rel, weights=power * duration)
+            covered = np.bincount(rel, minlength=len(energy)) * float(duration)
+        if self._pending is not None:
+            if self._pending[0] == first:
+                energy[0] += self._pending[1]
+                covered[0] += self._pending[2]
+            else:
+                self._finish(self._pending[0], self._pending[1] / self._pending[2])
+        # 마지막 구간은 다음 세그먼트에서 이어질 수 있으므로 보류합니다.
+        self._pending = [first + len(energy) - 1, energy[-1], covered[-1]]
+        energy, covered = energy[:-1], covered[:-1]
+        has_data = covered > 0
+        if has_data.any():
+            demand = energy[has_data] / covered[has_data]
+            best = int(np.argmax(demand))
+            self.windows += int(has_data.sum())
+            self._finish(first + int(np.flatnonzero(has_data)[best]), float(demand[best]), count=False)
+
+    def _finish(self, window_index: int, demand: float, count: bool = True) -> None:
+        if count:
+            self.windows += 1
+        if demand > self.peak_w:
+            self.peak_w = demand
+            self.peak_at = int(window_index * self.window)
+
+    def close(self) -> None:
+        if self._pending is not None and self._pending[2] > 0:
+            self._finish(self._pending[0], self._pending[1] / self._pending[2])
+        self._pending = None
+
+
+class MeterAnalytics:
+    """계측기 하나의 분석값을 세그먼트(청크) 단위로 누적합니다."""
+    def __init__(self, resolution: int = 1, demand_window: int = DEMAND_WINDOW,
+                 pf_bins: Sequence[float] = PF_BINS):
+        self.resolution = resolution
+        self.pf_bins = np.asarray(pf_bins, dtype=np.float64)
+        self.energy_wh = 0.0
+        self.seconds = 0.0
+        self.first_t: Optional[int] = None
+        self.last_t: Optional[int] = None
+        self.register_first: Optional[float] = None
+        self.register_last: Optional[float] = None
+        self.pf_seconds = np.zeros(len(self.pf_bins) - 1)
+        self.demand = _DemandWindows(demand_window)
+
+    def covered(self, cols: Dict[str, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        레코드별로 덮은 시간 (초): 샘플 수 (1Hz 기준) 이며 버킷 길이를 넘지 않습니다.
+        count 가 없거나 1초 해상도면 (레코드마다 샘플이 1개 이상) 버킷 길이 스칼라를 반환합니다.
+        """
+        count = cols.get('count')
+        if count is None or self.resolution == 1:
+            return float(self.resolution)
+        return np.minimum(count, float(self.resolution))
+
+    def update(self, cols: Dict[str, np.ndarray]) -> None:
+        t, power, pf, energy = cols['t'], cols['power'], cols['pf'], cols['energy']
+        if not len(t):
+            return
+        if self.first_t is None:
+            self.first_t = int(t[0])
+        self.last_t = int(t[-1]) + self.resolution
+
+        seconds = self.covered(cols)
+        weighted = np.ndim(seconds) > 0
+        valid = ~np.isnan(power)
+        if weighted:
+            self.energy_wh += float((power[valid] * seconds[valid]).sum()) / 3600.0
+            self.seconds += float(seconds[valid].sum())
+        else:
+            self.energy_wh += float(power[valid].sum()) * seconds / 3600.0
+            self.seconds += float(valid.sum()) * seconds
+        self.demand.update(t, power, seconds)
+
+        pf_ok = ~np.isnan(pf)
+        # float32로 저장된 0.95 등이 경계 아래 구간으로 들어가지 않도록 반올림 후 나눕니다.
+        hist, _ = np.histogram(np.clip(np.round(np.abs(pf[pf_ok]), 4), 0.0, 1.0), bins=self.pf_bins,
+                               weights=seconds[pf_ok] if weighted else None)
+        self.pf_seconds += hist if weighted else hist * seconds
+
+        registers = energy[~np.isnan(energy)]
+        if len(registers):
+            if self.register_first is None:
+                self.register_first = float(registers[0])
+            self.register_last = float(registers[-1])
+
+    def result(self) -> Dict[str, Any]:
+        self.demand.close()
+        average_w = self.energy_wh * 3600.0 / self.seconds if self.seconds else 0.0
+        pf_total = self.pf_seconds.sum()
+        return {
+            'from': self.first_t,
+            'to': self.last_t,
+            'resolution': self.resolution,
+            'covered_seconds': self.seconds,
+            'energy_kwh': round(self.energy_wh / 1000.0, 4),
+            'register_kwh': None if self.register_first is None else round(self.register_last - self.register_first, 4),
+            'average_w': round(average_w, 2),
+            'peak_demand_w': round(self.demand.peak_w, 2),
+            'peak_demand_at': self.demand.peak_at,
+            'demand_windows': self.demand.windows,
+            'load_factor': round(average_w / self.demand.peak_w, 4) if self.demand.peak_w else None,
+            'pf_distribution': [
+                {'from': float(lo), 'to': float(hi), 'ratio': round(float(n / pf_total), 4) if pf_total else 0.0}
+                for lo, hi, n in zip(self.pf_bins[:-1], self.pf_bins[1:], self.pf_seconds)
+            ],
+        }
+
+
+class SiteAnalytics:
+    """여러 계측기(사이트)의 합산 수요와 계측기 간 전류 불평형을 누적합니다."""
+    def __init__(self, serials: Sequence[str], resolution: int = 1, demand_window: int = DEMAND_WINDOW):
+        self.serials = list(serials)
+        self.resolution = resolution
+        self.meters = {serial: MeterAnalytics(resolution, demand_window) for serial in self.serials}
+        self.site = MeterAnalytics(resolution, demand_window)
+        self.imbalance_sum = 0.0
+        self.imbalance_max = 0.0
+        self.imbalance_over = 0
+        self.aligned = 0
+
+    def update(self, chunk: Dict[str, Dict[str, np.ndarray]]) -> None:
+        """chunk: serial → 같은 시간 구간의 열 배열."""
+        for serial, cols in chunk.items():
+            self.meters[serial].update(cols)
+        present = [chunk[s] for s in self.serials if s in chunk and len(chunk[s]['t'])]
+        if len(present) != len(self.serials) or not present:
+            return
+
+        # 모든 계측기에 값이 있는 시각만 맞춰서 합산/불평형을 계산합니다.
+        common = present[0]['t']
+        aligned = all(len(cols['t']) == len(common) and np.array_equal(cols['t'], common) for cols in present[1:])
+        if not aligned:
+            for cols in present[1:]:
+                # 재시작 후 같은 시각의 레코드가 다시 기록될 수 있으므로 중복을 가정하지 않습니다.
+                common = np.intersect1d(common, cols['t'])
+            if not len(common):
+                return
+        power = np.zeros(len(common))
+        seconds: Union[float, np.ndarray] = float(self.resolution)
+        currents = np.empty((len(present), len(common)))
+        for i, cols in enumerate(present):
+            pos = slice(None) if aligned else np.searchsorted(cols['t'], common)
+            power += cols['power'][pos]
+            currents[i] = cols['current'][pos]
+            # 합산 구간은 모든 계측기가 함께 덮은 시간만큼으로 봅니다.
+            covered = self.site.covered(cols)
+            if np.ndim(covered):
+                seconds = np.minimum(seconds, covered[pos])
+        nan = np.full(len(common), np.nan)
+        site = {'t': common, 'power': power, 'pf': nan, 'energy': nan}
+        if np.ndim(seconds):
+            site['count'] = seconds
+        self.site.update(site)
+
+        if len(present) > 1:
+            mean = currents.mean(axis=0)
+            ok = mean > 0
+            imbalance = np.abs(currents[:, ok] - mean[ok]).max(axis=0) / mean[ok]
+            imbalance = imbalance[~np.isnan(imbalance)]
+            if len(imbalance):
+                self.imbalance_sum += float(imbalance.sum())
+                self.imbalance_max = max(self.imbalance_max, float(imbalance.max()))
+                self.imbalance_over += int((imbalance > IMBALANCE_LIMIT).sum())
+                self.aligned += len(imbalance)
+
+    def result(self) -> Dict[str, Any]:
+        site = self.site.result()
+        del site['pf_distribution'], site['register_kwh']
+        return {
+            'serials': self.serials,
+            'site': site,
+            'phase_imbalance': None if not self.aligned else {
+                'average': round(self.imbalance_sum / self.aligned, 4),
+                'max': round(self.imbalance_max, 4),
+                'over_limit_ratio': round(self.imbalance_over / self.aligned, 4),
+                'limit': IMBALANCE_LIMIT,
+            },
+            'meters': {serial: meter.result() for serial, meter in self.meters.items()},
+        }
+
+
+def choose_resolution(start: float, now: float, retention: Optional[Dict[int, int]] = None) -> int:
+    """구간 시작이 아직 보관 중인 가장 세밀한 해상도를 고릅니다."""
+    retention = retention or TimeSeriesStore().retention
+    for resolution in RESOLUTIONS:
+        if now - start <= retention[resolution]:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def analyze_meter(directory: str, serial: str, start: float, end: float, resolution: int = 1) -> Dict[str, Any]:
+    analytics = MeterAnalytics(resolution)
+    for cols in iter_columns(directory, serial, resolution, start, end):
+        analytics.update(cols)
+    return dict(analytics.result(), serial=serial)
+
+
+def analyze_site(directory: str, serials: Sequence[str], start: float, end: float, resolution: int = 1) -> Dict[str, Any]:
+    analytics = SiteAnalytics(serials, resolution)
+    span = SEGMENT_SPAN[resolution]
+    # 세그먼트 구간마다 모든 계측기를 읽어 시각을 맞춥니다.
+    for segment in range(int(start) // span, (int(np.ceil(end)) - 1) // span + 1):
+        seg_start, seg_end = max(start, segment * span), min(end, (segment + 1) * span)
+        chunk = {}
+        for serial in serials:
+            for cols in iter_columns(directory, serial, resolution, seg_start, seg_end):
+                chunk[serial] = cols
+        if chunk:
+            analytics.update(chunk)
+    return analytics.result()
+
+
+# --- 벤치마크: 1년치 1Hz 합성 데이터 ---
+if __name__ == '__main__':
+    import time
+
+    DAY = 86400
+    DAYS = 365
+    rng = np.random.default_rng(0)
+    base_t = 1735689600  # 2025-01-01T00:00:00Z
+
+    def synthetic_day(day: int, phase_shift: float = 0.0) -> Dict[str, np.ndarray]:
+        t = np.arange(base_t + day * DAY, base_t + (day + 1) * DAY, dtype=np.int64)
+        hours = (t % DAY) / 3600.0
+        power = 3000 + 2500 * np.sin((hours - 6 + phase_shift) / 24 * 2 * np.pi) + rng.normal(0, 300, DAY)
+        power = np.clip(power, 0, None)
+        return {
+            't': t, 'power': power, 'current': power / 230.0,
+            'pf': np.clip(rng.normal(0.93, 0.04, DAY), 0, 1),
+            'energy': np.cumsum(power) / 3.6e6 + day * 100.0,
+        }
+
+    # 생성 시간은 제외하고 분석 시간만 측정합니다.
+    meter = MeterAnalytics(resolution=1)
+    site = SiteAnalytics(['L1', 'L2', 'L3'], resolution=1)
+    meter_time = site_time = 0.0
+    for day in range(DAYS):
+        cols = synthetic_day(day)
+        began = time.perf_counter()
+        meter.update(cols)
+        meter_time += time.perf_counter() - began
+
+        chunk = {'L1': cols, 'L2': synthetic_day(day, 0.5), 'L3': synthetic_day(day, -0.5)}
+        began = time.perf_counter()
+        site.update(chunk)
+        site_time += time.perf_counter() - began
+
+    samples = DAYS * DAY
+    result = meter.result()
+    print(f"meter: {samples:,} samples in {meter_time:.2f}s ({samples / meter_time / 1e6:.1f}M samples/s)")
+    print(f"  energy {result['energy_kwh']} kWh, peak {result['peak_demand_w']} W "
+          f"({result['demand_windows']} windows), load factor {result['load_factor']}")
+    site_result = site.result()
+    print(f"site (3 meters): {3 * samples:,} samples in {site_time:.2f}s ({3 * samples / site_time / 1e6:.1f}M samples/s)")
+    print(f"  imbalance {site_result['phase_imbalance']}")
+
+    # 같은 계산(에너지 + 15분 최대 수요)을 파이썬 반복문으로 하루치만 수행해 비교합니다.
+    cols = synthetic_day(0)
+    began = time.perf_counter()
+    energy_wh, windows = 0.0, {}
+    for t, p in zip(cols['t'].tolist(), cols['power'].tolist()):
+        energy_wh += p / 3600.0
+        w = windows.setdefault(t // DEMAND_WINDOW, [0.0, 0])
+        w[0] += p
+        w[1] += 1
+    peak = max(s / n for s, n in windows.values())
+    loop_time = time.perf_counter() - began
+    print(f"python loop (1 day): {DAY / loop_time / 1e6:.2f}M samples/s")
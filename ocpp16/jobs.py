@@ -0,0 +1,165 @@
+# jobs.py
+"""
+/send 요청을 비동기 작업(job)으로 실행하고 상태를 조회하기 위한 관리자.
+
+POST /send 는 작업 ID를 즉시 반환하고, 호출자는 폴링/롱폴링/SSE로 상태를 확인하거나
+callbackUrl을 지정해 완료 시 통지를 받을 수 있습니다.
+callbackUrl 은 callback_allowlist 에 등록된 (scheme, host[:port]) 만 허용합니다 (내부 주소로의 SSRF 방지).
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Deque, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from ocpp16 import codec
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+class Job:
+    def __init__(self, message_id: str, charger_id: str, data: dict, callback_url: Optional[str] = None,
+                 job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.message_id = message_id
+        self.charger_id = charger_id
+        self.data = data
+        self.callback_url = callback_url
+        self.status = PENDING
+        self.result: Optional[dict] = None
+        self.error: Any = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        return {
+            'jobId': self.id,
+            'messageId': self.message_id,
+            'chargerId': self.charger_id,
+            'data': self.data,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    작업을 asyncio Task로 실행하고, 끝난 작업은 retention 초 동안 조회할 수 있게 보관합니다.
+
+    작업 코루틴이 반환한 dict에 "error" 키가 있으면 failed, 없으면 succeeded로 기록합니다.
+    """
+    def __init__(self, retention: float = 600.0, callback_timeout: float = 5.0, id_prefix: str = '',
+                 callback_allowlist: Iterable[Tuple[str, str]] = ()):
+        self.retention = retention
+        self.id_prefix = id_prefix  # 여러 worker 로 실행할 때 작업을 만든 worker 를 ID 로 알 수 있게 합니다.
+        self.callback_timeout = callback_timeout
+        self.callback_allowlist = {(scheme.lower(), netloc.lower()) for scheme, netloc in callback_allowlist}
+        self._jobs: Dict[str, Job] = {}
+        self._finished: Deque[Tuple[float, str]] = deque()
+        self._tasks = set()
+
+    def callback_allowed(self, url: str) -> bool:
+        """callbackUrl 의 (scheme, host[:port]) 가 허용 목록에 있는지 확인합니다. 사용자 정보가 들어간 URL 은 거부합니다."""
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return False
+        if parts.username is not None or parts.password is not None:
+            return False
+        return (parts.scheme.lower(), parts.netloc.lower()) in self.callback_allowlist
+
+    def submit(self, work: Awaitable[dict], message_id: str, charger_id: str, data: dict,
+               callback_url: Optional[str] = None, job_id: Optional[str] = None) -> Job:
+        """작업을 등록합니다. 허용되지 않은 callback_url 이면 ValueError (work 는 실행하지 않음)."""
+        if callback_url and not self.callback_allowed(callback_url):
+            if asyncio.iscoroutine(work):
+                work.close()
+            raise ValueError(f"callbackUrl not allowed: {callback_url}")
+        self._prune()
+        job = Job(message_id, charger_id, data, callback_url, job_id or self.id_prefix + uuid.uuid4().hex)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, work))
+        # Task가 GC되지 않도록 완료 시까지 참조를 유지합니다.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """작업이 끝나거나 timeout 초가 지날 때까지 기다립니다 (롱폴링)."""
+        if not job.finished and timeout > 0:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def events(self, job: Job, keepalive: float = 15.0) -> AsyncIterator[str]:
+        """작업 상태를 SSE 형식으로 내보냅니다. 끝날 때까지 keepalive 주석을 보냅니다."""
+        yield f"event: status\ndata: {codec.dumps(job.to_dict())}\n\n"
+        if job.finished:
+            return
+        while not job.finished:
+            try:
+                await asyncio.wait_for(job.done.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+        yield f"event: status\ndata: {codec.dumps(job.to_dict())}\n\n"
+
+    async def _run(self, job: Job, work: Awaitable[dict]) -> None:
+        job.status = RUNNING
+        try:
+            result = await work
+            if isinstance(result, dict) and 'error' in result:
+                job.status, job.error = FAILED, result['error']
+            else:
+                job.status = SUCCEEDED
+            job.result = result
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+        finally:
+            if not job.finished:
+                # 작업이 취소된 경우
+                job.status, job.error = FAILED, 'cancelled'
+            job.finished_at = time.time()
+            self._finished.append((job.finished_at, job.id))
+            job.done.set()
+
+        if job.callback_url:
+            await self._notify(job)
+
+    async def _notify(self, job: Job) -> None:
+        """
+        완료된 작업을 callbackUrl로 POST 합니다. 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+        허용한 주소에서 다른 주소로 넘어가지 않도록 redirect 는 따라가지 않습니다.
+        """
+        try:
+            await asyncio.to_thread(
+                requests.post, job.callback_url, json=job.to_dict(), timeout=self.callback_timeout,
+                allow_redirects=False
+            )
+        except Exception as e:
+            print(f"[JOB] {job.id} callback 전송 실패 ({job.callback_url}): {e}")
+
+    def _prune(self) -> None:
+        expire_before = time.time() - self.retention
+        while self._finished and self._finished[0][0] < expire_before:
+            _, job_id = self._finished.popleft()
+            self._jobs.pop(job_id, None)
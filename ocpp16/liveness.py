@@ -0,0 +1,172 @@
+# liveness.py
+"""
+충전기 연결 생존 확인 (hashed timer wheel).
+
+Heartbeat 등 프레임을 받을 때마다 seen() 으로 마감 시각을 다시 설정합니다 (O(1)).
+타이머 휠은 tick 마다 해당 슬롯 하나만 확인하므로 충전기 수가 많아도 전체를 훑지 않습니다.
+
+    online  --(stale_after 초 동안 프레임 없음)-->  stale  --(offline_after 초)-->  offline (on_offline 호출)
+
+    $ python -m ocpp16.liveness     # 50,000 대 재설정/만료 처리 시간 측정
+"""
+import asyncio
+import math
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+ONLINE = 'online'
+STALE = 'stale'
+
+
+class TimerWheel:
+    """
+    slots 개의 슬롯을 가진 타이머 휠. 키마다 만료 tick 하나만 유지하며,
+    slots * tick 초보다 긴 타이머는 슬롯을 여러 바퀴 돈 뒤에 만료됩니다.
+    """
+    def __init__(self, tick: float = 1.0, slots: int = 512, now: Optional[float] = None):
+        self.tick = tick
+        self.slots: List[Set[Hashable]] = [set() for _ in range(slots)]
+        self.expiry: Dict[Hashable, int] = {}  # 키 → 만료 tick
+        self.current = int((time.monotonic() if now is None else now) / tick)
+
+    def __len__(self) -> int:
+        return len(self.expiry)
+
+    def arm(self, key: Hashable, timeout: float) -> None:
+        expires = self.current + max(1, math.ceil(timeout / self.tick))
+        old = self.expiry.get(key)
+        if old == expires:
+            return
+        if old is not None:
+            self.slots[old % len(self.slots)].discard(key)
+        self.expiry[key] = expires
+        self.slots[expires % len(self.slots)].add(key)
+
+    def cancel(self, key: Hashable) -> None:
+        old = self.expiry.pop(key, None)
+        if old is not None:
+            self.slots[old % len(self.slots)].discard(key)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """now 까지의 tick 을 진행하고 만료된 키 목록을 반환합니다 (만료된 키는 휠에서 제거)."""
+        target = int(now / self.tick)
+        expired = []
+        # 오래 멈춰 있었더라도 슬롯을 한 바퀴 넘게 돌 필요는 없습니다.
+        start = max(self.current + 1, target - len(self.slots) + 1)
+        for tick in range(start, target + 1):
+            slot = self.slots[tick % len(self.slots)]
+            due = [key for key in slot if self.expiry[key] <= target]
+            for key in due:
+                slot.discard(key)
+                del self.expiry[key]
+            expired.extend(due)
+        self.current = max(self.current, target)
+        return expired
+
+
+class LivenessTracker:
+    def __init__(self, stale_after: float, offline_after: float,
+                 on_offline: Optional[Callable[[str], Any]] = None,
+                 on_change: Optional[Callable[[str, Optional[str]], Any]] = None, tick: float = 1.0):
+        self.stale_after = stale_after
+        self.offline_after = offline_after
+        self.on_offline = on_offline
+        self.on_change = on_change  # (charger_id, 새 상태: online/stale/None=offline)
+        self.wheel = TimerWheel(tick, slots=max(64, math.ceil(offline_after / tick) + 1))
+        self.state: Dict[str, str] = {}
+        self.counts = {ONLINE: 0, STALE: 0}
+        self.reaped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _set_state(self, charger_id: str, state: Optional[str]) -> None:
+        old = self.state.get(charger_id)
+        if old == state:
+            return
+        if old is not None:
+            self.counts[old] -= 1
+        if state is None:
+            self.state.pop(charger_id, None)
+        else:
+            self.state[charger_id] = state
+            self.counts[state] += 1
+        if self.on_change is not None:
+            self.on_change(charger_id, state)
+
+    def seen(self, charger_id: str) -> None:
+        """충전기에서 프레임을 받았을 때 호출합니다."""
+        self.wheel.arm(charger_id, self.stale_after)
+        if self.state.get(charger_id) != ONLINE:
+            self._set_state(charger_id, ONLINE)
+
+    def remove(self, charger_id: str) -> None:
+        """연결이 끊긴 충전기를 추적에서 제외합니다."""
+        self.wheel.cancel(charger_id)
+        self._set_state(charger_id, None)
+
+    def advance(self, now: Optional[float] = None) -> Tuple[List[str], List[str]]:
+        """만료를 처리하고 (stale 이 된 목록, offline 이 된 목록)을 반환합니다."""
+        now = time.monotonic() if now is None else now
+        stale, offline = [], []
+        for charger_id in self.wheel.advance(now):
+            if self.state.get(charger_id) == ONLINE:
+                self._set_state(charger_id, STALE)
+                self.wheel.arm(charger_id, self.offline_after - self.stale_after)
+                stale.append(charger_id)
+            else:
+                self._set_state(charger_id, None)
+                offline.append(charger_id)
+        for charger_id in offline:
+            self.reaped += 1
+            if self.on_offline is not None:
+                self.on_offline(charger_id)
+        return stale, offline
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            try:
+                self.advance()
+            except Exception as e:
+                print(f"[LIVENESS] error: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {'online': self.counts[ONLINE], 'stale': self.counts[STALE], 'reaped': self.reaped}
+
+
+# --- 사용 예시 ---
+if __name__ == '__main__':
+    N = 50_000
+    tracker = LivenessTracker(stale_after=270, offline_after=450)
+    t0 = time.monotonic()
+    chargers = [f"CP{i:06d}" for i in range(N)]
+
+    started = time.perf_counter()
+    for cid in chargers:
+        tracker.seen(cid)
+    for cid in chargers:  # 모든 충전기의 Heartbeat 한 번 더 (같은 tick 이면 재설정 생략)
+        tracker.seen(cid)
+    print(f"seen x {2 * N}: {(time.perf_counter() - started) * 1e6 / (2 * N):.2f} us/call")
+
+    # 1초 tick 300번 진행: 만료가 없는 tick 은 빈 슬롯 하나만 확인합니다.
+    started = time.perf_counter()
+    for sec in range(1, 260):
+        tracker.advance(t0 + sec)
+    print(f"259 idle ticks: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+    # 절반만 Heartbeat 를 보내고 나머지는 stale → offline
+    for cid in chargers[::2]:
+        tracker.seen(cid)
+    started = time.perf_counter()
+    stale, _ = tracker.advance(t0 + 280)
+    _, offline = tracker.advance(t0 + 460)
+    print(f"stale {len(stale)}, offline {len(offline)} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(tracker.stats())
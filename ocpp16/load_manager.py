@@ -0,0 +1,268 @@
+# load_manager.py
+"""
+전력 계측기(pm_devices) 전류 기반 동적 부하 관리.
+
+계측기 측정 전류가 maxcurrent(계약 전류)를 넘지 않도록, 연결된 충전기들의 전류 한도 합계를
+폐루프로 조정해 OCPP SetChargingProfile(ChargePointMaxProfile)로 보냅니다.
+
+    total_limit(다음) = total_limit(현재) + (maxcurrent - margin - 측정 전류)
+
+- 측정값이 들어오면 곧바로 제어 주기를 깨워 반응 시간을 control_interval 이하로 유지합니다.
+- 여유(headroom)는 새 측정값마다 한 번만 더합니다. 새 측정값 없이 도는 제어 주기는 이전 합계를 그대로 나눕니다.
+- 여유/초과가 hysteresis(A) 미만이면 한도를 바꾸지 않습니다. 초과(과부하)일 때는 항상 줄입니다.
+- 충전기별로 마지막으로 보낸 한도와 같으면 다시 보내지 않습니다.
+- 등록된 계측기의 측정값이 stale_after 초 이상 없으면 모든 충전기를 min_current로 제한합니다 (fail-safe).
+  등록된 계측기가 하나도 없으면 아무 한도도 보내지 않습니다.
+
+    $ python -m ocpp16.load_manager     # 모의 계측기/충전기로 동작 확인
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ocpp16.meter_stream import stream_key
+
+CHARGING_PROFILE_ID = 700  # 부하 관리 전용 ChargePointMaxProfile ID
+
+
+def charge_point_max_profile(limit: float, profile_id: int = CHARGING_PROFILE_ID) -> dict:
+    """충전기 전체(connectorId 0) 전류 한도 SetChargingProfile payload."""
+    return {
+        "connectorId": 0,
+        "csChargingProfiles": {
+            "chargingProfileId": profile_id,
+            "stackLevel": 0,
+            "chargingProfilePurpose": "ChargePointMaxProfile",
+            "chargingProfileKind": "Relative",
+            "chargingSchedule": {
+                "chargingRateUnit": "A",
+                "chargingSchedulePeriod": [{"startPeriod": 0, "limit": limit}],
+            },
+        },
+    }
+
+
+class LoadManager:
+    """
+    send_profile(charger_id, limit) 은 SetChargingProfile을 보내는 코루틴,
+    meter_limits() 는 {계측기 serial: maxcurrent}, chargers() 는 연결된 충전기 ID 목록을 반환합니다.
+    """
+    def __init__(self, send_profile: Callable[[str, float], Awaitable[None]],
+                 meter_limits: Callable[[], Dict[str, float]], chargers: Callable[[], List[str]],
+                 min_current: float = 6.0, max_current: float = 32.0, margin: float = 1.0,
+                 hysteresis: float = 1.0, control_interval: float = 0.5, stale_after: float = 10.0,
+                 send_timeout: float = 5.0):
+        self.send_profile = send_profile
+        self.meter_limits = meter_limits
+        self.chargers = chargers
+        self.min_current = min_current
+        self.max_current = max_current
+        self.margin = margin
+        self.hysteresis = hysteresis
+        self.control_interval = control_interval
+        self.stale_after = stale_after
+        self.send_timeout = send_timeout
+
+        self.total_limit: Optional[float] = None
+        self.last_sent: Dict[str, float] = {}
+        self._readings: Dict[str, Tuple[float, float]] = {}  # serial → (전류, 수신 시각)
+        self._reading_seq = 0  # on_reading 호출 횟수
+        self._applied_seq = 0  # total_limit 에 마지막으로 반영한 _reading_seq
+        self._oldest_unhandled: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+        self.reaction_max = 0.0
+        self.reaction_last = 0.0
+
+    # =======================================================
+    # 입력
+    # =======================================================
+
+    def on_reading(self, serial: str, current: float, received_at: Optional[float] = None) -> None:
+        received_at = time.monotonic() if received_at is None else received_at
+        self._readings[serial] = (float(current), received_at)
+        self._reading_seq += 1
+        if self._oldest_unhandled is None:
+            self._oldest_unhandled = received_at
+        self._wakeup.set()
+
+    def on_charger_connected(self, charger_id: str) -> None:
+        self.last_sent.pop(charger_id, None)
+        self._wakeup.set()
+
+    def on_charger_disconnected(self, charger_id: str) -> None:
+        self.last_sent.pop(charger_id, None)
+        self._wakeup.set()
+
+    # =======================================================
+    # 제어
+    # =======================================================
+
+    def _headroom(self, now: float) -> Optional[float]:
+        """계측기별 (maxcurrent - margin - 전류) 중 가장 작은 값. 유효한 측정값이 없으면 None."""
+        headroom = None
+        for serial, max_current in self.meter_limits().items():
+            reading = self._readings.get(serial)
+            if reading is None or now - reading[1] > self.stale_after:
+                continue
+            value = float(max_current) - self.margin - reading[0]
+            headroom = value if headroom is None else min(headroom, value)
+        return headroom
+
+    def compute_limits(self, chargers: List[str], now: Optional[float] = None) -> Dict[str, float]:
+        now = time.monotonic() if now is None else now
+        if not chargers or not self.meter_limits():
+            # 부하를 관리할 계측기가 없으면 한도를 두지 않습니다.
+            self.total_limit = None
+            return {}
+        floor_total = 0.0
+        ceiling_total = self.max_current * len(chargers)
+        headroom = self._headroom(now)
+        if headroom is None:
+            # 등록된 계측기의 측정값이 없거나 오래됨: 최소 전류로 제한합니다.
+            self.total_limit = None
+            return {cid: self.min_current for cid in chargers}
+
+        if self.total_limit is None or self._applied_seq != self._reading_seq:
+            # 같은 측정값의 여유를 제어 주기마다 다시 더하면 한도가 계속 늘어나거나 줄어듭니다.
+            current_total = self.total_limit if self.total_limit is not None else self.min_current * len(chargers)
+            if headroom < 0 or abs(headroom) >= self.hysteresis:
+                current_total = current_total + headroom
+            self._applied_seq = self._reading_seq
+        else:
+            current_total = self.total_limit
+        self.total_limit = min(max(current_total, floor_total), ceiling_total)
+
+        # 최소 충전 전류를 줄 수 있는 충전기 수만큼만 나누고, 나머지는 0A(일시 정지)로 둡니다.
+        ordered = sorted(chargers)
+        active = min(len(ordered), int(self.total_limit // self.min_current))
+        limits = {cid: 0.0 for cid in ordered}
+        if active:
+            share = min(self.total_limit / active, self.max_current)
+            share = int(share * 10) / 10  # 0.1A 단위 내림
+            for cid in ordered[:active]:
+                limits[cid] = share
+        return limits
+
+    async def _send(self, charger_id: str, limit: float) -> None:
+        try:
+            await asyncio.wait_for(self.send_profile(charger_id, limit), self.send_timeout)
+            self.last_sent[charger_id] = limit
+            self.sent += 1
+        except Exception as e:
+            # 다음 제어 주기에 다시 보냅니다.
+            self.last_sent.pop(charger_id, None)
+            self.failed += 1
+            print(f"[LOAD] {charger_id} SetChargingProfile {limit}A 실패: {e}")
+
+    async def control_once(self) -> Dict[str, float]:
+        triggered_at = self._oldest_unhandled
+        self._oldest_unhandled = None
+        limits = self.compute_limits(self.chargers())
+        changes = {cid: limit for cid, limit in limits.items()
+                   if cid not in self.last_sent or abs(self.last_sent[cid] - limit) >= 0.05}
+        self.skipped += len(limits) - len(changes)
+        if changes:
+            await asyncio.gather(*(self._send(cid, limit) for cid, limit in changes.items()))
+            if triggered_at is not None:
+                self.reaction_last = time.monotonic() - triggered_at
+                self.reaction_max = max(self.reaction_max, self.reaction_last)
+        return changes
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.control_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.control_once()
+            except Exception as e:
+                print(f"[LOAD] control error: {e}")
+            # 측정값이 몰려 와도 최소 제어 간격을 지킵니다.
+            await asyncio.sleep(self.control_interval / 5)
+
+    async def follow_meters(self, redis_factory, block_ms: int = 200, reconnect_delay: float = 3.0) -> None:
+        """등록된 계측기의 Redis Stream을 읽어 on_reading으로 넘깁니다."""
+        last_ids: Dict[str, str] = {}
+        while True:
+            try:
+                redis_conn = redis_factory()
+                while True:
+                    serials = list(self.meter_limits())
+                    for serial in serials:
+                        last_ids.setdefault(stream_key(serial), '$')
+                    if not serials:
+                        await asyncio.sleep(self.stale_after)
+                        continue
+                    streams = {stream_key(s): last_ids[stream_key(s)] for s in serials}
+                    result = await redis_conn.xread(streams, count=100, block=block_ms)
+                    for key, entries in result or ():
+                        last_ids[key] = entries[-1][0]
+                        fields = entries[-1][1]  # 가장 최근 측정값만 사용합니다.
+                        if fields.get('current') is not None:
+                            self.on_reading(key[len(stream_key('')):], float(fields['current']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[LOAD] meter stream error: {e}, retrying in {reconnect_delay}s")
+            await asyncio.sleep(reconnect_delay)
+
+    def start(self, redis_factory=None) -> None:
+        """제어 루프(와 redis_factory 지정 시 계측기 스트림 수신)를 시작합니다."""
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self.run()))
+        if redis_factory is not None:
+            self._tasks.append(asyncio.create_task(self.follow_meters(redis_factory)))
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def stop(self) -> None:
+        """제어를 멈추고 상태를 비웁니다. 다시 start 하면 모든 충전기에 한도를 새로 보냅니다."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self.total_limit = None
+        self.last_sent.clear()
+        self._readings.clear()
+
+    def stats(self) -> dict:
+        return {
+            'total_limit': self.total_limit, 'last_sent': dict(self.last_sent),
+            'sent': self.sent, 'skipped': self.skipped, 'failed': self.failed,
+            'reaction_last_ms': round(self.reaction_last * 1000, 1),
+            'reaction_max_ms': round(self.reaction_max * 1000, 1),
+        }
+
+
+# --- 사용 예시: 계약 전류 40A, 가정 부하 10~25A, 충전기 2대 ---
+if __name__ == '__main__':
+    async def main() -> None:
+        chargers = ['CP1', 'CP2']
+        ev_draw: Dict[str, float] = {cid: 0.0 for cid in chargers}
+
+        async def send_profile(charger_id: str, limit: float) -> None:
+            await asyncio.sleep(0.02)  # 충전기 응답 지연
+            ev_draw[charger_id] = limit  # EV는 한도만큼 전류를 사용한다고 가정
+            print(f"  → {charger_id} {limit}A")
+
+        manager = LoadManager(send_profile, lambda: {'PM1': 40.0}, lambda: chargers, control_interval=0.2)
+        runner = asyncio.create_task(manager.run())
+        for step in range(30):
+            house = 10.0 if step < 15 else 25.0
+            site = house + sum(ev_draw.values())
+            manager.on_reading('PM1', site)
+            await asyncio.sleep(0.2)
+            print(f"step {step:2d}: house {house}A, site {site:.1f}A, total limit {manager.total_limit}")
+        runner.cancel()
+        print(manager.stats())
+
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+# meter_protocol.py
+"""
+전력 계측기 → pm_server TCP 스트림 프레임 형식과 증분 디코더.
+
+두 가지 프레임을 한 스트림에 섞어 보낼 수 있습니다.
+- JSON: 측정값 하나를 JSON 객체 한 줄로 보냅니다 (줄바꿈 구분, NDJSON).
+  줄바꿈 없이 객체만 이어 보내는 기존 계측기도 처리합니다 (이 경우 binary와 섞어 쓰지 않습니다).
+- binary: 0xA5로 시작하는 고정 길이(49바이트) 레코드. JSON보다 약 1/3 크기입니다.
+
+    offset  size  field
+    0       1     magic (0xA5)
+    1       16    serial (ASCII, 0으로 채움)
+    17      4     voltage   (float32, V)
+    21      4     current   (float32, A)
+    25      4     power     (float32, W)
+    29      8     energy    (float64, kWh)
+    37      4     frequency (float32, Hz)
+    41      4     pf        (float32)
+    45      4     timestamp (uint32, UNIX 초)
+
+모든 값은 little-endian 입니다. 형식은 UDP 검색 단계에서 정합니다:
+계측기가 {"type": "meter", "serial": ..., "formats": ["binary", "json"]} 를 보내면
+서버는 응답에 "format" 을 담아 돌려줍니다. formats가 없는 기존 계측기는 JSON을 사용합니다.
+
+    $ python -m ocpp16.meter_protocol     # 크기/디코딩 속도 비교
+"""
+import json
+import struct
+from typing import Any, Dict, Iterable, List, Optional
+
+FORMAT_JSON = 'json'
+FORMAT_BINARY = 'binary'
+SUPPORTED_FORMATS = (FORMAT_BINARY, FORMAT_JSON)  # 서버 선호 순서
+
+BINARY_MAGIC = 0xA5
+BINARY_RECORD = struct.Struct('<B16sfffdffI')
+SERIAL_SIZE = 16
+
+
+class FrameBufferOverflow(Exception):
+    """완성되지 않은 프레임이 max_buffer 보다 커졌을 때 발생합니다."""
+
+
+def negotiate_format(offered: Optional[Iterable[str]]) -> str:
+    """계측기가 제안한 형식 중 서버가 선호하는 형식을 고릅니다. 제안이 없으면 JSON."""
+    offered = set(offered or ())
+    for fmt in SUPPORTED_FORMATS:
+        if fmt in offered:
+            return fmt
+    return FORMAT_JSON
+
+
+def encode_json(reading: Dict[str, Any]) -> bytes:
+    return json.dumps(reading, separators=(',', ':')).encode() + b'\n'
+
+
+def encode_binary(reading: Dict[str, Any]) -> bytes:
+    serial = str(reading.get('serial', '')).encode('ascii')
+    if len(serial) > SERIAL_SIZE:
+        raise ValueError(f"serial longer than {SERIAL_SIZE} bytes: {reading.get('serial')}")
+    return BINARY_RECORD.pack(
+        BINARY_MAGIC, serial,
+        reading['voltage'], reading['current'], reading['power'], reading['energy'],
+        reading['frequency'], reading['pf'], int(reading['timestamp']),
+    )
+
+
+def _decode_binary(data, offset: int) -> Dict[str, Any]:
+    _, serial, voltage, current, power, energy, frequency, pf, timestamp = BINARY_RECORD.unpack_from(data, offset)
+    return {
+        'serial': serial.rstrip(b'\0').decode('ascii', errors='replace'),
+        # float32 값은 유효 자릿수(약 7자리) 밖의 오차가 저장/전송되지 않도록 반올림합니다.
+        'voltage': round(voltage, 3), 'current': round(current, 4), 'power': round(power, 2),
+        'energy': energy, 'frequency': round(frequency, 3), 'pf': round(pf, 4), 'timestamp': timestamp,
+    }
+
+
+class MeterStreamDecoder:
+    """
+    연결별 증분 디코더. feed()에 받은 바이트를 넣으면 완성된 측정값을 모두 반환하고,
+    끝이 잘린 프레임은 다음 feed() 까지 보관합니다.
+
+    해석할 수 없는 줄은 버리고 errors를 증가시킵니다.
+    """
+    def __init__(self, max_buffer: int = 64 * 1024):
+        self.max_buffer = max_buffer
+        self.errors = 0
+        self._buffer = bytearray()
+        self._json = json.JSONDecoder()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        buf = self._buffer
+        buf += data
+        readings: List[Dict[str, Any]] = []
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            first = buf[pos]
+            if first == BINARY_MAGIC:
+                if size - pos < BINARY_RECORD.size:
+                    break
+                readings.append(_decode_binary(buf, pos))
+                pos += BINARY_RECORD.size
+            elif first in b' \t\r\n':
+                pos += 1
+            else:
+                newline = buf.find(b'\n', pos)
+                if newline < 0:
+                    # 줄바꿈 없이 보내는 기존 계측기: 객체가 완성되었으면 꺼냅니다.
+                    reading, end = self._decode_unterminated(buf, pos)
+                    if end == pos:
+                        break
+                    if reading is not None:
+                        readings.append(reading)
+                    pos = end
+                    continue
+                try:
+                    line = bytes(buf[pos:newline])
+                    text = line.decode()
+                    reading, end = self._json.raw_decode(text)
+                    # 한 줄에 객체가 여러 개 붙어 있는 경우
+                    while True:
+                        if isinstance(reading, dict):
+                            readings.append(reading)
+                        else:
+                            self.errors += 1
+                        rest = text[end:].lstrip()
+                        if not rest:
+                            break
+                        text = rest
+                        reading, end = self._json.raw_decode(text)
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    self.errors += 1
+                pos = newline + 1
+
+        if pos:
+            del buf[:pos]
+        if len(buf) > self.max_buffer:
+            pending = len(buf)
+            buf.clear()
+            raise FrameBufferOverflow(f"{pending} bytes without a complete frame")
+        return readings
+
+    def _decode_unterminated(self, buf: bytearray, pos: int):
+        # 객체의 끝('}')이 아직 도착하지 않았으면 해석을 시도하지 않습니다.
+        if buf.find(b'}', pos) < 0:
+            return None, pos
+        try:
+            text = bytes(buf[pos:]).decode()
+            reading, end = self._json.raw_decode(text)
+        except UnicodeDecodeError as e:
+            if e.reason == 'unexpected end of data':
+                return None, pos  # 여러 바이트 문자가 잘려서 도착한 경우
+            return None, self._skip_broken(buf, pos, pos + e.start)
+        except json.JSONDecodeError as e:
+            if e.pos >= len(text):
+                return None, pos  # 중첩 객체의 '}' 만 도착하고 나머지는 아직 오는 중
+            return None, self._skip_broken(buf, pos, pos + len(text[:e.pos].encode()))
+        consumed = len(text[:end].encode())
+        if not isinstance(reading, dict):
+            self.errors += 1
+            return None, pos + consumed
+        return reading, pos + consumed
+
+    def _skip_broken(self, buf: bytearray, pos: int, error_at: int) -> int:
+        """해석할 수 없는 객체를 오류 위치 뒤의 첫 '}' 까지 버리고 다음 프레임부터 다시 읽습니다."""
+        self.errors += 1
+        close = buf.find(b'}', error_at)
+        if close < 0:
+            close = buf.find(b'}', pos)
+        return close + 1
+
+
+# --- 크기/디코딩 속도 비교 ---
+if __name__ == '__main__':
+    import time
+
+    sample = {"serial": "PM10200787", "voltage": 229.41, "current": 31.825, "power": 7301.2,
+              "energy": 1234.567, "frequency": 60.0, "pf": 0.99, "timestamp": 1735732800}
+    COUNT = 100_000
+    CHUNK = 1460  # TCP 세그먼트 크기 정도로 잘라서 넣습니다.
+
+    for name, encode in ((FORMAT_JSON, encode_json), (FORMAT_BINARY, encode_binary)):
+        stream = encode(sample) * COUNT
+        decoder = MeterStreamDecoder()
+        started = time.perf_counter()
+        decoded = 0
+        for i in range(0, len(stream), CHUNK):
+            decoded += len(decoder.feed(stream[i:i + CHUNK]))
+        elapsed = time.perf_counter() - started
+        print(f"{name:<7} {len(encode(sample)):>4} bytes/reading, "
+              f"{decoded} readings in {elapsed:.3f}s ({decoded / elapsed:,.0f}/s), errors {decoder.errors}")
@@ -0,0 +1,173 @@
+# meter_stream.py
+"""
+계측기 측정값의 Redis Streams 저장.
+
+계측기마다 스트림 하나(meter:<serial>)에 측정값 전체 필드를 XADD 하며, MAXLEN(근사치)으로 길이를 제한합니다.
+구독 중이 아니던 소비자도 마지막으로 읽은 ID부터 다시 읽거나(XREAD) 소비자 그룹(XREADGROUP)으로 나눠 읽을 수 있습니다.
+기존 대시보드와의 호환을 위해 energy_updates 채널 PUBLISH도 같은 파이프라인에서 함께 보냅니다.
+
+    $ python -m ocpp16.meter_stream PM10200787    # 스트림 내용 출력
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+STREAM_PREFIX = 'meter:'
+STREAMS_KEY = 'meter:streams'     # 스트림이 있는 계측기 serial 집합
+STREAM_MAXLEN = 100_000           # 계측기별 보관 건수 (1초 주기 기준 약 하루)
+ENERGY_CHANNEL = 'energy_updates'
+
+READING_FIELDS = ('voltage', 'current', 'power', 'energy', 'frequency', 'pf')
+
+
+def stream_key(serial: str) -> str:
+    return f"{STREAM_PREFIX}{serial}"
+
+
+def encode_fields(reading: Dict[str, Any], received_at: Optional[float] = None) -> Dict[str, Any]:
+    """XADD 필드로 변환합니다. 값이 없는 필드는 제외합니다."""
+    fields = {k: reading[k] for k in READING_FIELDS if reading.get(k) is not None}
+    if reading.get('timestamp') is not None:
+        fields['timestamp'] = reading['timestamp']
+    fields['received'] = round(received_at if received_at is not None else time.time(), 3)
+    return fields
+
+
+def decode_fields(fields: Dict[str, str]) -> Dict[str, Any]:
+    """스트림 항목의 필드(문자열)를 숫자로 되돌립니다."""
+    reading: Dict[str, Any] = {}
+    for key, value in fields.items():
+        try:
+            reading[key] = float(value)
+        except (TypeError, ValueError):
+            reading[key] = value
+    return reading
+
+
+async def ensure_group(redis_conn, serial: str, group: str, start_id: str = '0') -> None:
+    """소비자 그룹을 만듭니다. 이미 있으면 무시합니다."""
+    try:
+        await redis_conn.xgroup_create(stream_key(serial), group, id=start_id, mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+class StreamBatchWriter:
+    """
+    측정값을 큐에 모았다가 batch_size 건 또는 flush_interval 초마다 파이프라인 한 번으로 기록합니다.
+
+    submit()은 대기하지 않으며, 큐가 가득 차면 측정값을 버리고 dropped를 증가시킵니다.
+    Redis 오류가 나면 해당 배치를 버리고 다음 배치를 계속 처리합니다.
+    """
+    def __init__(self, redis_conn, maxlen: int = STREAM_MAXLEN, batch_size: int = 256,
+                 flush_interval: float = 0.05, max_queue: int = 10000,
+                 publish_channel: Optional[str] = ENERGY_CHANNEL):
+        self.redis = redis_conn
+        self.maxlen = maxlen
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.publish_channel = publish_channel
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.flush_time_max = 0.0
+        self._known_serials = set()
+
+    def submit(self, reading: Dict[str, Any]) -> bool:
+        try:
+            self.queue.put_nowait(reading)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def _collect(self) -> List[Dict[str, Any]]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        received_at = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        new_serials = []
+        added = 0
+        for reading in batch:
+            serial = reading.get('serial')
+            if not serial:
+                continue
+            added += 1
+            pipe.xadd(stream_key(serial), encode_fields(reading, received_at),
+                      maxlen=self.maxlen, approximate=True)
+            if serial not in self._known_serials:
+                new_serials.append(serial)
+            if self.publish_channel and reading.get('current') is not None:
+                pipe.publish(self.publish_channel, f"{reading['current']:.3f}A")
+        if new_serials:
+            pipe.sadd(STREAMS_KEY, *new_serials)
+        try:
+            await pipe.execute()
+            self._known_serials.update(new_serials)
+            self.written += added
+        except Exception as e:
+            self.errors += 1
+            print(f"[STREAM] 배치 기록 실패 ({len(batch)}건): {e}")
+        self.batches += 1
+        self.flush_time_max = max(self.flush_time_max, time.perf_counter() - started)
+
+    async def run(self) -> None:
+        while True:
+            await self.write_batch(await self._collect())
+
+    async def close(self) -> None:
+        """큐에 남은 측정값을 기록합니다."""
+        while not self.queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self.write_batch(batch)
+
+    def report(self) -> str:
+        line = (f"[STREAM] written {self.written}, batches {self.batches}, queued {self.queue.qsize()}, "
+                f"dropped {self.dropped}, errors {self.errors}, flush max {self.flush_time_max * 1000:.2f}ms")
+        self.flush_time_max = 0.0
+        return line
+
+
+# --- 사용 예시: 스트림 읽기 ---
+if __name__ == '__main__':
+    import sys
+    import redis.asyncio as aioredis
+
+    async def main(serial: str) -> None:
+        redis_conn = aioredis.Redis(decode_responses=True)
+        # 처음부터 10건
+        for entry_id, fields in await redis_conn.xrange(stream_key(serial), count=10):
+            print(entry_id, decode_fields(fields))
+        # 마지막 ID 이후의 새 측정값을 기다리기 ('$' = 지금부터)
+        last_id = '$'
+        for _ in range(5):
+            result = await redis_conn.xread({stream_key(serial): last_id}, count=100, block=5000)
+            for _, entries in result:
+                for entry_id, fields in entries:
+                    print(entry_id, decode_fields(fields))
+                    last_id = entry_id
+        await redis_conn.close()
+
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else 'PM10200787'))
@@ -0,0 +1,165 @@
+# ocpp_logger.py
+"""
+CSMS 메시지 경로용 비동기 구조화 로거.
+
+이벤트 루프에서는 레벨/샘플링 판단 후 큐에 튜플을 넣기만 하고(상수 시간),
+JSON 직렬화와 stdout 쓰기는 백그라운드 스레드가 담당합니다.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, TextIO
+
+from ocpp16 import codec
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_STOP = object()
+
+
+class FrameLogger:
+    """
+    OCPP 프레임/이벤트를 JSON 한 줄씩 기록하는 큐 기반 로거.
+
+    - charger_levels / action_levels: 충전기별, action별 최소 레벨 (충전기 설정이 우선)
+    - sample_every: action별 샘플링 간격. {"Heartbeat": 100} 이면 100개 중 1개만 기록합니다.
+      WARNING 이상 레코드는 샘플링하지 않습니다.
+    - 큐가 가득 차면 레코드를 버리고 dropped 카운터만 증가시켜 이벤트 루프를 막지 않습니다.
+    """
+    def __init__(self, stream: TextIO = sys.stdout, level: int = INFO,
+                 charger_levels: Optional[Dict[str, int]] = None,
+                 action_levels: Optional[Dict[str, int]] = None,
+                 sample_every: Optional[Dict[str, int]] = None,
+                 max_queue: int = 10000):
+        self.stream = stream
+        self.level = level
+        self.charger_levels: Dict[str, int] = dict(charger_levels or {})
+        self.action_levels: Dict[str, int] = dict(action_levels or {})
+        self.sample_every: Dict[str, int] = dict(sample_every or {})
+        self.dropped = 0
+        self._sample_counters: Dict[str, int] = {}
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._writer = threading.Thread(target=self._write_loop, name="ocpp-frame-logger", daemon=True)
+        self._writer.start()
+        # 종료 시 큐에 남은 레코드를 기록합니다.
+        atexit.register(self.close)
+
+    # =======================================================
+    # 설정
+    # =======================================================
+
+    def set_charger_level(self, charger_id: str, level: Optional[int]) -> None:
+        if level is None:
+            self.charger_levels.pop(charger_id, None)
+        else:
+            self.charger_levels[charger_id] = level
+
+    def set_action_level(self, action: str, level: Optional[int]) -> None:
+        if level is None:
+            self.action_levels.pop(action, None)
+        else:
+            self.action_levels[action] = level
+
+    # =======================================================
+    # 기록 (이벤트 루프에서 호출)
+    # =======================================================
+
+    def _should_log(self, level: int, charger_id: Optional[str], action: Optional[str]) -> bool:
+        threshold = self.charger_levels.get(charger_id)
+        if threshold is None:
+            threshold = self.action_levels.get(action, self.level)
+        if level < threshold:
+            return False
+        if level < WARNING and action in self.sample_every:
+            count = self._sample_counters.get(action, 0)
+            self._sample_counters[action] = count + 1
+            if count % self.sample_every[action]:
+                return False
+        return True
+
+    def _enqueue(self, record: tuple) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def frame(self, charger_id: str, direction: str, message_type: int, unique_id: Optional[str],
+              action: Optional[str], payload: Any, level: int = INFO) -> None:
+        """송수신한 OCPP 프레임을 기록합니다. direction은 'recv' 또는 'send'."""
+        if self._should_log(level, charger_id, action):
+            self._enqueue((time.time(), level, charger_id, 'frame', {
+                'direction': direction, 'messageType': message_type,
+                'uniqueId': unique_id, 'action': action, 'payload': payload,
+            }))
+
+    def event(self, charger_id: Optional[str], event: str, level: int = INFO,
+              action: Optional[str] = None, **fields: Any) -> None:
+        """연결/해제, 오류 등 프레임 이외의 이벤트를 기록합니다."""
+        if self._should_log(level, charger_id, action):
+            if action is not None:
+                fields['action'] = action
+            self._enqueue((time.time(), level, charger_id, event, fields))
+
+    # =======================================================
+    # 백그라운드 쓰기
+    # =======================================================
+
+    def _format(self, record: tuple) -> str:
+        ts, level, charger_id, event, fields = record
+        line = {
+            'ts': datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': logging.getLevelName(level),
+            'chargerId': charger_id,
+            'event': event,
+        }
+        line.update(fields)
+        try:
+            return codec.dumps(line)
+        except Exception:
+            pass
+        # 직렬화할 수 없는 필드 (예외 객체 등) 는 repr 로 기록합니다. 쓰기 스레드는 절대 죽지 않아야 합니다.
+        try:
+            return json.dumps(line, default=repr, separators=(',', ':'), ensure_ascii=False)
+        except Exception:
+            return json.dumps({key: line[key] for key in ('ts', 'level', 'chargerId', 'event')}
+                              | {'fields': repr(fields)}, separators=(',', ':'), ensure_ascii=False)
+
+    def _write_loop(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            lines = [self._format(record)]
+            # 쌓여 있는 레코드를 한 번에 모아 쓰기 횟수를 줄입니다.
+            stop = False
+            while len(lines) < 512:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                    break
+                lines.append(self._format(record))
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            except Exception:
+                pass
+            if stop:
+                break
+
+    def close(self, timeout: float = 2.0) -> None:
+        """남은 레코드를 모두 기록하고 쓰기 스레드를 종료합니다."""
+        if not self._writer.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
@@ -0,0 +1,275 @@
+# ocpp_schema.py
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# OCPP-J CALLERROR 코드 (OCPP 1.6 JSON 명세의 철자를 그대로 사용합니다)
+FORMATION_VIOLATION = "FormationViolation"
+PROPERTY_CONSTRAINT_VIOLATION = "PropertyConstraintViolation"
+OCCURENCE_CONSTRAINT_VIOLATION = "OccurenceConstraintViolation"
+TYPE_CONSTRAINT_VIOLATION = "TypeConstraintViolation"
+
+# 검증 실패 시 (에러 코드, 설명), 성공 시 None
+ValidationError = Optional[Tuple[str, str]]
+Validator = Callable[[Any], ValidationError]
+
+DATE_TIME_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?$')
+
+CHARGE_POINT_ERROR_CODES = [
+    "ConnectorLockFailure", "EVCommunicationError", "GroundFailure", "HighTemperature",
+    "InternalError", "LocalListConflict", "NoError", "OtherError", "OverCurrentFailure",
+    "PowerMeterFailure", "PowerSwitchFailure", "ReaderFailure", "ResetFailure",
+    "UnderVoltage", "OverVoltage", "WeakSignal",
+]
+CHARGE_POINT_STATUSES = [
+    "Available", "Preparing", "Charging", "SuspendedEVSE", "SuspendedEV",
+    "Finishing", "Reserved", "Unavailable", "Faulted",
+]
+STOP_REASONS = [
+    "EmergencyStop", "EVDisconnected", "HardReset", "Local", "Other", "PowerLoss",
+    "Reboot", "Remote", "SoftReset", "UnlockCommand", "DeAuthorized",
+]
+
+SAMPLED_VALUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "value": {"type": "string"},
+        "context": {"type": "string", "enum": [
+            "Interruption.Begin", "Interruption.End", "Sample.Clock", "Sample.Periodic",
+            "Transaction.Begin", "Transaction.End", "Trigger", "Other"]},
+        "format": {"type": "string", "enum": ["Raw", "SignedData"]},
+        "measurand": {"type": "string", "enum": [
+            "Energy.Active.Export.Register", "Energy.Active.Import.Register",
+            "Energy.Reactive.Export.Register", "Energy.Reactive.Import.Register",
+            "Energy.Active.Export.Interval", "Energy.Active.Import.Interval",
+            "Energy.Reactive.Export.Interval", "Energy.Reactive.Import.Interval",
+            "Power.Active.Export", "Power.Active.Import", "Power.Offered",
+            "Power.Reactive.Export", "Power.Reactive.Import", "Power.Factor",
+            "Current.Import", "Current.Export", "Current.Offered",
+            "Voltage", "Frequency", "Temperature", "SoC", "RPM"]},
+        "phase": {"type": "string", "enum": [
+            "L1", "L2", "L3", "N", "L1-N", "L2-N", "L3-N", "L1-L2", "L2-L3", "L3-L1"]},
+        "location": {"type": "string", "enum": ["Cable", "EV", "Inlet", "Outlet", "Body"]},
+        "unit": {"type": "string", "enum": [
+            "Wh", "kWh", "varh", "kvarh", "W", "kW", "VA", "kVA", "var", "kvar",
+            "A", "V", "K", "Celcius", "Celsius", "Fahrenheit", "Percent"]},
+    },
+    "additionalProperties": False,
+    "required": ["value"],
+}
+
+METER_VALUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "timestamp": {"type": "string", "format": "date-time"},
+        "sampledValue": {"type": "array", "items": SAMPLED_VALUE_SCHEMA},
+    },
+    "additionalProperties": False,
+    "required": ["timestamp", "sampledValue"],
+}
+
+# 충전기 → CSMS 요청(CALL)의 payload 스키마 (OCPP 1.6 JSON schema 기준)
+REQUEST_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "Authorize": {
+        "type": "object",
+        "properties": {
+            "idTag": {"type": "string", "maxLength": 20},
+        },
+        "additionalProperties": False,
+        "required": ["idTag"],
+    },
+    "BootNotification": {
+        "type": "object",
+        "properties": {
+            "chargePointVendor": {"type": "string", "maxLength": 20},
+            "chargePointModel": {"type": "string", "maxLength": 20},
+            "chargePointSerialNumber": {"type": "string", "maxLength": 25},
+            "chargeBoxSerialNumber": {"type": "string", "maxLength": 25},
+            "firmwareVersion": {"type": "string", "maxLength": 50},
+            "iccid": {"type": "string", "maxLength": 20},
+            "imsi": {"type": "string", "maxLength": 20},
+            "meterType": {"type": "string", "maxLength": 25},
+            "meterSerialNumber": {"type": "string", "maxLength": 25},
+        },
+        "additionalProperties": False,
+        "required": ["chargePointVendor", "chargePointModel"],
+    },
+    "DataTransfer": {
+        "type": "object",
+        "properties": {
+            "vendorId": {"type": "string", "maxLength": 255},
+            "messageId": {"type": "string", "maxLength": 50},
+            "data": {"type": "string"},
+        },
+        "additionalProperties": False,
+        "required": ["vendorId"],
+    },
+    "Heartbeat": {
+        "type": "object",
+        "properties": {},
+        "additionalProperties": False,
+    },
+    "MeterValues": {
+        "type": "object",
+        "properties": {
+            "connectorId": {"type": "integer"},
+            "transactionId": {"type": "integer"},
+            "meterValue": {"type": "array", "items": METER_VALUE_SCHEMA},
+        },
+        "additionalProperties": False,
+        "required": ["connectorId", "meterValue"],
+    },
+    "StartTransaction": {
+        "type": "object",
+        "properties": {
+            "connectorId": {"type": "integer"},
+            "idTag": {"type": "string", "maxLength": 20},
+            "meterStart": {"type": "integer"},
+            "reservationId": {"type": "integer"},
+            "timestamp": {"type": "string", "format": "date-time"},
+        },
+        "additionalProperties": False,
+        "required": ["connectorId", "idTag", "meterStart", "timestamp"],
+    },
+    "StatusNotification": {
+        "type": "object",
+        "properties": {
+            "connectorId": {"type": "integer"},
+            "errorCode": {"type": "string", "enum": CHARGE_POINT_ERROR_CODES},
+            "info": {"type": "string", "maxLength": 50},
+            "status": {"type": "string", "enum": CHARGE_POINT_STATUSES},
+            "timestamp": {"type": "string", "format": "date-time"},
+            "vendorId": {"type": "string", "maxLength": 255},
+            "vendorErrorCode": {"type": "string", "maxLength": 50},
+        },
+        "additionalProperties": False,
+        "required": ["connectorId", "errorCode", "status"],
+    },
+    "StopTransaction": {
+        "type": "object",
+        "properties": {
+            "idTag": {"type": "string", "maxLength": 20},
+            "meterStop": {"type": "integer"},
+            "timestamp": {"type": "string", "format": "date-time"},
+            "transactionId": {"type": "integer"},
+            "reason": {"type": "string", "enum": STOP_REASONS},
+            "transactionData": {"type": "array", "items": METER_VALUE_SCHEMA},
+        },
+        "additionalProperties": False,
+        "required": ["transactionId", "timestamp", "meterStop"],
+    },
+}
+
+
+def _is_integer(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": _is_integer,
+    "number": _is_number,
+    "boolean": lambda v: isinstance(v, bool),
+}
+
+
+def compile_schema(schema: Dict[str, Any], path: str = "payload") -> Validator:
+    """
+    JSON schema(OCPP 1.6에서 사용하는 부분집합)를 검증 함수로 한 번만 변환합니다.
+
+    반환된 함수는 값을 받아 검증에 실패하면 (OCPP 에러 코드, 설명)을, 성공하면 None을 반환합니다.
+    메시지마다 스키마를 해석하지 않도록 서버 시작 시 미리 컴파일해 둡니다.
+    """
+    checks: List[Validator] = []
+
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        type_check = TYPE_CHECKS[schema_type]
+        # 최상위 payload가 객체가 아니면 PDU 구조 자체가 잘못된 것입니다.
+        type_error = (FORMATION_VIOLATION if path == "payload" else TYPE_CONSTRAINT_VIOLATION,
+                      f"{path} must be of type {schema_type}")
+
+        def check_type(value):
+            if not type_check(value):
+                return type_error
+            return None
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+
+        def check_enum(value):
+            if value not in allowed:
+                return (PROPERTY_CONSTRAINT_VIOLATION, f"{path} has invalid value {value!r}")
+            return None
+        checks.append(check_enum)
+
+    if "maxLength" in schema:
+        max_length = schema["maxLength"]
+
+        def check_max_length(value):
+            if len(value) > max_length:
+                return (PROPERTY_CONSTRAINT_VIOLATION, f"{path} exceeds maxLength {max_length}")
+            return None
+        checks.append(check_max_length)
+
+    if schema.get("format") == "date-time":
+        def check_date_time(value):
+            if not DATE_TIME_RE.match(value):
+                return (PROPERTY_CONSTRAINT_VIOLATION, f"{path} is not a valid date-time")
+            return None
+        checks.append(check_date_time)
+
+    if schema_type == "object":
+        properties = {name: compile_schema(sub, f"{path}.{name}")
+                      for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+        allow_additional = schema.get("additionalProperties", True)
+
+        def check_object(value):
+            for name in required:
+                if name not in value:
+                    return (OCCURENCE_CONSTRAINT_VIOLATION, f"{path}.{name} is required")
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is None:
+                    if not allow_additional:
+                        return (FORMATION_VIOLATION, f"{path}.{name} is not allowed")
+                    continue
+                error = validator(item)
+                if error:
+                    return error
+            return None
+        checks.append(check_object)
+
+    if schema_type == "array" and "items" in schema:
+        item_validator = compile_schema(schema["items"], f"{path}[]")
+
+        def check_items(value):
+            for item in value:
+                error = item_validator(item)
+                if error:
+                    return error
+            return None
+        checks.append(check_items)
+
+    def validate(value):
+        for check in checks:
+            error = check(value)
+            if error:
+                return error
+        return None
+    return validate
+
+
+def compile_request_validator(action: str) -> Optional[Validator]:
+    """action의 요청 payload 검증 함수를 반환합니다. 스키마가 없으면 None."""
+    schema = REQUEST_SCHEMAS.get(action)
+    if schema is None:
+        return None
+    return compile_schema(schema)
@@ -0,0 +1,163 @@
+# outbound_queue.py
+"""
+충전기별 송신 큐.
+
+수신 루프가 websocket.send_text 를 직접 기다리지 않고 큐에 넣기만 하며, 연결마다 하나의 writer task 가
+순서대로 전송합니다. 느린 회선의 충전기는 자신의 큐만 쌓이고 다른 처리를 막지 않습니다.
+
+- max_messages / max_bytes 를 넘으면 on_overflow 를 호출하고 이후 put 은 QueueClosed 가 발생합니다
+  (ocpp_message.py 는 이때 연결을 끊습니다).
+- 같은 coalesce key 의 메시지가 아직 전송 대기 중이면 새 메시지로 교체합니다 (큐 위치는 유지).
+  교체된 메시지의 token 은 put() 이 반환하므로 호출자가 대기 중인 응답을 정리할 수 있습니다.
+"""
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+
+# (coalesce key, 메시지, token). key/message 는 교체될 수 있으므로 list 입니다.
+Entry = List[Any]
+
+
+class QueueClosed(Exception):
+    """넘침 또는 전송 실패로 닫힌 큐에 넣으려고 할 때 발생합니다."""
+
+
+def coalesce_key(action: str, payload: Any) -> Optional[Hashable]:
+    """같은 대상을 덮어쓰는 CALL 이면 key, 아니면 None (모두 순서대로 전송)."""
+    if not isinstance(payload, dict):
+        return None
+    if action == "SetChargingProfile":
+        profile = payload.get("csChargingProfiles") or {}
+        return (action, payload.get("connectorId"), profile.get("chargingProfilePurpose"), profile.get("stackLevel"))
+    if action == "ChangeConfiguration":
+        return (action, payload.get("key"))
+    if action == "TriggerMessage":
+        return (action, payload.get("requestedMessage"), payload.get("connectorId"))
+    return None
+
+
+class OutboundQueue:
+    def __init__(self, send: Callable[[str], Awaitable[Any]], max_messages: int = 100,
+                 max_bytes: int = 256 * 1024, on_overflow: Optional[Callable[[], Any]] = None,
+                 on_error: Optional[Callable[[Exception], Any]] = None):
+        self.send = send
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.on_overflow = on_overflow
+        self.on_error = on_error
+        self.closed = False
+        self.bytes = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.peak = 0
+        self._queue: Deque[Entry] = deque()
+        self._keyed: Dict[Hashable, Entry] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, message: str, key: Optional[Hashable] = None, token: Any = None) -> Any:
+        """
+        메시지를 넣고 즉시 반환합니다. 같은 key 의 대기 메시지를 교체했으면 그 메시지의 token 을 반환합니다.
+        """
+        if self.closed:
+            raise QueueClosed("outbound queue closed")
+        entry = self._keyed.get(key) if key is not None else None
+        if entry is not None:
+            superseded = entry[2]
+            self.bytes += len(message) - len(entry[1])
+            entry[1], entry[2] = message, token
+            self.coalesced += 1
+            return superseded
+
+        if len(self._queue) + 1 > self.max_messages or self.bytes + len(message) > self.max_bytes:
+            error = QueueClosed(f"outbound queue overflow ({len(self._queue)} messages, {self.bytes} bytes)")
+            self.close()
+            if self.on_overflow is not None:
+                self.on_overflow()
+            raise error
+
+        entry = [key, message, token]
+        self._queue.append(entry)
+        if key is not None:
+            self._keyed[key] = entry
+        self.bytes += len(message)
+        self.peak = max(self.peak, len(self._queue))
+        self._ready.set()
+        return None
+
+    async def run(self) -> None:
+        """writer task. 큐의 메시지를 순서대로 전송합니다."""
+        while not self.closed:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            entry = self._queue.popleft()
+            if entry[0] is not None:
+                self._keyed.pop(entry[0], None)
+            self.bytes -= len(entry[1])
+            try:
+                await self.send(entry[1])
+                self.sent += 1
+            except Exception as e:
+                self.close()
+                if self.on_error is not None:
+                    self.on_error(e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def close(self) -> List[Any]:
+        """큐를 닫고 전송하지 못한 메시지들의 token 목록을 반환합니다."""
+        self.closed = True
+        self._ready.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        tokens = [entry[2] for entry in self._queue if entry[2] is not None]
+        self._queue.clear()
+        self._keyed.clear()
+        self.bytes = 0
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {'depth': len(self._queue), 'bytes': self.bytes, 'peak': self.peak,
+                'sent': self.sent, 'coalesced': self.coalesced, 'closed': self.closed}
+
+
+# --- 사용 예시: 느린 충전기 하나가 다른 충전기를 막지 않는지 확인 ---
+if __name__ == '__main__':
+    import time
+
+    async def main() -> None:
+        received: Dict[str, List[str]] = {'fast': [], 'slow': []}
+
+        def sender(name: str, delay: float):
+            async def send(message: str) -> None:
+                await asyncio.sleep(delay)
+                received[name].append(message)
+            return send
+
+        fast = OutboundQueue(sender('fast', 0.001))
+        slow = OutboundQueue(sender('slow', 0.2), max_messages=5,
+                             on_overflow=lambda: print("slow: overflow → disconnect"))
+        fast.start()
+        slow.start()
+        started = time.perf_counter()
+        for i in range(50):
+            fast.put(f"fast {i}")
+            slow.put(f"limit {i}", key=("SetChargingProfile", 0), token=i)  # 같은 key 는 교체
+        try:
+            for i in range(10):
+                slow.put(f"response {i}")
+        except QueueClosed as e:
+            print(f"slow: {e}")
+        await asyncio.sleep(0.3)
+        print(f"fast sent {len(received['fast'])} in {time.perf_counter() - started:.2f}s, {fast.stats()}")
+        print(f"slow received {received['slow']}, {slow.stats()}")
+        fast.close()
+
+    asyncio.run(main())
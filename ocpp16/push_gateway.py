@@ -0,0 +1,314 @@
+# push_gateway.py
+"""
+브라우저 대시보드용 asyncio 푸시 게이트웨이 (SSE / WebSocket).
+
+연결마다 스레드를 쓰지 않고 이벤트 루프 안에서 처리하므로 수천 개의 세션을 유지할 수 있습니다.
+클라이언트는 토픽을 구독하며 자신이 구독한 토픽의 이벤트만 받습니다.
+
+    meter:<serial>     계측기 측정값 (Redis Stream meter:<serial> 에서 읽음)
+    energy             기존 energy_updates 채널 문자열 (예: "12.345A")
+    charger:<id>       충전기 연결/상태 변경 (ocpp_message.py 가 publish_shared)
+    meter:* / charger:*  해당 종류의 모든 토픽
+
+여러 worker 로 실행할 때 (shared=True) publish_shared() 는 Redis 채널 push:events 로 보내고,
+모든 worker 의 게이트웨이가 그 채널을 읽어 자기 구독자에게 publish 합니다. energy/meter 토픽처럼
+어느 worker 에 붙은 대시보드든 같은 이벤트를 받습니다.
+
+이벤트 ID는 게이트웨이 전체에서 증가하며, 토픽별 최근 history 건을 보관해 Last-Event-ID 이후를 다시 보냅니다.
+클라이언트 큐는 길이가 제한되어 느린 클라이언트는 오래된 이벤트부터 버립니다.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from ocpp16 import codec
+from ocpp16.meter_stream import ENERGY_CHANNEL, STREAMS_KEY, decode_fields, stream_key
+
+PushEvent = Tuple[int, str, str, str]  # (id, topic, SSE 프레임, WebSocket 항목 JSON)
+PUSH_CHANNEL = 'push:events'  # shared=True 일 때 worker 간에 이벤트를 나르는 Redis 채널
+
+
+class PushClient:
+    def __init__(self, max_queue: int):
+        self.topics: Set[str] = set()
+        self.queue: Deque[PushEvent] = deque(maxlen=max_queue)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+
+def _wildcard(topic: str) -> Optional[str]:
+    kind, sep, _ = topic.partition(':')
+    return f"{kind}:*" if sep else None
+
+
+class PushGateway:
+    def __init__(self, redis_factory=None, history: int = 64, client_queue: int = 256,
+                 keepalive: float = 15.0, max_topics: int = 100, reconnect_delay: float = 3.0,
+                 shared: bool = False):
+        self.redis_factory = redis_factory
+        self.shared = shared and redis_factory is not None
+        self.history_size = history
+        self.client_queue = client_queue
+        self.keepalive = keepalive
+        self.max_topics = max_topics
+        self.reconnect_delay = reconnect_delay
+        self.published = 0
+        self.dropped = 0
+        self._subscribers: Dict[str, Set[PushClient]] = {}
+        self._history: Dict[str, Deque[PushEvent]] = {}
+        self._clients: Set[PushClient] = set()
+        self._ids = itertools.count(int(time.time() * 1000))
+        self._tasks: List[asyncio.Task] = []
+        self._redis = None  # publish_shared 용 연결
+
+    # =======================================================
+    # 발행
+    # =======================================================
+
+    def publish(self, topic: str, data: Any) -> int:
+        """
+        이벤트 루프 안에서 호출합니다. 대기하지 않으며 구독자 수만큼 deque append 합니다.
+        직렬화는 발행할 때 한 번만 하고 모든 클라이언트가 같은 문자열을 보냅니다.
+        """
+        event_id = next(self._ids)
+        data_json = codec.dumps(data)
+        event = (
+            event_id, topic,
+            f"id: {event_id}\nevent: {topic}\ndata: {data_json}\n\n",
+            f'{{"id":{event_id},"topic":{codec.dumps(topic)},"data":{data_json}}}',
+        )
+        history = self._history.get(topic)
+        if history is None:
+            history = self._history[topic] = deque(maxlen=self.history_size)
+        history.append(event)
+        self.published += 1
+        for key in (topic, _wildcard(topic)):
+            for client in self._subscribers.get(key, ()):
+                if len(client.queue) == client.queue.maxlen:
+                    client.dropped += 1
+                    self.dropped += 1
+                client.queue.append(event)
+                client.ready.set()
+        return event[0]
+
+    async def publish_shared(self, topic: str, data: Any) -> None:
+        """
+        모든 worker 의 구독자에게 보냅니다. shared 가 아니면 publish 와 같습니다.
+        Redis 로 보내지 못하면 이 worker 의 구독자에게라도 보냅니다.
+        """
+        if not self.shared:
+            self.publish(topic, data)
+            return
+        try:
+            if self._redis is None:
+                self._redis = self.redis_factory()
+            await self._redis.publish(PUSH_CHANNEL, codec.dumps({'topic': topic, 'data': data}))
+        except Exception as e:
+            print(f"[PUSH] shared publish failed ({topic}): {e}")
+            self.publish(topic, data)
+
+    async def start(self) -> None:
+        """Redis 수신 작업을 시작합니다 (FastAPI startup 에서 호출)."""
+        if self.redis_factory is None or self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._read_energy_channel()),
+                       asyncio.create_task(self._read_meter_streams())]
+        if self.shared:
+            self._tasks.append(asyncio.create_task(self._read_push_channel()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _read_energy_channel(self) -> None:
+        while True:
+            try:
+                redis_conn = self.redis_factory()
+                pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(ENERGY_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self.publish('energy', message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[PUSH] energy channel error: {e}, retrying in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _read_push_channel(self) -> None:
+        while True:
+            try:
+                redis_conn = self.redis_factory()
+                pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(PUSH_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        event = codec.loads(message['data'])
+                        self.publish(event['topic'], event['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[PUSH] event channel error: {e}, retrying in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _read_meter_streams(self, block_ms: int = 5000) -> None:
+        last_ids: Dict[str, str] = {}
+        while True:
+            try:
+                redis_conn = self.redis_factory()
+                while True:
+                    # 새로 생긴 계측기 스트림은 지금 시점('$')부터 읽습니다.
+                    for serial in await redis_conn.smembers(STREAMS_KEY):
+                        last_ids.setdefault(stream_key(serial), '$')
+                    if not last_ids:
+                        await asyncio.sleep(block_ms / 1000)
+                        continue
+                    result = await redis_conn.xread(last_ids, count=500, block=block_ms)
+                    for key, entries in result or ():
+                        topic = key  # 'meter:<serial>'
+                        for entry_id, fields in entries:
+                            last_ids[key] = entry_id
+                            self.publish(topic, decode_fields(fields))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[PUSH] meter stream error: {e}, retrying in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    # =======================================================
+    # 구독
+    # =======================================================
+
+    def connect(self) -> PushClient:
+        client = PushClient(self.client_queue)
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client: PushClient) -> None:
+        self.unsubscribe(client, list(client.topics))
+        self._clients.discard(client)
+
+    def subscribe(self, client: PushClient, topics: Iterable[str], last_event_id: Optional[int] = None) -> List[str]:
+        added = []
+        for topic in topics:
+            if topic in client.topics or len(client.topics) >= self.max_topics:
+                continue
+            client.topics.add(topic)
+            self._subscribers.setdefault(topic, set()).add(client)
+            added.append(topic)
+        if last_event_id is not None:
+            replay = []
+            for topic, history in self._history.items():
+                if topic in added or _wildcard(topic) in added:
+                    replay.extend(e for e in history if e[0] > last_event_id)
+            for event in sorted(replay, key=lambda e: e[0]):
+                client.queue.append(event)
+            if replay:
+                client.ready.set()
+        return added
+
+    def unsubscribe(self, client: PushClient, topics: Iterable[str]) -> None:
+        for topic in topics:
+            client.topics.discard(topic)
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    async def next_events(self, client: PushClient) -> List[PushEvent]:
+        """이벤트가 있으면 모두 꺼내 반환하고, keepalive 초 동안 없으면 빈 목록을 반환합니다."""
+        if not client.queue:
+            try:
+                await asyncio.wait_for(client.ready.wait(), self.keepalive)
+            except asyncio.TimeoutError:
+                pass
+        client.ready.clear()
+        events = list(client.queue)
+        client.queue.clear()
+        return events
+
+    # =======================================================
+    # 전송 형식
+    # =======================================================
+
+    async def sse(self, topics: Iterable[str], last_event_id: Optional[str] = None):
+        """SSE 응답 본문 제너레이터. event 이름은 토픽, data는 JSON 입니다."""
+        client = self.connect()
+        try:
+            last = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+            self.subscribe(client, topics, last)
+            yield f"retry: {int(self.reconnect_delay * 1000)}\n\n"
+            while True:
+                events = await self.next_events(client)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(event[2] for event in events)
+        finally:
+            self.disconnect(client)
+
+    async def websocket(self, websocket) -> None:
+        """
+        WebSocket 세션. 클라이언트 → 서버:
+            {"subscribe": ["meter:PM1", "charger:*"], "lastEventId": 123}
+            {"unsubscribe": ["meter:PM1"]}
+        서버 → 클라이언트: [{"id": ..., "topic": ..., "data": ...}, ...]  (빈 목록은 keepalive)
+        """
+        client = self.connect()
+
+        async def receive_commands():
+            while True:
+                command = codec.loads(await websocket.receive_text())
+                if not isinstance(command, dict):
+                    continue
+                if command.get('subscribe'):
+                    last = command.get('lastEventId')
+                    self.subscribe(client, command['subscribe'], last if isinstance(last, int) else None)
+                if command.get('unsubscribe'):
+                    self.unsubscribe(client, command['unsubscribe'])
+
+        receiver = asyncio.create_task(receive_commands())
+        try:
+            while not receiver.done():
+                events = await self.next_events(client)
+                if receiver.done():
+                    break
+                await websocket.send_text("[" + ",".join(event[3] for event in events) + "]")
+        finally:
+            receiver.cancel()
+            self.disconnect(client)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'clients': len(self._clients), 'topics': len(self._subscribers),
+                'published': self.published, 'dropped': self.dropped}
+
+
+# --- 사용 예시: 5,000 개 세션에 팬아웃 ---
+if __name__ == '__main__':
+    async def main() -> None:
+        gateway = PushGateway(keepalive=1.0)
+        received = [0]
+
+        async def session(i: int) -> None:
+            topics = [f"meter:PM{i % 10}", "charger:*"]
+            async for chunk in gateway.sse(topics):
+                received[0] += chunk.count('\nevent: ')
+
+        sessions = [asyncio.create_task(session(i)) for i in range(5000)]
+        await asyncio.sleep(0.5)
+        started = time.perf_counter()
+        for n in range(100):
+            gateway.publish(f"meter:PM{n % 10}", {"power": 1000.0 + n})
+            gateway.publish("charger:CP1", {"status": "Charging"})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - started
+        print(f"{gateway.stats()} received {received[0]} events in {elapsed:.2f}s")
+        for task in sessions:
+            task.cancel()
+
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+# rate_limit.py
+"""
+충전기 웹소켓 수신 제한 (token bucket).
+
+연결 전체와 action 별로 버킷을 두고, 버킷이 비면 그 프레임은 처리하지 않습니다 (ocpp_message.py 는 CALLERROR 응답).
+violation_window 초 안에 max_violations 번 넘게 제한되면 should_close 가 True 가 되어 연결을 끊습니다.
+
+프로파일 예:
+    {
+        "max_frame": 65536,            # 최대 프레임 크기 (문자 수)
+        "rate": 20.0, "burst": 40,     # 연결 전체: 초당 20개, 순간 40개
+        "actions": {"StatusNotification": [5.0, 20], "Heartbeat": [0.2, 5]},  # action → [초당, 순간]
+        "max_violations": 50, "violation_window": 60.0
+    }
+"""
+import copy
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Mapping, Optional
+
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "max_frame": 64 * 1024,
+    "rate": 20.0,
+    "burst": 40,
+    "actions": {
+        "Heartbeat": [0.2, 5],
+        "StatusNotification": [5.0, 20],
+        "MeterValues": [5.0, 20],
+        "BootNotification": [0.1, 3],
+    },
+    "max_violations": 50,
+    "violation_window": 60.0,
+}
+
+FRAME_TOO_LARGE = 'frame_too_large'
+CONNECTION_LIMIT = 'connection'
+ACTION_LIMIT = 'action'
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        # 필요할 때만 채웁니다 (타이머 없음).
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+def merge_profile(base: Mapping[str, Any], override: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """override 의 항목으로 base 를 덮어씁니다. actions 는 action 별로 합칩니다."""
+    merged = copy.deepcopy(dict(base))
+    for key, value in (override or {}).items():
+        if key == 'actions':
+            merged.setdefault('actions', {}).update(value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def resolve_profile(charger_info: Optional[Mapping[str, Any]], profiles: Mapping[str, Mapping[str, Any]],
+                    default: Mapping[str, Any] = DEFAULT_PROFILE) -> Dict[str, Any]:
+    """
+    기본값 ← profiles["<vendor>"] ← profiles["<vendor>/<model>"] ← registered_chargers 의 "rateLimit" 순서로 적용합니다.
+    """
+    info = charger_info or {}
+    vendor = info.get('chargePointVendor', '')
+    model = info.get('chargePointModel', '')
+    profile = merge_profile(default, profiles.get(vendor))
+    profile = merge_profile(profile, profiles.get(f"{vendor}/{model}"))
+    return merge_profile(profile, info.get('rateLimit'))
+
+
+class InboundLimiter:
+    """연결 하나의 수신 제한 상태."""
+    def __init__(self, profile: Mapping[str, Any], clock: Callable[[], float] = time.monotonic,
+                 totals: Optional[Counter] = None):
+        self.clock = clock
+        self.totals = totals  # 여러 연결의 제한 횟수를 함께 집계할 Counter
+        now = clock()
+        self.max_frame = int(profile.get('max_frame', DEFAULT_PROFILE['max_frame']))
+        self.connection = TokenBucket(profile.get('rate', DEFAULT_PROFILE['rate']),
+                                      profile.get('burst', DEFAULT_PROFILE['burst']), now)
+        self.actions = {action: TokenBucket(rate, burst, now)
+                        for action, (rate, burst) in (profile.get('actions') or {}).items()}
+        self.max_violations = int(profile.get('max_violations', DEFAULT_PROFILE['max_violations']))
+        self.violation_window = float(profile.get('violation_window', DEFAULT_PROFILE['violation_window']))
+        self.throttled: Counter = Counter()  # (사유, action) → 횟수
+        self._violations: Deque[float] = deque()
+
+    def _violate(self, reason: str, action: Optional[str], now: float) -> str:
+        self.throttled[(reason, action)] += 1
+        if self.totals is not None:
+            self.totals[(reason, action)] += 1
+        self._violations.append(now)
+        while self._violations and self._violations[0] < now - self.violation_window:
+            self._violations.popleft()
+        return reason
+
+    def check_frame(self, size: int) -> Optional[str]:
+        """프레임 크기를 확인합니다. 넘으면 사유, 아니면 None."""
+        if size > self.max_frame:
+            return self._violate(FRAME_TOO_LARGE, None, self.clock())
+        return None
+
+    def allow(self, action: str) -> Optional[str]:
+        """CALL 하나를 처리해도 되는지 확인합니다. 제한되면 사유, 아니면 None."""
+        now = self.clock()
+        bucket = self.actions.get(action)
+        if bucket is not None and not bucket.take(now):
+            return self._violate(ACTION_LIMIT, action, now)
+        if not self.connection.take(now):
+            return self._violate(CONNECTION_LIMIT, action, now)
+        return None
+
+    @property
+    def should_close(self) -> bool:
+        return len(self._violations) >= self.max_violations
+
+    def stats(self) -> Dict[str, Any]:
+        return {'throttled': sum(self.throttled.values()), 'recentViolations': len(self._violations)}
+
+
+# --- 사용 예시: StatusNotification 을 반복해서 보내는 펌웨어 ---
+if __name__ == '__main__':
+    profiles = {"Jinyoung/JY-070-W4": {"actions": {"StatusNotification": [1.0, 5]}}}
+    profile = resolve_profile({"chargePointVendor": "Jinyoung", "chargePointModel": "JY-070-W4"}, profiles)
+    fake_now = [0.0]
+    limiter = InboundLimiter(profile, clock=lambda: fake_now[0])
+    accepted = 0
+    for i in range(2000):  # 초당 100개 x 20초
+        fake_now[0] = i / 100
+        if limiter.allow("StatusNotification") is None:
+            accepted += 1
+        if limiter.should_close:
+            print(f"close after {fake_now[0]:.2f}s")
+            break
+    print(f"accepted {accepted}, throttled {dict(limiter.throttled)}")
+    print(f"frame 100000: {limiter.check_frame(100000)}")
@@ -0,0 +1,197 @@
+# schedule_engine.py
+"""
+예약 충전(schedules) 시간대 평가 엔진.
+
+각 시간대(starttime~endtime, IANA timezone)의 다음 시작/종료 시각을 미리 계산해 min-heap 에 넣고,
+가장 가까운 전환 시각까지만 대기했다가 정확히 그 시각에 on_change(active) 를 호출합니다.
+충전기를 주기적으로 확인(polling)하지 않습니다.
+
+- 20:00 → 08:30 처럼 종료가 시작보다 이르면 다음 날 종료(overnight)로 봅니다. 같으면 24시간입니다.
+- 시각은 현지 날짜마다 zoneinfo 로 UTC 로 변환하므로 서머타임 전환일에도 현지 시각 기준으로 맞습니다.
+  존재하지 않는 시각(서머타임 시작 구간)은 전환 직후 시각이 되고, 두 번 있는 시각은 첫 번째를 사용합니다.
+- 여러 시간대가 있으면 하나라도 활성이면 활성입니다. 시간대가 없으면 상태는 None(예약 충전 꺼짐)입니다.
+
+    $ python -m ocpp16.schedule_engine     # 서머타임 전환일의 전환 시각 출력
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+Transition = Tuple[float, int, str, bool]  # (UTC timestamp, 순번, 시간대 이름, 시작 여부)
+
+
+def _parse_hhmm(value: str) -> dtime:
+    hour, minute = str(value).split(':')[:2]
+    return dtime(int(hour), int(minute))
+
+
+class ScheduleWindow:
+    def __init__(self, name: str, tz: str, starttime: str, endtime: str):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.start = _parse_hhmm(starttime)
+        self.end = _parse_hhmm(endtime)
+        self.overnight = self.end <= self.start
+
+    @classmethod
+    def from_record(cls, name: str, record: Mapping[str, Any]) -> 'ScheduleWindow':
+        return cls(name, record['timezone'], record['starttime'], record['endtime'])
+
+    def _instant(self, day: date, at: dtime) -> float:
+        return datetime.combine(day, at, tzinfo=self.tz).timestamp()
+
+    def _window(self, day: date) -> Tuple[float, float]:
+        """현지 날짜 day 에 시작하는 구간의 (시작, 종료) UTC timestamp."""
+        end_day = day + timedelta(days=1) if self.overnight else day
+        return self._instant(day, self.start), self._instant(end_day, self.end)
+
+    def next_transition(self, after: float) -> Tuple[float, bool]:
+        """after 보다 뒤의 가장 가까운 (전환 시각, 시작 여부)."""
+        today = datetime.fromtimestamp(after, self.tz).date()
+        candidates = []
+        for offset in (-1, 0, 1, 2):
+            start, end = self._window(today + timedelta(days=offset))
+            if start > after:
+                candidates.append((start, True))
+            if end > after:
+                candidates.append((end, False))
+        return min(candidates)
+
+    def is_active(self, at: float) -> bool:
+        today = datetime.fromtimestamp(at, self.tz).date()
+        for offset in (-1, 0):
+            start, end = self._window(today + timedelta(days=offset))
+            if start <= at < end:
+                return True
+        return False
+
+
+def windows_from_config(schedules: Mapping[str, Any]) -> List[ScheduleWindow]:
+    """
+    shared_data.json 의 schedules 에서 적용할 시간대를 만듭니다.
+    api_v1/device.py 와 같이 'priority' 가 있으면 그것만, 없으면 'default' 를 사용합니다.
+    """
+    name = 'priority' if schedules.get('priority') else 'default'
+    record = schedules.get(name)
+    if not record:
+        return []
+    try:
+        return [ScheduleWindow.from_record(name, record)]
+    except Exception as e:
+        print(f"[SCHEDULE] 잘못된 시간대 '{name}': {e}")
+        return []
+
+
+class ScheduleEngine:
+    def __init__(self, on_change: Callable[[Optional[bool]], Awaitable[None]],
+                 clock: Callable[[], float] = time.time):
+        self.on_change = on_change
+        self.clock = clock
+        self.windows: Dict[str, ScheduleWindow] = {}
+        self.state: Optional[bool] = None
+        self.fired = 0
+        self._heap: List[Transition] = []
+        self._seq = itertools.count()
+        self._reload = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, windows: List[ScheduleWindow]) -> None:
+        """시간대를 교체하고 전환 시각을 다시 계산합니다. 상태 변화는 run() 이 바로 반영합니다."""
+        now = self.clock()
+        self.windows = {w.name: w for w in windows}
+        self._heap = []
+        for window in windows:
+            ts, is_start = window.next_transition(now)
+            heapq.heappush(self._heap, (ts, next(self._seq), window.name, is_start))
+        self._reload.set()
+
+    def evaluate(self, at: Optional[float] = None) -> Optional[bool]:
+        if not self.windows:
+            return None
+        at = self.clock() if at is None else at
+        return any(w.is_active(at) for w in self.windows.values())
+
+    def next_transition(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def _advance(self, now: float) -> None:
+        """now 까지 지난 전환을 꺼내고 각 시간대의 다음 전환을 넣습니다."""
+        while self._heap and self._heap[0][0] <= now:
+            ts, _, name, _ = heapq.heappop(self._heap)
+            window = self.windows.get(name)
+            if window is not None:
+                next_ts, is_start = window.next_transition(max(ts, now))
+                heapq.heappush(self._heap, (next_ts, next(self._seq), name, is_start))
+
+    async def _apply(self) -> None:
+        state = self.evaluate()
+        if state != self.state:
+            self.state = state
+            self.fired += 1
+            print(f"[SCHEDULE] 예약 충전 상태 변경: {state}")
+            try:
+                await self.on_change(state)
+            except Exception as e:
+                print(f"[SCHEDULE] on_change error: {e}")
+
+    async def run(self) -> None:
+        while True:
+            self._reload.clear()
+            self._advance(self.clock())
+            await self._apply()
+            nxt = self.next_transition()
+            delay = None if nxt is None else max(0.0, nxt - self.clock())
+            try:
+                await asyncio.wait_for(self._reload.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        nxt = self.next_transition()
+        return {
+            'state': self.state, 'windows': list(self.windows), 'fired': self.fired,
+            'next_transition': datetime.fromtimestamp(nxt, timezone.utc).isoformat() if nxt else None,
+        }
+
+
+# --- 사용 예시: 2026-03-08 (미국 서머타임 시작) 전후의 20:00 → 08:30 전환 ---
+if __name__ == '__main__':
+    window = ScheduleWindow('default', 'America/Los_Angeles', '20:00', '08:30')
+    ts = datetime(2026, 3, 6, 12, 0, tzinfo=window.tz).timestamp()
+    for _ in range(8):
+        ts, is_start = window.next_transition(ts)
+        local = datetime.fromtimestamp(ts, window.tz)
+        print(f"{'start' if is_start else 'end  '} {local.isoformat()}  (UTC {datetime.fromtimestamp(ts, timezone.utc):%H:%M})")
+
+    async def main() -> None:
+        # 시계를 앞당겨 전환이 정확한 시각에 한 번씩만 발생하는지 확인합니다.
+        fake_now = [datetime(2026, 3, 7, 19, 59, 59, 900000, tzinfo=window.tz).timestamp()]
+        started = time.monotonic()
+
+        async def on_change(state: Optional[bool]) -> None:
+            print(f"on_change({state}) at {datetime.fromtimestamp(clock(), window.tz):%H:%M:%S.%f}")
+
+        def clock() -> float:
+            return fake_now[0] + (time.monotonic() - started)
+
+        engine = ScheduleEngine(on_change, clock)
+        engine.load([window])
+        engine.start()
+        await asyncio.sleep(0.3)
+        print(engine.stats())
+        engine.stop()
+
+    asyncio.run(main())
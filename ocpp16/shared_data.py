@@ -1,7 +1,15 @@
 # shared_data.py
 import asyncio
+import functools
 import threading
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Callable, Dict, Any, Mapping, Optional
+
+from ocpp16.data_manager import (
+    open_config_manager, CHARGERS_KEY, ID_TAGS_KEY, PM_DEVICES_KEY, SCHEDULES_KEY,
+)
 
 # --- OCPP 서버 설정 ---
 OCPP_HOST = '127.0.0.1'
@@ -51,108 +59,192 @@ SHARED_DATA = {
 
 class SharedDataManager:
     """
-    공유 데이터 저장소(SHARED_DATA)에 대한 스레드 안전 접근을 제공하는 클래스.
-    비동기 환경에서 동시성 문제를 방지하기 위해 락(Lock)을 사용합니다.
+    FastAPI CSMS 의 비동기 데이터 접근 계층 (충전기, ID Tag, 예약, 계측기).
+
+    - 읽기는 메모리 스냅샷에서만 하므로 디스크가 느려도 이벤트 루프를 막지 않습니다.
+    - 쓰기와 스냅샷 갱신은 단일 스레드 executor 에서 순서대로 실행하고, 끝나면 스냅샷을 교체합니다.
+    - 다른 프로세스(Flask 관리 화면)가 바꾼 내용은 refresh_interval 초마다 executor 에서 다시 읽습니다.
+
+    저장소는 open_config_manager() 로 열며 JSON/SQLite 모두 사용할 수 있습니다.
     """
-    def __init__(self):
-        # 비동기 환경에서 데이터 무결성을 보장하기 위한 락
-        self._lock = asyncio.Lock()
-        
+    def __init__(self, filename: str, refresh_interval: float = 2.0, store=None):
+        self.store = store if store is not None else open_config_manager(filename, cached=True)
+        self.refresh_interval = refresh_interval
+        self.writes = 0
+        self._snapshot: Mapping[str, Any] = MappingProxyType({})
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shared-data')
+        self._task: Optional[asyncio.Task] = None
+
     # =======================================================
-    # 읽기 기능 (충전기)
+    # 수명 주기
     # =======================================================
-    
-    async def get_charger_info(self, charger_id: str) -> Optional[Dict[str, Any]]:
-        """
-        특정 충전기의 등록 정보를 읽습니다.
-        """
-        # 읽기 작업 시에도 락을 사용하여 데이터가 수정되는 것을 방지합니다.
-        async with self._lock:
-            # 안전하게 복사본을 반환합니다.
-            return SHARED_DATA["registered_chargers"].get(charger_id, None)
 
-    async def is_charger_registered(self, charger_id: str) -> bool:
-        """
-        특정 충전기 ID가 등록되어 있는지 확인합니다.
-        """
-        # 읽기 작업은 락을 사용하여 안전하게 수행됩니다.
-        async with self._lock:
-            return charger_id in SHARED_DATA["registered_chargers"]
+    async def start(self) -> None:
+        """첫 스냅샷을 읽고 주기적 갱신을 시작합니다 (FastAPI startup 에서 호출)."""
+        await self.refresh()
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._run(self.store.flush)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def refresh(self) -> None:
+        self._snapshot = await self._run(self.store.snapshot)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"[DATA] 스냅샷 갱신 실패: {e}")
+
+    async def _write(self, fn: Callable, *args, **kwargs):
+        """쓰기를 executor 에서 실행하고, 끝나면 바뀐 스냅샷으로 교체합니다."""
+        result = await self._run(fn, *args, **kwargs)
+        self.writes += 1
+        await self.refresh()
+        return result
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """현재 메모리 스냅샷 (읽기 전용). 동기 코드에서 쓸 수 있으며 디스크를 읽지 않습니다."""
+        return self._snapshot
 
     # =======================================================
-    # 쓰기/업데이트 기능 (충전기)
+    # 충전기
     # =======================================================
 
+    async def get_charger_info(self, charger_id: str) -> Optional[Mapping[str, Any]]:
+        """특정 충전기의 등록 정보를 읽습니다. 없으면 None."""
+        return self._snapshot.get(CHARGERS_KEY, {}).get(charger_id)
+
+    async def is_charger_registered(self, charger_id: str) -> bool:
+        return charger_id in self._snapshot.get(CHARGERS_KEY, {})
+
     async def add_or_update_charger(self, charger_id: str, chargePointVendor: str, chargePointModel: str, connected: bool = False) -> None:
-        """
-        새로운 충전기를 등록하거나 기존 충전기 정보를 업데이트합니다.
-        """
-        # 쓰기 작업 시에는 반드시 락을 걸어 동시 수정을 막습니다.
-        async with self._lock:
-            SHARED_DATA["registered_chargers"][charger_id] = {
+        """새로운 충전기를 등록하거나 기존 충전기 정보를 업데이트합니다."""
+        def upsert():
+            data = self.store.load_data()
+            data.setdefault(CHARGERS_KEY, {})[charger_id] = {
                 "chargePointVendor": chargePointVendor,
                 "chargePointModel": chargePointModel,
                 "connected": connected
             }
-            print(f"[DATA] 충전기 {charger_id} 정보가 업데이트되었습니다.")
+            self.store.save_data(data)
+        await self._write(upsert)
+        print(f"[DATA] 충전기 {charger_id} 정보가 업데이트되었습니다.")
+
+    async def update_connected(self, states: Dict[str, bool]) -> int:
+        """여러 충전기의 연결 상태(connected)를 한 번에 업데이트합니다."""
+        return await self._write(self.store.update_connected, states)
+
+    async def next_transaction_id(self) -> int:
+        """저장소에 기록된 카운터로 transactionId 를 발급합니다 (재시작 후에도 이어짐)."""
+        return await self._run(self.store.next_transaction_id)
 
     async def update_charger_connection_status(self, charger_id: str, status: bool) -> None:
-        """
-        충전기의 연결 상태(connected)만 업데이트합니다.
-        """
-        async with self._lock:
-            if charger_id in SHARED_DATA["registered_chargers"]:
-                SHARED_DATA["registered_chargers"][charger_id]["connected"] = status
-                print(f"[DATA] 충전기 {charger_id}의 연결 상태가 {status}로 업데이트되었습니다.")
-            else:
-                print(f"[ERROR] 충전기 {charger_id}는 등록되지 않았습니다. 상태 업데이트 실패.")
+        """충전기의 연결 상태(connected)만 업데이트합니다."""
+        if not await self.is_charger_registered(charger_id):
+            print(f"[ERROR] 충전기 {charger_id}는 등록되지 않았습니다. 상태 업데이트 실패.")
+            return
+        await self.update_connected({charger_id: status})
 
     # =======================================================
-    # ID Tag 읽기 기능
+    # ID Tag
     # =======================================================
-    
-    async def get_idtag_info(self, id_tag: str) -> Optional[Dict[str, Any]]:
-        """
-        특정 ID Tag의 등록 정보를 읽습니다.
-        """
-        async with self._lock:
-            return SHARED_DATA["registered_id_tags"].get(id_tag, None)
 
+    async def get_idtag_info(self, id_tag: str) -> Optional[Mapping[str, Any]]:
+        """특정 ID Tag의 등록 정보를 읽습니다. 없으면 None."""
+        return self._snapshot.get(ID_TAGS_KEY, {}).get(id_tag)
+
+    async def update_id_tag(self, id_tag: str, status: str, cardname: str, expiry_days: int = 365) -> None:
+        await self._write(self.store.update_id_tag, id_tag, status, cardname, expiry_days)
+
+    # =======================================================
+    # 예약 / 계측기
+    # =======================================================
+
+    async def get_schedules(self) -> Mapping[str, Any]:
+        return self._snapshot.get(SCHEDULES_KEY, {})
+
+    async def is_scheduled_charging(self) -> bool:
+        return bool(self._snapshot.get('scheduled_charging', False))
+
+    async def update_schedules(self, priority: str, timezone: str, starttime: str, endtime: str) -> None:
+        await self._write(self.store.update_schedules, priority, timezone, starttime, endtime)
+
+    async def get_pm_devices(self) -> Mapping[str, Any]:
+        return self._snapshot.get(PM_DEVICES_KEY, {})
 
-# 매니저 객체 생성 (전역적으로 하나의 인스턴스만 사용)
-# data_manager = SharedDataManager()
 
 # =======================================================
-# 사용 예시 (테스트)
+# 사용 예시: 디스크 기록이 느려도 이벤트 루프가 응답하는지 확인
 # =======================================================
-# async def test_manager():
-#     # 1. 특정 충전기가 등록되어 있는지 확인
-#     charger_id_a = "PL0787"
-#     charger_id_b = "UNKNOWN-001"
-    
-#     is_a_registered = await data_manager.is_charger_registered(charger_id_a)
-#     print(f"충전기 {charger_id_a} 등록 여부: {is_a_registered}") # True
-    
-#     is_b_registered = await data_manager.is_charger_registered(charger_id_b)
-#     print(f"충전기 {charger_id_b} 등록 여부: {is_b_registered}") # False
-    
-#     # 2. 충전기 정보 읽기
-#     info_a = await data_manager.get_charger_info(charger_id_a)
-#     print(f"충전기 {charger_id_a} 정보: {info_a}")
-    
-#     # 3. 새로운 충전기 추가/업데이트
-#     new_charger_id = "NEW-CHG-999"
-#     await data_manager.add_or_update_charger(new_charger_id, "NewchargePointVendor", "SuperchargePointModel")
-    
-#     # 4. 업데이트된 정보 확인
-#     info_new = await data_manager.get_charger_info(new_charger_id)
-#     print(f"새로 추가된 충전기 정보: {info_new}")
-    
-#     # 5. 연결 상태 업데이트
-#     await data_manager.update_charger_connection_status(charger_id_a, True)
-#     updated_info_a = await data_manager.get_charger_info(charger_id_a)
-#     print(f"연결 상태 업데이트 후 {charger_id_a} 정보: {updated_info_a}")
-
-# 이 코드를 직접 실행하려면 아래 주석을 해제하세요.
-# if __name__ == "__main__":
-#     asyncio.run(test_manager())
\ No newline at end of file
+if __name__ == "__main__":
+    import os
+    import shutil
+    import tempfile
+
+    from ocpp16.data_manager import JsonConfigManager
+
+    class SlowDiskManager(JsonConfigManager):
+        """파일 기록마다 0.3초 걸리는 디스크를 흉내 냅니다."""
+        def _write_atomic(self, data):
+            time.sleep(0.3)
+            return super()._write_atomic(data)
+
+    async def measure(label: str, work) -> None:
+        # 10ms 주기 타이머가 얼마나 늦게 깨어나는지로 이벤트 루프 지연을 잽니다.
+        worst = [0.0]
+        stop = asyncio.Event()
+
+        async def ticker():
+            while not stop.is_set():
+                expected = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                worst[0] = max(worst[0], time.perf_counter() - expected)
+
+        tick = asyncio.create_task(ticker())
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await work()
+        stop.set()
+        await tick
+        print(f"{label}: {time.perf_counter() - started:.2f}s, 최대 루프 지연 {worst[0] * 1000:.1f} ms")
+
+    async def main() -> None:
+        tmpdir = tempfile.mkdtemp()
+        filename = os.path.join(tmpdir, 'shared_data.json')
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'shared_data.json'), filename)
+        store = SlowDiskManager(filename, cached=True)
+        manager = SharedDataManager(filename, store=store)
+        await manager.start()
+        charger_id = next(iter(manager.snapshot().get(CHARGERS_KEY, {})), 'CHG-TEST-001')
+
+        async def blocking_writes():
+            # 기존 방식: 이벤트 루프에서 직접 기록
+            for i in range(3):
+                store.update_connected({charger_id: i % 2 == 0})
+
+        async def async_writes():
+            async def authorize_loop():
+                for _ in range(1000):
+                    await manager.get_idtag_info('00000000F0C8FADD')
+                    await asyncio.sleep(0)
+            await asyncio.gather(authorize_loop(), *(manager.update_connected({charger_id: i % 2 == 0}) for i in range(3)))
+
+        await measure("동기 기록 (루프에서 직접)", blocking_writes)
+        await measure("SharedDataManager (executor)", async_writes)
+        print(f"writes {manager.writes}, {charger_id}: {await manager.get_charger_info(charger_id)}")
+        await manager.close()
+        shutil.rmtree(tmpdir)
+
+    asyncio.run(main())
@@ -0,0 +1,402 @@
+# sqlite_manager.py
+import json
+import sqlite3
+import sys
+import threading
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+
+from ocpp16.data_manager import (
+    JsonConfigManager, ID_TAGS_KEY, CHARGERS_KEY, PM_DEVICES_KEY, SCHEDULES_KEY,
+    RECORD_IDS_KEY, NEXT_RECORD_ID_KEY, NEXT_TRANSACTION_ID_KEY, expiry_date_from_days, _freeze, _sync_record_ids,
+)
+
+SQLITE_FILE = 'ocpp16/shared_data.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chargers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    charger_id TEXT NOT NULL UNIQUE,
+    charge_point_vendor TEXT,
+    charge_point_model TEXT,
+    connected INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS id_tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_tag TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    cardname TEXT NOT NULL DEFAULT '',
+    expiry_date TEXT
+);
+CREATE TABLE IF NOT EXISTS pm_devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    serialnumber TEXT NOT NULL UNIQUE,
+    maxcurrent TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    priority TEXT NOT NULL UNIQUE,
+    timezone TEXT NOT NULL,
+    starttime TEXT NOT NULL,
+    endtime TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# collection → (테이블, 키 컬럼). 각 테이블의 id 컬럼이 레코드의 고정 ID입니다.
+RECORD_TABLES = {
+    ID_TAGS_KEY: ('id_tags', 'id_tag'),
+    PM_DEVICES_KEY: ('pm_devices', 'serialnumber'),
+    SCHEDULES_KEY: ('schedules', 'priority'),
+}
+
+
+def _id_tag_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {"status": row['status'], "cardname": row['cardname'], "expiryDate": row['expiry_date']}
+
+
+def _charger_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "chargePointVendor": row['charge_point_vendor'],
+        "chargePointModel": row['charge_point_model'],
+        "connected": bool(row['connected'])
+    }
+
+
+def _schedule_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "priority": row['priority'],
+        "timezone": row['timezone'],
+        "starttime": row['starttime'],
+        "endtime": row['endtime']
+    }
+
+
+RECORD_VALUE_FROM_ROW = {
+    ID_TAGS_KEY: _id_tag_from_row,
+    PM_DEVICES_KEY: lambda row: row['maxcurrent'],
+    SCHEDULES_KEY: _schedule_from_row,
+}
+
+
+class SqliteConfigManager:
+    """
+    JsonConfigManager와 같은 API를 제공하는 SQLite(WAL) 저장소 백엔드.
+
+    충전기/ID Tag/PM 장치/스케줄을 각각 UNIQUE 인덱스가 있는 테이블에 저장하므로
+    get_id_tag_info() 같은 조회는 문서 전체를 읽지 않고 인덱스 조회 한 번으로 끝납니다.
+    WAL 모드이므로 Flask API와 FastAPI CSMS가 동시에 읽을 수 있습니다.
+    """
+    def __init__(self, filename: str = SQLITE_FILE):
+        self.filename = filename
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 연결을 반환합니다. sqlite3 연결은 스레드 간에 공유하지 않습니다."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filename, timeout=5.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # =======================================================
+    # 전체 문서 API (JsonConfigManager 호환)
+    # =======================================================
+
+    def load_data(self) -> Dict[str, Any]:
+        """모든 테이블을 읽어 shared_data.json과 같은 구조의 딕셔너리로 반환합니다."""
+        conn = self._connect()
+        data: Dict[str, Any] = {
+            CHARGERS_KEY: {},
+            ID_TAGS_KEY: {},
+            PM_DEVICES_KEY: {},
+            SCHEDULES_KEY: {},
+        }
+        for row in conn.execute("SELECT * FROM chargers ORDER BY id"):
+            data[CHARGERS_KEY][row['charger_id']] = _charger_from_row(row)
+        for collection, (table, key_column) in RECORD_TABLES.items():
+            value_from_row = RECORD_VALUE_FROM_ROW[collection]
+            for row in conn.execute(f"SELECT * FROM {table} ORDER BY id"):
+                data[collection][row[key_column]] = value_from_row(row)
+        for row in conn.execute("SELECT key, value FROM settings"):
+            data[row['key']] = json.loads(row['value'])
+        return data
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """전체 데이터의 읽기 전용 스냅샷을 반환합니다. hot path에서는 get_*_info()를 사용하세요."""
+        return _freeze(self.load_data())
+
+    def save_data(self, data: Dict[str, Any]):
+        """
+        주어진 딕셔너리 데이터를 하나의 트랜잭션으로 저장합니다.
+        기존 행은 갱신하고, data에 없는 행만 삭제하므로 행 id가 유지됩니다.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    self._sync_table(conn, 'chargers', 'charger_id', data.get(CHARGERS_KEY, {}), self._upsert_charger)
+                    self._sync_table(conn, 'id_tags', 'id_tag', data.get(ID_TAGS_KEY, {}), self._upsert_id_tag)
+                    self._sync_table(conn, 'pm_devices', 'serialnumber', data.get(PM_DEVICES_KEY, {}), self._upsert_pm_device)
+                    self._sync_table(conn, 'schedules', 'priority', data.get(SCHEDULES_KEY, {}), self._upsert_schedule)
+                    for key, value in data.items():
+                        # 고정 ID는 각 테이블의 id 컬럼이 담당합니다.
+                        # transactionId 카운터는 next_transaction_id() 만 올립니다 (오래된 문서로 되돌리지 않음).
+                        if key in (CHARGERS_KEY, ID_TAGS_KEY, PM_DEVICES_KEY, SCHEDULES_KEY,
+                                   RECORD_IDS_KEY, NEXT_RECORD_ID_KEY, NEXT_TRANSACTION_ID_KEY):
+                            continue
+                        conn.execute(
+                            "INSERT INTO settings (key, value) VALUES (?, ?) "
+                            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                            (key, json.dumps(value, ensure_ascii=False))
+                        )
+                print(f"Success: SQLite file '{self.filename}' updated.")
+            except Exception as e:
+                print(f"An error occurred while writing the database: {e}")
+
+    def flush(self):
+        """SQLite 백엔드는 매 변경마다 커밋하므로 기록 대기 중인 데이터가 없습니다."""
+        return None
+
+    @staticmethod
+    def _sync_table(conn: sqlite3.Connection, table: str, key_column: str, items: Dict[str, Any], upsert):
+        keys = list(items.keys())
+        for key, value in items.items():
+            upsert(conn, key, value)
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            conn.execute(f"DELETE FROM {table} WHERE {key_column} NOT IN ({placeholders})", keys)
+        else:
+            conn.execute(f"DELETE FROM {table}")
+
+    @staticmethod
+    def _upsert_charger(conn: sqlite3.Connection, charger_id: str, info: Dict[str, Any]):
+        conn.execute(
+            "INSERT INTO chargers (charger_id, charge_point_vendor, charge_point_model, connected) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(charger_id) DO UPDATE SET charge_point_vendor = excluded.charge_point_vendor, "
+            "charge_point_model = excluded.charge_point_model, connected = excluded.connected",
+            (charger_id, info.get('chargePointVendor'), info.get('chargePointModel'), int(bool(info.get('connected', False))))
+        )
+
+    @staticmethod
+    def _upsert_id_tag(conn: sqlite3.Connection, id_tag: str, info: Dict[str, Any]):
+        conn.execute(
+            "INSERT INTO id_tags (id_tag, status, cardname, expiry_date) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id_tag) DO UPDATE SET status = excluded.status, "
+            "cardname = excluded.cardname, expiry_date = excluded.expiry_date",
+            (id_tag, info.get('status'), info.get('cardname', ''), info.get('expiryDate'))
+        )
+
+    @staticmethod
+    def _upsert_pm_device(conn: sqlite3.Connection, serialnumber: str, maxcurrent: Any):
+        conn.execute(
+            "INSERT INTO pm_devices (serialnumber, maxcurrent) VALUES (?, ?) "
+            "ON CONFLICT(serialnumber) DO UPDATE SET maxcurrent = excluded.maxcurrent",
+            (serialnumber, str(maxcurrent))
+        )
+
+    @staticmethod
+    def _upsert_schedule(conn: sqlite3.Connection, priority: str, info: Dict[str, Any]):
+        conn.execute(
+            "INSERT INTO schedules (priority, timezone, starttime, endtime) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(priority) DO UPDATE SET timezone = excluded.timezone, "
+            "starttime = excluded.starttime, endtime = excluded.endtime",
+            (priority, info.get('timezone'), info.get('starttime'), info.get('endtime'))
+        )
+
+    # =======================================================
+    # 단건 조회 (인덱스 조회)
+    # =======================================================
+
+    def get_id_tag_info(self, id_tag: str) -> Optional[Mapping[str, Any]]:
+        """특정 ID Tag의 등록 정보를 읽습니다. 없으면 None."""
+        row = self._connect().execute(
+            "SELECT status, cardname, expiry_date FROM id_tags WHERE id_tag = ?", (id_tag,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _id_tag_from_row(row)
+
+    def get_charger_info(self, charger_id: str) -> Optional[Mapping[str, Any]]:
+        """특정 충전기의 등록 정보를 읽습니다. 없으면 None."""
+        row = self._connect().execute(
+            "SELECT charge_point_vendor, charge_point_model, connected FROM chargers WHERE charger_id = ?", (charger_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _charger_from_row(row)
+
+    # =======================================================
+    # 고정 ID 기반 조회/삭제 (id 컬럼 = PRIMARY KEY)
+    # =======================================================
+
+    def list_records(self, collection: str) -> List[Tuple[int, str, Any]]:
+        """collection의 레코드를 (고정 ID, 키, 값) 목록으로 반환합니다."""
+        table, key_column = RECORD_TABLES[collection]
+        value_from_row = RECORD_VALUE_FROM_ROW[collection]
+        rows = self._connect().execute(f"SELECT * FROM {table} ORDER BY id")
+        return [(row['id'], row[key_column], value_from_row(row)) for row in rows]
+
+    def get_record(self, collection: str, record_id: int) -> Optional[Tuple[str, Any]]:
+        """고정 ID로 레코드를 찾아 (키, 값)을 반환합니다. 없으면 None."""
+        table, key_column = RECORD_TABLES[collection]
+        row = self._connect().execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return None
+        return row[key_column], RECORD_VALUE_FROM_ROW[collection](row)
+
+    def delete_record(self, collection: str, record_id: int) -> bool:
+        """고정 ID로 레코드를 삭제합니다. 삭제되었으면 True."""
+        table, _ = RECORD_TABLES[collection]
+        with self._lock, self._connect() as conn:
+            deleted = conn.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,)).rowcount
+        return bool(deleted)
+
+    # =======================================================
+    # 추가/수정/삭제 (JsonConfigManager 호환)
+    # =======================================================
+
+    def update_id_tag(self, id_tag: str, status: str, cardname: str, expiry_days: int = 365):
+        """특정 ID Tag의 정보를 추가하거나 업데이트합니다."""
+        info = {"status": status, "cardname": cardname, "expiryDate": expiry_date_from_days(expiry_days)}
+        with self._lock, self._connect() as conn:
+            self._upsert_id_tag(conn, id_tag, info)
+        print(f"[ID Tag] '{id_tag}'이(가) 상태 '{status}'로 업데이트/추가되었습니다.")
+
+    def update_connected(self, states: Dict[str, bool]):
+        """여러 충전기의 connected 값을 한 번에 갱신합니다. 등록되지 않은 충전기는 건너뜁니다."""
+        with self._lock, self._connect() as conn:
+            cursor = conn.executemany(
+                "UPDATE chargers SET connected = ? WHERE charger_id = ? AND connected != ?",
+                [(int(bool(c)), cid, int(bool(c))) for cid, c in states.items()]
+            )
+            return cursor.rowcount
+
+    def get_next_transaction_id(self) -> int:
+        """다음에 발급할 transactionId (발급하지 않음)."""
+        row = self._connect().execute("SELECT value FROM settings WHERE key = ?", (NEXT_TRANSACTION_ID_KEY,)).fetchone()
+        return int(row['value']) if row else 1
+
+    def set_next_transaction_id(self, value: int) -> None:
+        """다음 transactionId 를 value 이상으로 올립니다. 카운터를 되돌리지는 않습니다."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO settings (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = max(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+                (NEXT_TRANSACTION_ID_KEY, str(int(value)))
+            )
+
+    def next_transaction_id(self) -> int:
+        """transactionId 를 하나 발급합니다. 한 문장으로 증가시키므로 다른 프로세스와 겹치지 않습니다."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO settings (key, value) VALUES (?, '2') "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (NEXT_TRANSACTION_ID_KEY,)
+            )
+            row = conn.execute("SELECT value FROM settings WHERE key = ?", (NEXT_TRANSACTION_ID_KEY,)).fetchone()
+        return int(row['value']) - 1
+
+    def update_pm_device(self, serialnumber: str, maxcurrent: str):
+        with self._lock, self._connect() as conn:
+            self._upsert_pm_device(conn, serialnumber, maxcurrent)
+        print(f"[PM Device] '{serialnumber}'이(가) 업데이트/추가되었습니다.")
+
+    def update_schedules(self, priority: str, timezone: str, starttime: str, endtime: str):
+        with self._lock, self._connect() as conn:
+            info = {"timezone": timezone, "starttime": starttime, "endtime": endtime}
+            existing = [row['priority'] for row in conn.execute("SELECT priority FROM schedules ORDER BY id")]
+            # JsonConfigManager와 같이 'default' 다음 'priority' 순서로 최대 두 개까지 채웁니다.
+            if priority in existing:
+                self._upsert_schedule(conn, priority, info)
+            elif len(existing) == 0:
+                self._upsert_schedule(conn, 'default', info)
+            elif len(existing) == 1:
+                self._upsert_schedule(conn, 'priority', info)
+            else:
+                print("Schedules are full. Update or delete one of existing schedules.")
+        print(f"[Schedules] '{priority} schedule'이(가) 업데이트/추가되었습니다.")
+
+    def _delete(self, table: str, key_column: str, key: str, label: str):
+        with self._lock, self._connect() as conn:
+            deleted = conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,)).rowcount
+        if deleted:
+            print(f"[{label}] '{key}'이(가) 삭제되었습니다.")
+        else:
+            print(f"[{label}] '{key}'을(를) 찾을 수 없어 삭제를 건너뜁니다.")
+
+    def delete_id_tag(self, id_tag: str):
+        """특정 ID Tag를 데이터에서 삭제합니다."""
+        self._delete('id_tags', 'id_tag', id_tag, 'ID Tag')
+
+    def delete_pm_device(self, serialnumber: str):
+        """특정 device를 데이터에서 삭제합니다."""
+        self._delete('pm_devices', 'serialnumber', serialnumber, 'PM Device')
+
+    def delete_schedule(self, schedule: str):
+        """특정 스케줄을 데이터에서 삭제합니다."""
+        self._delete('schedules', 'priority', schedule, 'Schedules')
+
+    def _get_nth(self, table: str, key_column: str, n: int, label: str):
+        if n < 0:
+            print(f"[{label}] 인덱스 {n}이(가) 범위를 벗어났습니다.")
+            return {}
+        row = self._connect().execute(
+            f"SELECT {key_column} FROM {table} ORDER BY id LIMIT 1 OFFSET ?", (n,)
+        ).fetchone()
+        if row is None:
+            print(f"[{label}] 인덱스 {n}이(가) 범위를 벗어났습니다.")
+            return {}
+        return row[0]
+
+    def get_nth_id_tag(self, n: int) -> Dict[str, Any]:
+        return self._get_nth('id_tags', 'id_tag', n, 'ID Tag')
+
+    def get_nth_pm_device(self, n: int) -> Dict[str, Any]:
+        return self._get_nth('pm_devices', 'serialnumber', n, 'PM Device')
+
+    def get_nth_schedule(self, n: int) -> Dict[str, Any]:
+        return self._get_nth('schedules', 'priority', n, 'Schedules')
+
+
+def migrate_json_to_sqlite(json_file: str, sqlite_file: str = SQLITE_FILE) -> SqliteConfigManager:
+    """
+    기존 shared_data.json의 내용을 SQLite 데이터베이스로 옮깁니다.
+    여러 번 실행해도 같은 결과가 되며(upsert), JSON 파일은 수정하지 않습니다.
+    레코드의 고정 ID도 그대로 옮기므로 API의 /cards/<id> 등은 이전 후에도 같은 레코드를 가리킵니다.
+    """
+    source = JsonConfigManager(json_file)
+    data = source.load_data()
+    _sync_record_ids(data)
+    manager = SqliteConfigManager(sqlite_file)
+    manager.save_data(data)
+    # save_data 는 transactionId 카운터를 건너뛰므로 따로 옮깁니다 (이미 더 크면 그대로 둠).
+    manager.set_next_transaction_id(source.get_next_transaction_id())
+    with manager._lock, manager._connect() as conn:
+        for collection, (table, key_column) in RECORD_TABLES.items():
+            # 모든 행을 음수 임시 ID로 옮긴 뒤 부호를 바꿔 UNIQUE 충돌 없이 ID를 맞춥니다.
+            for key, record_id in data[RECORD_IDS_KEY].get(collection, {}).items():
+                conn.execute(f"UPDATE {table} SET id = ? WHERE {key_column} = ?", (-record_id, key))
+            conn.execute(f"UPDATE {table} SET id = -id WHERE id < 0")
+    print(
+        f"[Migrate] '{json_file}' → '{sqlite_file}': "
+        f"chargers {len(data.get(CHARGERS_KEY, {}))}, id tags {len(data.get(ID_TAGS_KEY, {}))}, "
+        f"pm devices {len(data.get(PM_DEVICES_KEY, {}))}, schedules {len(data.get(SCHEDULES_KEY, {}))}"
+    )
+    return manager
+
+
+# --- 사용 예시 ---
+# $ python -m ocpp16.sqlite_manager ocpp16/shared_data.json ocpp16/shared_data.sqlite
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else 'ocpp16/shared_data.json'
+    target = sys.argv[2] if len(sys.argv) > 2 else SQLITE_FILE
+    migrate_json_to_sqlite(source, target)
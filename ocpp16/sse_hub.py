@@ -0,0 +1,167 @@
+# sse_hub.py
+"""
+Redis Pub/Sub → 여러 SSE 클라이언트 팬아웃 허브 (Flask 등 스레드 기반 서버용).
+
+- Redis 구독은 백그라운드 스레드 하나만 사용하고, 메시지마다 이벤트 ID를 붙여 모든 클라이언트 큐에 넣습니다.
+- 클라이언트 큐는 길이가 제한된 deque 이므로, 느린 클라이언트는 오래된 이벤트부터 버리고 최신 값을 받습니다.
+- 최근 history 건을 메모리에 보관해 재연결 시 Last-Event-ID 이후 이벤트를 다시 보내줍니다.
+- 이벤트가 없으면 keepalive 초마다 주석(: keepalive)을 보내 프록시/브라우저 연결을 유지합니다.
+
+    $ python -m ocpp16.sse_hub     # 사용 예시 (Redis 없이 publish 로 동작 확인)
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterator, List, Optional, Set, Tuple
+
+Event = Tuple[int, Optional[str], str]  # (id, event 이름, data)
+
+
+class SseClient:
+    def __init__(self, max_queue: int):
+        self.queue: Deque[Event] = deque(maxlen=max_queue)
+        self.dropped = 0
+
+
+class SseHub:
+    """
+    channels 를 구독해 받은 메시지를 모든 클라이언트에 전달합니다.
+    channel_events 로 채널별 SSE event 이름을 지정할 수 있으며, 지정하지 않으면 기본(message) 이벤트입니다.
+    """
+    def __init__(self, redis_factory: Optional[Callable[[], object]], channels: List[str],
+                 channel_events: Optional[dict] = None, history: int = 256, client_queue: int = 64,
+                 keepalive: float = 15.0, reconnect_delay: float = 3.0):
+        self.redis_factory = redis_factory
+        self.channels = list(channels)
+        self.channel_events = dict(channel_events or {})
+        self.keepalive = keepalive
+        self.reconnect_delay = reconnect_delay
+        self.client_queue = client_queue
+        self.published = 0
+        self.dropped = 0
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._clients: Set[SseClient] = set()
+        self._ids = itertools.count(int(time.time() * 1000))  # 재시작 후에도 ID가 줄어들지 않도록
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    # =======================================================
+    # 발행
+    # =======================================================
+
+    def start(self) -> None:
+        """Redis 구독 스레드를 시작합니다. 여러 번 호출해도 한 번만 시작합니다."""
+        with self._cond:
+            if self._thread is not None or self.redis_factory is None:
+                return
+            self._thread = threading.Thread(target=self._listen, name="sse-hub", daemon=True)
+            self._thread.start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.redis_factory().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(*self.channels)
+                print(f"[SSE] Subscribed to {', '.join(self.channels)}")
+                for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    channel = message.get('channel')
+                    self.publish(message['data'], self.channel_events.get(channel))
+            except Exception as e:
+                print(f"[SSE] Redis subscription error: {e}, retrying in {self.reconnect_delay}s")
+            time.sleep(self.reconnect_delay)
+
+    def publish(self, data: str, event: Optional[str] = None) -> int:
+        """모든 클라이언트 큐에 이벤트를 넣습니다. 클라이언트마다 deque append 한 번입니다."""
+        with self._cond:
+            item = (next(self._ids), event, data)
+            self._history.append(item)
+            for client in self._clients:
+                if len(client.queue) == client.queue.maxlen:
+                    # 가득 찬 큐는 가장 오래된 이벤트를 버립니다 (최신 값 우선).
+                    client.dropped += 1
+                    self.dropped += 1
+                client.queue.append(item)
+            self.published += 1
+            self._cond.notify_all()
+            return item[0]
+
+    # =======================================================
+    # 구독
+    # =======================================================
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> SseClient:
+        client = SseClient(self.client_queue)
+        with self._cond:
+            if last_event_id:
+                try:
+                    last = int(last_event_id)
+                except ValueError:
+                    last = None
+                if last is not None:
+                    client.queue.extend(item for item in self._history if item[0] > last)
+            self._clients.add(client)
+        self.start()
+        return client
+
+    def unsubscribe(self, client: SseClient) -> None:
+        with self._cond:
+            self._clients.discard(client)
+
+    def stream(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """SSE 응답 본문 제너레이터. 응답이 끝나면(클라이언트 연결 종료) 구독을 해제합니다."""
+        client = self.subscribe(last_event_id)
+        try:
+            # 재연결 지연(ms)을 알려줍니다.
+            yield f"retry: {int(self.reconnect_delay * 1000)}\n\n"
+            while True:
+                with self._cond:
+                    if not client.queue:
+                        self._cond.wait(self.keepalive)
+                    items = list(client.queue)
+                    client.queue.clear()
+                if not items:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(_format(item) for item in items)
+        finally:
+            self.unsubscribe(client)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {'clients': len(self._clients), 'published': self.published,
+                    'dropped': self.dropped, 'history': len(self._history)}
+
+
+def _format(item: Event) -> str:
+    event_id, event, data = item
+    lines = [f"id: {event_id}"]
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in str(data).split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+# --- 사용 예시 ---
+if __name__ == '__main__':
+    hub = SseHub(None, [], client_queue=4, keepalive=0.5)
+
+    def reader(name: str, delay: float, last_event_id: Optional[str] = None) -> None:
+        for chunk in hub.stream(last_event_id):
+            print(f"[{name}] {chunk.strip()!r}")
+            time.sleep(delay)
+
+    threading.Thread(target=reader, args=("fast", 0.0), daemon=True).start()
+    threading.Thread(target=reader, args=("slow", 1.0), daemon=True).start()
+    time.sleep(0.1)
+    first_id = None
+    for i in range(10):
+        event_id = hub.publish(f"{i * 1.1:.3f}A")
+        first_id = first_id or event_id
+        time.sleep(0.05)
+    # 재연결한 클라이언트는 Last-Event-ID 이후 이벤트를 다시 받습니다.
+    threading.Thread(target=reader, args=("replay", 0.0, str(first_id + 6)), daemon=True).start()
+    time.sleep(2.5)
+    print(hub.stats())
@@ -0,0 +1,364 @@
+# timeseries.py
+"""
+전력 계측기 측정값의 다중 해상도 시계열 저장소.
+
+- 원본 측정값: 계측기별 메모리 링 버퍼(raw_capacity 건)에만 보관합니다.
+- 롤업: 1초 → 1분 → 1시간 버킷으로 필드별 min/max/avg/last를 집계합니다.
+  버킷이 끝날 때마다 고정 길이 바이너리 레코드로 세그먼트 파일에 추가합니다.
+
+    {directory}/{serial}/{resolution}/{segment}.seg
+
+  세그먼트 하나는 SEGMENT_SPAN[resolution] 초 구간을 담으며, retention이 지난 세그먼트는 통째로 지웁니다.
+- 조회: 요청한 step 이하의 가장 큰 해상도를 골라 해당 구간 세그먼트만 읽고 step 단위로 다시 묶습니다.
+
+기록은 pm_server(이벤트 루프 한 곳)에서만 하고, Flask API는 같은 디렉터리를 읽기만 합니다.
+이벤트 루프는 끝난 버킷의 레코드를 큐에 넣기만 하고, 파일 열기/세그먼트 교체/쓰기는 모두
+flush() 가 합니다. flush()/enforce_retention() 은 디스크를 기다리므로 pm_server 는 이를 스레드에서 실행하며,
+열린 세그먼트 파일은 store 의 lock 으로 보호합니다 (이벤트 루프는 이 lock 을 잡지 않습니다).
+
+    $ python -m ocpp16.timeseries     # 사용 예시
+"""
+import bisect
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+TS_DIR = 'ocpp16/timeseries'
+FIELDS = ('voltage', 'current', 'power', 'energy', 'frequency', 'pf')
+RESOLUTIONS = (1, 60, 3600)
+SEGMENT_SPAN = {1: 86400, 60: 30 * 86400, 3600: 366 * 86400}
+DEFAULT_RETENTION = {1: 2 * 86400, 60: 90 * 86400, 3600: 5 * 365 * 86400}
+MAX_POINTS = 1000
+
+# 버킷 시작(uint32), 샘플 수(uint32), 필드별 min/max/avg/last(float32)
+RECORD = struct.Struct('<II' + 'f' * (4 * len(FIELDS)))
+_START = struct.Struct('<I')
+NAN = float('nan')
+
+
+def _safe_name(serial: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', serial)
+
+
+class _RecordStarts:
+    """세그먼트 레코드의 버킷 시작 시각을 시퀀스처럼 보여줍니다 (bisect 용)."""
+    __slots__ = ('data', 'count')
+
+    def __init__(self, data, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        return _START.unpack_from(self.data, index * RECORD.size)[0]
+
+
+class _Bucket:
+    """
+    한 해상도 버킷의 집계 중간값. 값이 없는(NaN) 필드는 건너뛰고,
+    평균은 필드별로 값이 있었던 샘플 수 (counts) 로 나눕니다.
+    """
+    __slots__ = ('start', 'count', 'counts', 'mins', 'maxs', 'sums', 'lasts')
+
+    def __init__(self, start: int):
+        n = len(FIELDS)
+        self.start = start
+        self.count = 0
+        self.counts = [0] * n
+        self.mins = [math.inf] * n
+        self.maxs = [-math.inf] * n
+        self.sums = [0.0] * n
+        self.lasts = [NAN] * n
+
+    def add_sample(self, values: List[float]) -> None:
+        self.count += 1
+        for i, v in enumerate(values):
+            if v != v:
+                continue
+            if v < self.mins[i]:
+                self.mins[i] = v
+            if v > self.maxs[i]:
+                self.maxs[i] = v
+            self.sums[i] += v
+            self.counts[i] += 1
+            self.lasts[i] = v
+
+    def add_record(self, count: int, stats: Tuple[float, ...], counts: Optional[List[int]] = None) -> None:
+        """
+        하위 해상도 레코드(min, max, avg, last 순서)를 합칩니다.
+        counts 는 필드별 샘플 수이며, 없으면 (파일에서 읽은 레코드) 필드마다 count 로 봅니다.
+        """
+        self.count += count
+        for i in range(len(FIELDS)):
+            mn, mx, avg, last = stats[4 * i:4 * i + 4]
+            if avg != avg:
+                continue
+            weight = count if counts is None else counts[i]
+            if mn < self.mins[i]:
+                self.mins[i] = mn
+            if mx > self.maxs[i]:
+                self.maxs[i] = mx
+            self.sums[i] += avg * weight
+            self.counts[i] += weight
+            self.lasts[i] = last
+
+    def stats(self) -> Tuple[float, ...]:
+        out: List[float] = []
+        for i in range(len(FIELDS)):
+            if self.mins[i] == math.inf or not self.counts[i]:
+                out += (NAN, NAN, NAN, NAN)
+            else:
+                out += (self.mins[i], self.maxs[i], self.sums[i] / self.counts[i], self.lasts[i])
+        return tuple(out)
+
+    def pack(self) -> bytes:
+        return RECORD.pack(self.start, self.count, *self.stats())
+
+    def to_point(self) -> Dict[str, Any]:
+        point: Dict[str, Any] = {'t': self.start, 'count': self.count}
+        stats = self.stats()
+        for i, field in enumerate(FIELDS):
+            mn, mx, avg, last = stats[4 * i:4 * i + 4]
+            point[field] = None if avg != avg else {
+                'min': round(mn, 4), 'max': round(mx, 4), 'avg': round(avg, 4), 'last': round(last, 4)}
+        return point
+
+
+class TimeSeriesStore:
+    """
+    add()로 측정값을 넣으면 해상도별 버킷을 갱신하고, 끝난 버킷을 세그먼트 파일에 추가합니다.
+    끝난 버킷은 큐에만 쌓이므로 flush()를 주기적으로 호출해야 파일에 기록되어 다른 프로세스에서 보입니다.
+    """
+    def __init__(self, directory: str = TS_DIR, raw_capacity: int = 3600,
+                 retention: Optional[Dict[int, int]] = None):
+        self.directory = directory
+        self.raw_capacity = raw_capacity
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self._raw: Dict[str, Deque[Tuple[float, List[float]]]] = {}
+        self._buckets: Dict[str, List[Optional[_Bucket]]] = {}
+        self._pending: Deque[Tuple[str, int, int, bytes]] = deque()  # 기록 대기 레코드 (serial, 해상도, 세그먼트, 레코드)
+        self._files: Dict[Tuple[str, int], Tuple[int, Any]] = {}
+        self._lock = threading.Lock()  # _files 와 파일 버퍼 (flush 는 다른 스레드에서 실행될 수 있음)
+
+    # =======================================================
+    # 기록
+    # =======================================================
+
+    def add(self, serial: str, reading: Dict[str, Any], ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        values = []
+        for field in FIELDS:
+            try:
+                values.append(float(reading[field]))
+            except (KeyError, TypeError, ValueError):
+                values.append(NAN)
+
+        raw = self._raw.get(serial)
+        if raw is None:
+            raw = self._raw[serial] = deque(maxlen=self.raw_capacity)
+            self._buckets[serial] = [None] * len(RESOLUTIONS)
+        raw.append((ts, values))
+
+        second = int(ts)
+        bucket = self._buckets[serial][0]
+        if bucket is not None and bucket.start != second:
+            self._close_bucket(serial, 0)
+            bucket = None
+        if bucket is None:
+            bucket = self._buckets[serial][0] = _Bucket(second)
+        bucket.add_sample(values)
+
+    def _close_bucket(self, serial: str, level: int) -> None:
+        """level 버킷을 기록하고 상위 해상도 버킷에 합칩니다."""
+        bucket = self._buckets[serial][level]
+        self._buckets[serial][level] = None
+        if bucket is None or not bucket.count:
+            return
+        self._append(serial, RESOLUTIONS[level], bucket)
+        if level + 1 >= len(RESOLUTIONS):
+            return
+        resolution = RESOLUTIONS[level + 1]
+        start = bucket.start - bucket.start % resolution
+        parent = self._buckets[serial][level + 1]
+        if parent is not None and parent.start != start:
+            self._close_bucket(serial, level + 1)
+            parent = None
+        if parent is None:
+            parent = self._buckets[serial][level + 1] = _Bucket(start)
+        parent.add_record(bucket.count, bucket.stats(), bucket.counts)
+
+    def _segment_path(self, serial: str, resolution: int, segment: int) -> str:
+        return os.path.join(self.directory, _safe_name(serial), str(resolution), f"{segment}.seg")
+
+    def _append(self, serial: str, resolution: int, bucket: _Bucket) -> None:
+        # 이벤트 루프에서 호출됩니다: 디스크는 건드리지 않고 큐에만 넣습니다 (deque.append 는 스레드 안전).
+        self._pending.append((serial, resolution, bucket.start // SEGMENT_SPAN[resolution], bucket.pack()))
+
+    def _write_pending(self) -> None:
+        """큐에 쌓인 레코드를 세그먼트 파일에 씁니다. self._lock 을 잡은 채로 호출해야 합니다."""
+        while self._pending:
+            serial, resolution, segment, record = self._pending.popleft()
+            key = (serial, resolution)
+            opened = self._files.get(key)
+            if opened is None or opened[0] != segment:
+                if opened is not None:
+                    opened[1].close()
+                path = self._segment_path(serial, resolution, segment)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                opened = self._files[key] = (segment, open(path, 'ab'))
+            opened[1].write(record)
+
+    def flush(self) -> None:
+        """큐에 쌓인 레코드를 파일에 씁니다. 다른 스레드에서 호출해도 됩니다."""
+        with self._lock:
+            self._write_pending()
+            for _, f in self._files.values():
+                f.flush()
+
+    def close(self) -> None:
+        """진행 중인 버킷까지 기록하고 파일을 닫습니다. 재시작 후 같은 구간의 레코드는 조회 시 합쳐집니다."""
+        for serial in self._buckets:
+            for level in range(len(RESOLUTIONS)):
+                self._close_bucket(serial, level)
+        with self._lock:
+            self._write_pending()
+            for _, f in self._files.values():
+                f.close()
+            self._files.clear()
+
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        """
+        보관 기간이 지난 세그먼트 파일을 지우고, 지운 개수를 반환합니다. 다른 스레드에서 호출해도 됩니다.
+        디렉터리 탐색은 lock 없이 하고, 파일을 지울 때만 lock 을 잡아 기록 중인 세그먼트와 겹치지 않게 합니다.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for serial_dir in os.listdir(self.directory):
+            for resolution in RESOLUTIONS:
+                res_dir = os.path.join(self.directory, serial_dir, str(resolution))
+                if not os.path.isdir(res_dir):
+                    continue
+                span = SEGMENT_SPAN[resolution]
+                for name in os.listdir(res_dir):
+                    stem, ext = os.path.splitext(name)
+                    if ext != '.seg' or not stem.isdigit():
+                        continue
+                    if (int(stem) + 1) * span < now - self.retention[resolution]:
+                        with self._lock:
+                            if any(opened[1].name == os.path.join(res_dir, name) for opened in self._files.values()):
+                                continue
+                            os.remove(os.path.join(res_dir, name))
+                        removed += 1
+        return removed
+
+    # =======================================================
+    # 조회
+    # =======================================================
+
+    def recent(self, serial: str, seconds: float) -> List[Dict[str, Any]]:
+        """링 버퍼에서 최근 seconds 초의 원본 측정값을 반환합니다 (기록하는 프로세스에서만 사용)."""
+        since = time.time() - seconds
+        return [dict(zip(FIELDS, values), t=ts)
+                for ts, values in self._raw.get(serial, ()) if ts >= since]
+
+    def serials(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.listdir(self.directory))
+
+    def _records(self, serial: str, resolution: int, start: int, end: int) -> Iterator[Tuple[int, int, Tuple[float, ...]]]:
+        span = SEGMENT_SPAN[resolution]
+        for segment in range(start // span, (end - 1) // span + 1):
+            path = self._segment_path(serial, resolution, segment)
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                if size < RECORD.size:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    # 기록 중인 마지막 레코드가 잘려 있을 수 있으므로 완전한 레코드만 읽습니다.
+                    # 레코드는 시간순으로 추가되므로 이진 탐색으로 구간의 처음과 끝만 찾습니다.
+                    starts = _RecordStarts(data, size // RECORD.size)
+                    lo = bisect.bisect_left(starts, start)
+                    hi = bisect.bisect_left(starts, end, lo)
+                    for i in range(lo, hi):
+                        record = RECORD.unpack_from(data, i * RECORD.size)
+                        yield record[0], record[1], record[2:]
+
+    def choose_resolution(self, start: float, end: float, step: Optional[float] = None,
+                          max_points: int = MAX_POINTS, now: Optional[float] = None) -> Tuple[int, int]:
+        """
+        (해상도, step)을 고릅니다. step 은 max_points 를 넘지 않도록 늘리며 (지정한 경우에도),
+        고른 해상도의 보관 기간이 start 를 덮지 못하면 start 를 덮는 가장 세밀한 해상도로 올립니다.
+        """
+        now = time.time() if now is None else now
+        step = max(step or 0, (end - start) / max_points, 1)
+        step = max(int(math.ceil(step)), 1)
+        resolution = max(r for r in RESOLUTIONS if r <= step)
+        covering = [r for r in RESOLUTIONS if r >= resolution and now - start <= self.retention[r]]
+        resolution = covering[0] if covering else RESOLUTIONS[-1]
+        # step은 해상도의 배수로 맞춥니다.
+        step = int(math.ceil(step / resolution)) * resolution
+        return resolution, step
+
+    def query(self, serial: str, start: float, end: float, step: Optional[float] = None,
+              max_points: int = MAX_POINTS) -> Dict[str, Any]:
+        """[start, end) 구간을 step 초 단위 min/max/avg/last로 반환합니다."""
+        resolution, step = self.choose_resolution(start, end, step, max_points)
+        start_i, end_i = int(start), int(math.ceil(end))
+        points: List[Dict[str, Any]] = []
+        bucket: Optional[_Bucket] = None
+        for t, count, stats in self._records(serial, resolution, start_i, end_i):
+            bucket_start = t - t % step
+            if bucket is None or bucket.start != bucket_start:
+                if bucket is not None:
+                    points.append(bucket.to_point())
+                bucket = _Bucket(bucket_start)
+            bucket.add_record(count, stats)
+        if bucket is not None:
+            points.append(bucket.to_point())
+        return {'serial': serial, 'from': start_i, 'to': end_i, 'resolution': resolution,
+                'step': step, 'points': points}
+
+
+# --- 사용 예시 ---
+if __name__ == '__main__':
+    import random
+    import shutil
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    store = TimeSeriesStore(directory)
+    now = int(time.time()) // 3600 * 3600
+    start = now - 3 * 3600
+    started = time.perf_counter()
+    for second in range(start, now):
+        for k in range(2):  # 초당 2건
+            store.add('PM10200787', {
+                'voltage': 220 + random.random() * 10, 'current': 10 + random.random() * 20,
+                'power': 2000 + random.random() * 5000, 'energy': (second - start) / 3600.0,
+                'frequency': 60.0, 'pf': 0.95}, ts=second + k * 0.5)
+    store.close()
+    print(f"ingested {2 * (now - start)} readings in {time.perf_counter() - started:.2f}s")
+
+    for step in (None, 10, 60, 900, 3600):
+        began = time.perf_counter()
+        result = store.query('PM10200787', start, now, step)
+        first = result['points'][0]
+        print(f"step={step}: resolution {result['resolution']}s, step {result['step']}s, "
+              f"{len(result['points'])} points in {(time.perf_counter() - began) * 1000:.1f}ms, "
+              f"first power {first['power']}")
+    shutil.rmtree(directory)
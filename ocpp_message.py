@@ -1,19 +1,39 @@
 # ocpp_message.py
 import asyncio
-import json
+import heapq
+import math
+import random
 import uuid
+from collections import Counter
 from datetime import datetime, timezone
-from fastapi import FastAPI, WebSocket
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import FastAPI, WebSocket, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
-from ocpp16.data_manager import JsonConfigManager
-from ocpp16.shared_data import ENERGY_USAGE_DATA
+import redis.asyncio as aioredis
+from ocpp16.shared_data import ENERGY_USAGE_DATA, SharedDataManager
+from ocpp16 import codec
+from ocpp16.ocpp_logger import FrameLogger, DEBUG, INFO, WARNING, ERROR
+from ocpp16.ocpp_schema import Validator, compile_request_validator
+from ocpp16.call_manager import OutboundCallManager, OUTBOUND_ACTIONS, CallError, ChargerDisconnected
+from ocpp16.jobs import JobManager, FINISHED_STATUSES
+from ocpp16.push_gateway import PushGateway
+from ocpp16.load_manager import LoadManager, charge_point_max_profile
+from ocpp16.schedule_engine import ScheduleEngine, windows_from_config
+from ocpp16.liveness import LivenessTracker
+from ocpp16.conn_registry import ConnectionRegistry, WorkerUnavailable
+from ocpp16.outbound_queue import OutboundQueue, QueueClosed, coalesce_key
+from ocpp16.rate_limit import DEFAULT_PROFILE, InboundLimiter, merge_profile, resolve_profile
+from ocpp16.admission import BootAdmission
 
 class SendMessage(BaseModel):
     messageId: str
     chargerId: str
     data: dict
+    timeout: Optional[float] = None  # 충전기 응답 대기 시간 (초)
+    callbackUrl: Optional[str] = None  # 작업 완료 시 결과를 POST 할 URL
 
 app = FastAPI()
 app.add_middleware(
@@ -26,9 +46,26 @@ app.add_middleware(
 
 JSON_FILE = 'ocpp16/shared_data.json'
 
-data_manager = JsonConfigManager(JSON_FILE)
+data_manager = SharedDataManager(JSON_FILE)  # 읽기는 메모리 스냅샷, 쓰기는 executor (이벤트 루프를 막지 않음)
 connected_clients = {}  # client_id → websocket
-pending_responses = {}  # client_id → asyncio.Future
+outbound_queues: Dict[str, OutboundQueue] = {}  # client_id → 송신 큐 (writer task 가 순서대로 전송)
+inbound_limiters: Dict[str, InboundLimiter] = {}  # client_id → 수신 제한 (token bucket)
+pending_responses = {}  # client_id → asyncio.Future (uvCardRegister: 다음 Authorize idTag 대기)
+call_manager = OutboundCallManager(default_timeout=30.0)  # unique_id → 서버가 보낸 CALL의 응답 대기
+MAX_JOB_WAIT = 60.0  # GET /jobs/{job_id}?wait= 롱폴링 최대 대기 시간 (초)
+CALLBACK_ALLOWLIST = {('http', '127.0.0.1:5001'), ('http', 'localhost:5001')}  # callbackUrl 로 허용할 (scheme, host[:port]), 기본은 Flask 앱
+
+# --- 🧩 다중 worker 설정 ---
+WORKERS = 1            # uvicorn worker 프로세스 수. 2 이상이면 Redis 연결 등록부로 요청을 전달합니다.
+CONN_LEASE_TTL = 90.0  # 충전기 → worker 등록 임대 시간 (초), 살아 있는 충전기는 1/3 주기로 갱신
+FORWARD_MARGIN = 5.0   # 다른 worker 로 전달한 요청의 추가 대기 시간 (초)
+LOAD_LEADER_TTL = 6.0  # 부하 관리 leader 임대 시간 (초). leader 가 멈추면 이 시간 뒤 다른 worker 가 이어받음
+registry = ConnectionRegistry(lambda: aioredis.Redis(decode_responses=True), lease_ttl=CONN_LEASE_TTL)
+# 작업 ID에 worker ID를 붙여 어느 worker 에 조회해도 작업을 만든 worker 로 전달합니다.
+jobs = JobManager(retention=600.0, id_prefix=f"{registry.worker_id}." if WORKERS > 1 else '',
+                  callback_allowlist=CALLBACK_ALLOWLIST)  # job_id → /send 작업
+# 여러 worker 이면 charger:<id> 이벤트를 Redis 로 보내 모든 worker 의 대시보드가 받게 합니다.
+push = PushGateway(lambda: aioredis.Redis(decode_responses=True), shared=WORKERS > 1)  # 대시보드 푸시 (계측기/충전기 토픽)
 
 # --- 🔌 OCPP 서버 설정 ---
 OCPP_HOST = '127.0.0.1'
@@ -38,6 +75,65 @@ OCPP_PORT = 443
 CERT_FILE = 'certificate/open-ocpp_central-system.crt' 
 KEY_FILE = 'certificate/open-ocpp_central-system.key'
 HB_INTERVAL = 180 # Heartbeat 주기 (초)
+LIVENESS_STALE_AFTER = HB_INTERVAL * 1.5    # 이 시간 동안 프레임이 없으면 stale
+LIVENESS_OFFLINE_AFTER = HB_INTERVAL * 2.5  # 이 시간 동안 프레임이 없으면 offline 처리 후 연결 종료
+CONNECTED_FLUSH_INTERVAL = 5.0  # registered_chargers 의 connected 값을 모아서 기록하는 주기 (초)
+OUTBOUND_MAX_MESSAGES = 100       # 충전기별 송신 대기 메시지 수 상한, 넘으면 연결 종료
+OUTBOUND_MAX_BYTES = 256 * 1024   # 충전기별 송신 대기 바이트 상한, 넘으면 연결 종료
+
+# --- 🔁 재연결 폭주 대응 설정 (worker 별) ---
+BOOT_MAX_INFLIGHT = 50     # 동시에 수락 후 초기 메시지를 처리 중인 충전기 수 상한
+BOOT_SETTLE_TIME = 2.0     # 수락한 충전기가 슬롯을 차지하는 시간 (초)
+BOOT_PENDING_MIN = 5       # Pending 응답 interval 하한 (초)
+BOOT_PENDING_MAX = 300     # Pending 응답 interval 상한 (초)
+
+# --- 🚦 수신 제한 설정 ---
+# "<vendor>" 또는 "<vendor>/<model>" → ocpp16.rate_limit.DEFAULT_PROFILE 에서 바꿀 항목.
+# registered_chargers 항목에 "rateLimit" 을 두면 그 충전기만 따로 바꿀 수 있습니다.
+RATE_LIMIT_PROFILES = {
+    # "Jinyoung/JY-070-W4": {"actions": {"StatusNotification": [1.0, 10]}},
+}
+# Pending 을 받은 충전기는 BOOT_PENDING_MIN 초 이상 간격으로 BootNotification 을 다시 보내므로,
+# 그 재시도가 제한에 걸려 CALLERROR(와 연결 종료 위반)가 되지 않도록 기본 버킷을 그보다 빠르게 둡니다.
+_boot_rate, _boot_burst = DEFAULT_PROFILE["actions"]["BootNotification"]
+RATE_LIMIT_DEFAULT = merge_profile(DEFAULT_PROFILE, {"actions": {
+    "BootNotification": [max(_boot_rate, 1.0 / BOOT_PENDING_MIN), _boot_burst]}})
+# uvicorn 이 프레임 전체를 버퍼링하기 전에 프로토콜 단계에서 거부할 웹소켓 메시지 크기 (바이트).
+# max_frame 은 문자 수이므로 UTF-8 최대 4바이트로 환산하며, 충전기별 "rateLimit" 도 이 값을 넘을 수 없습니다.
+WS_MAX_SIZE = 4 * max(int(profile.get("max_frame", RATE_LIMIT_DEFAULT["max_frame"]))
+                      for profile in (RATE_LIMIT_DEFAULT, *RATE_LIMIT_PROFILES.values()))
+
+# --- ⚡ 동적 부하 관리 설정 ---
+LOAD_MANAGEMENT = False  # pm_devices 계측기 전류로 충전기 전류 한도(SetChargingProfile) 조정
+LOAD_MIN_CURRENT = 6.0   # 충전기별 최소 충전 전류 (A), 이보다 적게 줄 수 없으면 0A
+LOAD_MAX_CURRENT = 32.0  # 충전기별 최대 전류 한도 (A)
+LOAD_MARGIN = 1.0        # maxcurrent 아래로 남겨 둘 여유 (A)
+LOAD_HYSTERESIS = 1.0    # 이보다 작은 여유/초과에는 한도를 바꾸지 않음 (A)
+
+# --- 🕗 예약 충전 설정 ---
+SCHEDULE_PROFILE_ID = 701  # 예약 충전 전용 TxDefaultProfile ID
+
+# --- 📝 메시지 로그 설정 ---
+LOG_LEVEL = INFO
+LOG_CHARGER_LEVELS = {}  # charger_id → 최소 레벨 (예: {"PL10200787": DEBUG})
+LOG_ACTION_LEVELS = {}   # action → 최소 레벨 (예: {"StatusNotification": WARNING})
+LOG_SAMPLE_EVERY = {"Heartbeat": 100, "MeterValues": 10}  # 빈도가 높은 action은 N개 중 1개만 기록
+
+frame_log = FrameLogger(
+    level=LOG_LEVEL,
+    charger_levels=LOG_CHARGER_LEVELS,
+    action_levels=LOG_ACTION_LEVELS,
+    sample_every=LOG_SAMPLE_EVERY,
+)
+
+background_tasks = set()  # 끝날 때까지 참조를 유지할 fire-and-forget task
+
+def spawn(coro) -> asyncio.Task:
+    """task 를 만들고 완료될 때까지 참조를 유지합니다 (참조가 없으면 실행 중에 GC 될 수 있음)."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 
 # --- 🔌 OCPP 연결 관리 함수 ---
@@ -63,7 +159,7 @@ async def ocpp_connection_handler(websocket, path):
         # 메시지 라우팅을 외부 모듈(ocpp_message.py)의 함수로 전달
         async for message in websocket:
             try:
-                await route_ocpp_message(charger_id, message, websocket, SHARED_DATA, HB_INTERVAL)
+                await route_ocpp_message(charger_id, message, websocket)
             except Exception as e:
                 print(f"[{charger_id}] [error] 메시지 처리 중 오류 발생 in ocpp_connection_handler(): {e}")
             
@@ -82,93 +178,619 @@ async def ocpp_connection_handler(websocket, path):
 # @app.websocket("/openocpp/{charger_id}")
 @app.websocket("/{charger_id}")
 async def ws_endpoint(websocket: WebSocket, charger_id: str):
-    await websocket.accept()
-
-    # if charger_id in SHARED_DATA['registered_chargers']:
-    SHARED_DATA = data_manager.load_data()
-    if charger_id in SHARED_DATA['registered_chargers']:
-        connected_clients[charger_id] = websocket
-        print(f"Client {charger_id} connected")
-    else:
-        print(f"Client {charger_id} not registered. Closing connection.")
-        await websocket.close()
+    global handshake_rejected
+    # 미등록 충전기는 accept 전에 닫아 WebSocket 업그레이드 자체를 거부합니다 (HTTP 403).
+    charger_info = await data_manager.get_charger_info(charger_id)
+    if charger_info is None:
+        handshake_rejected += 1
+        frame_log.event(charger_id, 'rejected_unregistered', WARNING)
+        await websocket.close(code=1008)
         return
 
+    await websocket.accept()
+    connected_clients[charger_id] = websocket
+    queue = open_outbound_queue(charger_id, websocket)
+    limiter = inbound_limiters[charger_id] = InboundLimiter(
+        resolve_profile(charger_info, RATE_LIMIT_PROFILES, RATE_LIMIT_DEFAULT), totals=inbound_throttled)
+    frame_log.event(charger_id, 'connected')
+    await push.publish_shared(f"charger:{charger_id}", {"event": "connected"})
+    load_manager.on_charger_connected(charger_id)
+    liveness.seen(charger_id)
+    await register_connection(charger_id, True)
+
     try:
         while True:
             message = await websocket.receive_text() 
-            try:
-                await route_ocpp_message(charger_id, message, websocket, SHARED_DATA, HB_INTERVAL)
-            except json.JSONDecodeError:
-                print(f"[{charger_id}] [error] JSON 디코딩 오류: 수신된 메시지가 유효한 JSON이 아닙니다.")
-            except Exception as e:
-                print(f"[{charger_id}] [error] 메시지 처리 중 예외 발생: {e}")
+            if queue.closed:
+                # 송신 큐가 넘쳐 연결을 끊는 중입니다.
+                break
+            if limiter.check_frame(len(message)):
+                frame_log.event(charger_id, 'frame_too_large', WARNING, size=len(message), maxFrame=limiter.max_frame)
+            else:
+                try:
+                    await route_ocpp_message(charger_id, message, websocket)
+                except Exception as e:
+                    frame_log.event(charger_id, 'route_error', ERROR, error=str(e))
+            if limiter.should_close:
+                await close_rate_limited(charger_id, websocket, limiter)
+                break
+            # 이미 받아 둔 프레임이 많아도 다른 연결과 송신 writer 가 실행될 수 있게 양보합니다.
+            await asyncio.sleep(0)
 
     except Exception as e:
-        print(f"Client {charger_id} error: {e}")
+        frame_log.event(charger_id, 'disconnected', reason=str(e))
     finally:
-        connected_clients.pop(charger_id, None)
+        queue.close()
+        if outbound_queues.get(charger_id) is queue:
+            outbound_queues.pop(charger_id, None)
+        if inbound_limiters.get(charger_id) is limiter:
+            inbound_limiters.pop(charger_id, None)
+        boot_admission.forget(charger_id)
+        if connected_clients.get(charger_id) is websocket:
+            connected_clients.pop(charger_id, None)
+            # 이 충전기로 보낸 요청의 응답 대기를 모두 정리합니다.
+            cancelled = call_manager.cancel_charger(charger_id)
+            if cancelled:
+                frame_log.event(charger_id, 'pending_calls_cancelled', WARNING, count=cancelled)
+            await push.publish_shared(f"charger:{charger_id}", {"event": "disconnected"})
+            load_manager.on_charger_disconnected(charger_id)
+            liveness.remove(charger_id)
+            await register_connection(charger_id, False)
+
+outbound_overflows = 0
+boot_admission = BootAdmission(BOOT_MAX_INFLIGHT, BOOT_SETTLE_TIME, BOOT_PENDING_MIN, BOOT_PENDING_MAX)
+handshake_rejected = 0
+inbound_throttled: Counter = Counter()  # (사유, action) → 처리하지 않은 프레임 수
+rate_limit_closed = 0
+
+async def close_rate_limited(charger_id: str, websocket, limiter: InboundLimiter):
+    """제한을 반복해서 넘긴 충전기의 연결을 끊습니다."""
+    global rate_limit_closed
+    rate_limit_closed += 1
+    frame_log.event(charger_id, 'rate_limit_close', WARNING, throttled=limiter.stats()['throttled'])
+    try:
+        await websocket.close(code=1008)
+    except Exception:
+        pass
+
+def open_outbound_queue(charger_id: str, websocket) -> OutboundQueue:
+    """연결의 송신 큐와 writer task 를 만듭니다. 큐가 넘치면 연결을 끊습니다."""
+    def on_overflow():
+        global outbound_overflows
+        outbound_overflows += 1
+        frame_log.event(charger_id, 'outbound_overflow', WARNING, maxMessages=OUTBOUND_MAX_MESSAGES, maxBytes=OUTBOUND_MAX_BYTES)
+        spawn(websocket.close(code=1013))
+
+    def on_error(e: Exception):
+        frame_log.event(charger_id, 'send_failed', ERROR, error=str(e))
+
+    queue = OutboundQueue(websocket.send_text, OUTBOUND_MAX_MESSAGES, OUTBOUND_MAX_BYTES, on_overflow, on_error)
+    outbound_queues[charger_id] = queue
+    queue.start()
+    return queue
+
+async def send_frame(charger_id: str, websocket, message: str):
+    """응답 프레임을 송신 큐에 넣습니다. 큐가 없는 연결은 바로 전송합니다."""
+    queue = outbound_queues.get(charger_id)
+    if queue is None:
+        await websocket.send_text(message)
+    else:
+        queue.put(message)
 
-@app.post("/send")
+async def send_call(charger_id: str, action: str, payload: dict, timeout: Optional[float] = None) -> dict:
+    """
+    연결된 충전기에 CALL을 보내고 CALLRESULT payload를 반환합니다.
+    미연결 시 ChargerDisconnected, 시간 초과 시 asyncio.TimeoutError, CALLERROR 시 CallError가 발생합니다.
+    아직 전송되지 않은 같은 대상의 CALL(예: 같은 커넥터의 SetChargingProfile)은 새 CALL로 교체되고
+    이전 호출자는 CallError("Superseded")를 받습니다.
+    """
+    websocket = connected_clients.get(charger_id)
+    if websocket is None:
+        raise ChargerDisconnected(charger_id)
+    queue = outbound_queues.get(charger_id)
+
+    async def send(message: str):
+        if queue is None:
+            await websocket.send_text(message)
+        else:
+            try:
+                superseded = queue.put(message, coalesce_key(action, payload), token=codec.loads(message)[1])
+            except QueueClosed:
+                raise ChargerDisconnected(charger_id)
+            if superseded is not None:
+                call_manager.reject(charger_id, superseded, "Superseded", "Replaced by a newer request before sending")
+        frame_log.frame(charger_id, 'send', CALL, None, action, message, DEBUG)
+    return await call_manager.call(charger_id, send, action, payload, timeout)
+
+@app.post("/send", status_code=202)
 async def send_to_client(request_body: SendMessage):
+    """
+    요청을 작업(job)으로 등록하고 작업 ID를 즉시 반환합니다.
+    결과는 GET /jobs/{job_id} (wait=초 지정 시 롱폴링), GET /jobs/{job_id}/events (SSE),
+    또는 callbackUrl 로 받을 수 있습니다.
+    """
+    print(f"[HTTP] /send 엔드포인트 호출 - charger_id: {request_body.chargerId}, messageId: {request_body.messageId}, payload: {request_body.data}")
+    if request_body.callbackUrl and not jobs.callback_allowed(request_body.callbackUrl):
+        raise HTTPException(status_code=422, detail="callbackUrl is not in the allowlist")
+    job = jobs.submit(
+        execute_send(request_body), request_body.messageId, request_body.chargerId,
+        request_body.data, request_body.callbackUrl
+    )
+    return {"jobId": job.id, "status": job.status}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0):
+    job = jobs.get(job_id)
+    if job is None:
+        remote = await fetch_remote_job(job_id, min(wait, MAX_JOB_WAIT))
+        if remote is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return remote
+    await jobs.wait(job, min(wait, MAX_JOB_WAIT))
+    return job.to_dict()
+
+# --- 🧩 worker 간 연결 등록/요청 전달 ---
+
+async def register_connection(charger_id: str, connected: bool):
+    """다중 worker 일 때 충전기를 가진 worker 를 Redis 에 기록/해제합니다. 실패해도 연결은 유지합니다."""
+    if WORKERS <= 1:
+        return
+    try:
+        if connected:
+            await registry.claim(charger_id)
+        else:
+            await registry.release(charger_id)
+    except Exception as e:
+        frame_log.event(charger_id, 'registry_error', WARNING, error=str(e))
+
+async def renew_connection_leases():
+    """liveness 가 살아 있다고 보는 충전기(online/stale)만 임대를 갱신합니다."""
+    while True:
+        await asyncio.sleep(CONN_LEASE_TTL / 3)
+        try:
+            await registry.renew(liveness.state)
+        except Exception as e:
+            print(f"[REGISTRY] lease renew error: {e}")
+
+async def forward_send(request_body: SendMessage) -> dict:
+    """충전기를 가진 다른 worker 에서 execute_send 를 실행하고 결과를 받습니다."""
+    charger_id = request_body.chargerId
+    try:
+        owner = await registry.owner(charger_id)
+    except Exception as e:
+        return {"error": "Connection registry unavailable", "details": str(e)}
+    if owner is None or owner == registry.worker_id:
+        return {"error": "Client not connected"}
+    timeout = (request_body.timeout or 30.0) + FORWARD_MARGIN
+    try:
+        return await registry.forward(owner, {"kind": "send", "body": request_body.dict()}, timeout, charger_id)
+    except WorkerUnavailable:
+        return {"error": "Client not connected"}
+    except asyncio.TimeoutError:
+        return {"error": "timeout"}
+
+async def fetch_remote_job(job_id: str, wait: float) -> Optional[dict]:
+    """다른 worker 가 만든 작업을 조회합니다. 없으면 None."""
+    owner = job_id.rpartition('.')[0]
+    if WORKERS <= 1 or not owner or owner == registry.worker_id:
+        return None
+    try:
+        return await registry.forward(owner, {"kind": "job", "jobId": job_id, "wait": wait}, wait + FORWARD_MARGIN)
+    except (WorkerUnavailable, asyncio.TimeoutError):
+        return None
+
+async def handle_worker_request(request: dict):
+    """다른 worker 가 전달한 요청을 이 worker 에서 처리합니다."""
+    kind = request.get("kind")
+    if kind == "send":
+        return await execute_send(SendMessage(**request["body"]), forwarded=True)
+    if kind == "schedules":
+        load_schedules(bool(request["enabled"]), request.get("schedules") or {})
+        return None
+    if kind == "limit":
+        await send_charging_limit(request["chargerId"], float(request["limit"]))
+        return {"status": "Accepted"}
+    if kind == "job":
+        job = jobs.get(request.get("jobId"))
+        if job is None:
+            return None
+        await jobs.wait(job, min(float(request.get("wait") or 0.0), MAX_JOB_WAIT))
+        return job.to_dict()
+    return {"error": f"Unsupported worker request: {kind}"}
+
+async def remote_job_events(job_id: str, job: dict):
+    """다른 worker 의 작업 상태를 롱폴링으로 받아 SSE 로 내보냅니다."""
+    yield f"event: status\ndata: {codec.dumps(job)}\n\n"
+    while job.get('status') not in FINISHED_STATUSES:
+        job = await fetch_remote_job(job_id, MAX_JOB_WAIT)
+        if job is None:
+            return
+        if job.get('status') in FINISHED_STATUSES:
+            yield f"event: status\ndata: {codec.dumps(job)}\n\n"
+        else:
+            yield ": keepalive\n\n"
+
+def pm_meter_limits() -> Dict[str, float]:
+    """{계측기 serial: maxcurrent}. maxcurrent 가 숫자가 아닌 계측기는 제외합니다."""
+    limits = {}
+    for serial, maxcurrent in data_manager.snapshot().get('pm_devices', {}).items():
+        try:
+            limits[serial] = float(maxcurrent)
+        except (TypeError, ValueError):
+            continue
+    return limits
+
+async def send_charging_limit(charger_id: str, limit: float):
+    response = await send_call(charger_id, "SetChargingProfile", charge_point_max_profile(limit), timeout=5.0)
+    if response.get("status") != "Accepted":
+        raise RuntimeError(f"SetChargingProfile {response.get('status')}")
+    await push.publish_shared(f"charger:{charger_id}", {"event": "chargingLimit", "limit": limit})
+
+# WORKERS > 1 이면 leader worker 하나만 부하 관리를 실행합니다. worker 마다 같은 계측기의 여유 전류를
+# 자기 충전기에만 나누면 합계가 계약 전류의 N배가 될 수 있으므로, leader 가 전체 충전기에 한도를 나눠 줍니다.
+cluster_chargers: Dict[str, str] = {}  # leader 가 본 전체 연결 (충전기 → worker ID)
+
+def load_chargers() -> List[str]:
+    return list(cluster_chargers) if WORKERS > 1 else list(connected_clients)
+
+async def send_load_limit(charger_id: str, limit: float):
+    """충전기가 다른 worker 에 연결되어 있으면 그 worker 에서 SetChargingProfile 을 보냅니다."""
+    if WORKERS <= 1 or charger_id in connected_clients:
+        return await send_charging_limit(charger_id, limit)
+    owner = cluster_chargers.get(charger_id) or await registry.owner(charger_id)
+    if owner is None:
+        raise ChargerDisconnected(charger_id)
+    result = await registry.forward(owner, {"kind": "limit", "chargerId": charger_id, "limit": limit},
+                                    5.0 + FORWARD_MARGIN, charger_id)
+    if isinstance(result, dict) and result.get("error"):
+        raise RuntimeError(result["error"])
+
+load_manager = LoadManager(
+    send_load_limit, pm_meter_limits, load_chargers,
+    min_current=LOAD_MIN_CURRENT, max_current=LOAD_MAX_CURRENT,
+    margin=LOAD_MARGIN, hysteresis=LOAD_HYSTERESIS,
+)
+
+async def lead_load_management():
+    """leader 임대를 유지하는 동안만 부하 관리를 실행하고, 전체 충전기 목록을 주기적으로 갱신합니다."""
+    while True:
+        try:
+            leading = await registry.lead('load', LOAD_LEADER_TTL)
+            if leading:
+                connected = await registry.connected()
+                for charger_id in set(cluster_chargers) - set(connected):
+                    load_manager.on_charger_disconnected(charger_id)
+                for charger_id in set(connected) - set(cluster_chargers):
+                    load_manager.on_charger_connected(charger_id)
+                cluster_chargers.clear()
+                cluster_chargers.update(connected)
+        except Exception as e:
+            print(f"[LOAD] leader election error: {e}")
+            leading = False
+        if leading and not load_manager.running:
+            print(f"[LOAD] worker {registry.worker_id} is now the load management leader")
+            load_manager.start(lambda: aioredis.Redis(decode_responses=True))
+        elif not leading and load_manager.running:
+            print(f"[LOAD] worker {registry.worker_id} is no longer the load management leader")
+            load_manager.stop()
+            cluster_chargers.clear()
+        await asyncio.sleep(LOAD_LEADER_TTL / 3)
+
+connected_changes: Dict[str, bool] = {}  # 아직 기록하지 않은 connected 변경
+
+def mark_connected(charger_id: str, state: Optional[str]):
+    connected_changes[charger_id] = state is not None
+
+def reap_charger(charger_id: str):
+    """Heartbeat 가 끊긴 충전기의 웹소켓을 닫습니다. 정리는 ws_endpoint 의 finally 에서 합니다."""
+    frame_log.event(charger_id, 'liveness_timeout', WARNING, after=LIVENESS_OFFLINE_AFTER)
+    websocket = connected_clients.get(charger_id)
+    if websocket is not None:
+        spawn(websocket.close(code=1001))
+
+liveness = LivenessTracker(LIVENESS_STALE_AFTER, LIVENESS_OFFLINE_AFTER, reap_charger, mark_connected)
+
+async def flush_connected():
+    while True:
+        await asyncio.sleep(CONNECTED_FLUSH_INTERVAL)
+        if not connected_changes:
+            continue
+        changes = dict(connected_changes)
+        connected_changes.clear()
+        try:
+            await data_manager.update_connected(changes)
+        except Exception as e:
+            print(f"[LIVENESS] connected 기록 실패: {e}")
+
+def schedule_profile(allowed: bool) -> dict:
+    """예약 시간대 안이면 최대 전류, 밖이면 0A 인 TxDefaultProfile."""
+    profile = charge_point_max_profile(LOAD_MAX_CURRENT if allowed else 0.0, SCHEDULE_PROFILE_ID)
+    profile["csChargingProfiles"]["chargingProfilePurpose"] = "TxDefaultProfile"
+    return profile
+
+async def send_schedule_state(charger_id: str, state: Optional[bool]):
+    """state None(예약 충전 꺼짐)이면 예약 프로파일을 지웁니다."""
+    try:
+        if state is None:
+            await send_call(charger_id, "ClearChargingProfile", {"id": SCHEDULE_PROFILE_ID}, timeout=10.0)
+        else:
+            await send_call(charger_id, "SetChargingProfile", schedule_profile(state), timeout=10.0)
+    except Exception as e:
+        frame_log.event(charger_id, 'schedule_profile_failed', WARNING, error=repr(e))
+
+async def apply_schedule(state: Optional[bool]):
+    await asyncio.gather(*(send_schedule_state(cid, state) for cid in list(connected_clients)))
+    push.publish("schedule", {"active": state})
+
+def load_schedules(enabled: bool, schedules: dict):
+    scheduler.load(windows_from_config(schedules) if enabled else [])
+
+scheduler = ScheduleEngine(apply_schedule)
+
+@app.on_event("startup")
+async def start_push_gateway():
+    await data_manager.start()
+    await push.start()
+    if LOAD_MANAGEMENT and WORKERS > 1:
+        spawn(lead_load_management())
+    elif LOAD_MANAGEMENT:
+        load_manager.start(lambda: aioredis.Redis(decode_responses=True))
+    data = data_manager.snapshot()
+    load_schedules(bool(data.get('scheduled_charging')), data.get('schedules', {}))
+    scheduler.start()
+    liveness.start()
+    if WORKERS > 1:
+        registry.serve(handle_worker_request)
+        spawn(renew_connection_leases())
+    spawn(flush_connected())
+    # 이전 실행에서 connected 로 남은 충전기를 모두 끊긴 상태로 기록합니다.
+    connected_changes.update({cid: False for cid, info in data.get('registered_chargers', {}).items()
+                              if info.get('connected') and cid not in connected_clients})
+
+@app.on_event("shutdown")
+async def stop_push_gateway():
+    await push.stop()
+    load_manager.stop()
+    scheduler.stop()
+    liveness.stop()
+    registry.stop()
+    if connected_changes:
+        await data_manager.update_connected(dict(connected_changes))
+    await data_manager.close()
+
+@app.get("/outbound/stats")
+async def outbound_stats():
+    """송신 큐 깊이. deepest 는 대기 메시지가 가장 많은 충전기 10개입니다."""
+    queues = list(outbound_queues.items())
+    return {
+        'connections': len(queues),
+        'depth': sum(len(q) for _, q in queues),
+        'bytes': sum(q.bytes for _, q in queues),
+        'coalesced': sum(q.coalesced for _, q in queues),
+        'overflows': outbound_overflows,
+        'deepest': [{'chargerId': cid, **q.stats()} for cid, q in heapq.nlargest(10, queues, key=lambda item: len(item[1])) if len(q)],
+    }
+
+@app.get("/ratelimit/stats")
+async def rate_limit_stats():
+    """처리하지 않은 프레임 수 (사유:action 별)와 최근 위반이 많은 충전기 10개."""
+    offenders = heapq.nlargest(10, inbound_limiters.items(), key=lambda item: item[1].stats()['recentViolations'])
+    return {
+        'throttled': {f"{reason}:{action or '-'}": count for (reason, action), count in inbound_throttled.items()},
+        'closed': rate_limit_closed,
+        'offenders': [{'chargerId': cid, **limiter.stats()} for cid, limiter in offenders if limiter.stats()['recentViolations']],
+    }
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """BootNotification 수락/보류 현황과 핸드셰이크에서 거부한 미등록 충전기 수."""
+    return {**boot_admission.stats(), 'handshakeRejected': handshake_rejected}
+
+@app.get("/registry/stats")
+async def registry_stats():
+    return registry.stats()
+
+@app.get("/liveness/stats")
+async def liveness_stats():
+    stats = liveness.stats()
+    registered = len(data_manager.snapshot().get('registered_chargers', {}))
+    stats['offline'] = max(0, registered - stats['online'] - stats['stale'])
+    return stats
+
+@app.get("/schedule/stats")
+async def schedule_stats():
+    return scheduler.stats()
+
+@app.get("/load/stats")
+async def load_stats():
+    """WORKERS > 1 이면 leader worker 에서만 한도가 보입니다 (leader: 이 worker 가 제어 중인지)."""
+    return {**load_manager.stats(), 'leader': load_manager.running}
+
+@app.get("/push/sse")
+async def push_sse(request: Request, topics: str):
+    """
+    대시보드 SSE. topics는 쉼표로 구분합니다 (예: meter:PM10200787,charger:*).
+    재연결 시 브라우저가 보내는 Last-Event-ID 이후 이벤트를 다시 보내줍니다.
+    """
+    topic_list = [t for t in topics.split(",") if t]
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("lastEventId")
+    return StreamingResponse(
+        push.sse(topic_list, last_event_id), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/push/ws")
+async def push_ws(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        await push.websocket(websocket)
+    except Exception:
+        pass
+
+@app.get("/push/stats")
+async def push_stats():
+    return push.stats()
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        remote = await fetch_remote_job(job_id, 0.0)
+        if remote is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return StreamingResponse(remote_job_events(job_id, remote), media_type="text/event-stream")
+    return StreamingResponse(jobs.events(job), media_type="text/event-stream")
+
+async def execute_send(request_body: SendMessage, forwarded: bool = False) -> Optional[dict]:
+    """
+    /send 작업 본체. 반환한 dict에 "error" 키가 있으면 작업은 failed로 기록됩니다.
+    다중 worker 에서 충전기가 이 worker 에 없으면 가진 worker 로 전달합니다 (전달받은 요청은 다시 전달하지 않음).
+    """
     message_id = request_body.messageId
     payload = request_body.data
     charger_id = request_body.chargerId
-    print(f"[HTTP] /send 엔드포인트 호출 - charger_id: {charger_id}, messageId: {message_id}, payload: {payload}")
 
-    timeout_seconds = 30.0
+    if (WORKERS > 1 and not forwarded and charger_id not in connected_clients
+            and (message_id == "uvCardRegister" or message_id in OUTBOUND_ACTIONS)):
+        return await forward_send(request_body)
+
+    timeout_seconds = request_body.timeout or 30.0
 
     if message_id == "uvCardRegister":
         if charger_id not in connected_clients:
             return {"error": "Client not connected"}
         # 응답을 기다릴 Future 생성
-        if charger_id not in pending_responses:
-            loop = asyncio.get_running_loop()
-            future = loop.create_future()
-            pending_responses[charger_id] = future
-            print(f"[HTTP] 충전기 '{charger_id}'의 다음 Authorize idTag를 {timeout_seconds}초 동안 대기합니다.")
+        if charger_id in pending_responses:
+            return {"error": "Card registration already in progress"}
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending_responses[charger_id] = future
+        print(f"[HTTP] 충전기 '{charger_id}'의 다음 Authorize idTag를 {timeout_seconds}초 동안 대기합니다.")
 
         try:
             # 클라이언트의 응답을 대기
             response = await asyncio.wait_for(future, timeout=timeout_seconds)
             cardnumber = response.get('idTag')
         except asyncio.TimeoutError:
-            response = "timeout"
-            cardnumber = None
+            print(f"info: 충전기 '{charger_id}'에서 {timeout_seconds}초 동안 카드 태그가 없었습니다.")
+            return {"error": "timeout"}
         finally:
             pending_responses.pop(charger_id, None)
         print(f"info: send_to_client 함수가 응답을 받았습니다. charger_id: {charger_id}, idTag: {response} ")
         return {'cardnumber': cardnumber}
     elif message_id == "scheduledCharging":
         print(f"[HTTP] scheduledCharging 메시지 처리 중 - charger_id: {charger_id} payload: {payload}")
+        if "enabled" in payload:
+            # 설정 파일 기록이 늦을 수 있으므로 요청에 담긴 상태로 전환 시각을 다시 계산합니다.
+            load_schedules(bool(payload["enabled"]), payload.get("schedules") or {})
+            if WORKERS > 1 and not forwarded:
+                # 다른 worker 들도 자기 충전기에 같은 시간대를 적용하도록 알립니다.
+                try:
+                    await registry.broadcast({"kind": "schedules", "enabled": bool(payload["enabled"]),
+                                              "schedules": payload.get("schedules") or {}})
+                except Exception as e:
+                    print(f"[SCHEDULE] 다른 worker 에 예약 변경 알림 실패: {e}")
+        return {"response": scheduler.stats()}
     elif message_id == "energyUsage":
         energy_usage_data = payload
         print(f"[HTTP] Energy usage 메시지 처리 중 - charger_id: {charger_id} payload: {energy_usage_data}")
+    elif message_id in OUTBOUND_ACTIONS:
+        # 일반 OCPP 요청: unique id 별로 응답을 기다리므로 여러 충전기/요청을 동시에 처리할 수 있습니다.
+        try:
+            response = await send_call(charger_id, message_id, payload, request_body.timeout)
+        except ChargerDisconnected:
+            return {"error": "Client not connected"}
+        except asyncio.TimeoutError:
+            return {"error": "timeout"}
+        except CallError as e:
+            return {"error": "CallError", "errorCode": e.error_code, "description": e.description, "details": e.details}
+        return {"response": response}
+    else:
+        return {"error": f"Unsupported messageId: {message_id}"}
+
+# --- 📨 OCPP 메시지 처리 ---
 
-async def handle_boot_notification(charger_id: str, unique_id: str, payload: dict, SHARED_DATA: dict, hb_interval: int) -> str:
+# OCPP 1.6 Message Type IDs
+CALL = 2
+CALL_RESULT = 3
+CALL_ERROR = 4
+
+# action → (핸들러, payload 검증 함수). 검증 함수는 모듈 로드 시 한 번만 컴파일됩니다.
+OCPP_ACTION_HANDLERS: Dict[str, Tuple[Callable[[str, str, dict], Awaitable[str]], Optional[Validator]]] = {}
+async def next_transaction_id() -> int:
+    """
+    저장소의 카운터로 transactionId 를 발급합니다. JSON 저장소는 파일 잠금, SQLite 는 UPSERT 로 증가시키므로
+    여러 worker 프로세스가 함께 써도 겹치지 않고, Redis 재시작이나 WORKERS 변경 후에도 이어집니다.
+    """
+    return await data_manager.next_transaction_id()
+
+def ocpp_action(action: str):
+    """충전기 → CSMS 요청(action)의 핸들러를 등록하는 데코레이터."""
+    validator = compile_request_validator(action)
+    def decorator(handler):
+        OCPP_ACTION_HANDLERS[action] = (handler, validator)
+        return handler
+    return decorator
+
+def call_result(unique_id: str, payload: dict) -> str:
+    return codec.dumps([CALL_RESULT, unique_id, payload])
+
+def call_error(unique_id: str, error_code: str, description: str, details: Optional[dict] = None) -> str:
+    return codec.dumps([CALL_ERROR, unique_id, error_code, description, details or {}])
+
+async def id_tag_info(id_tag: Optional[str]) -> dict:
+    """등록된 ID Tag이면 상태/만료일을, 아니면 Invalid를 담은 idTagInfo를 반환합니다."""
+    # 디스크를 읽지 않도록 메모리 스냅샷에서 조회합니다.
+    registered_tag = await data_manager.get_idtag_info(id_tag) if id_tag else None
+    if registered_tag is not None:
+        return {
+            'status': registered_tag['status'],
+            'expiryDate': registered_tag['expiryDate']
+        }
+    return {
+        'status': 'Invalid',
+        'expiryDate': None
+    }
+
+@ocpp_action("BootNotification")
+async def handle_boot_notification(charger_id: str, unique_id: str, payload: dict) -> str:
     # 1. 관리 시스템(Flask)에 등록된 충전기인지 확인
-    if charger_id not in SHARED_DATA['registered_chargers']:
+    charger_info = await data_manager.get_charger_info(charger_id)
+    if charger_info is None:
         print(f"[{charger_id}] BootNotification Rejected: 관리 시스템에 미등록된 ID")
-        error_response = [4, unique_id, "SecurityError", "Charger ID not registered", {}]
-        return json.dumps(error_response)
+        return call_error(unique_id, "SecurityError", "Charger ID not registered")
         
     # 2. 서버 로직 처리 및 응답 생성
     vendor = payload.get('chargePointVendor')
     model = payload.get('chargePointModel')
 
-    if SHARED_DATA['registered_chargers'][charger_id]['chargePointVendor'] != vendor or SHARED_DATA['registered_chargers'][charger_id]['chargePointModel'] != model:
+    if charger_info['chargePointVendor'] != vendor or charger_info['chargePointModel'] != model:
         print(f"[{charger_id}] BootNotification Rejected: Charger details are not identical")
-        error_response = [4, unique_id, "SecurityError", "Charger details are not identical", {}]
-        return json.dumps(error_response)
-    
+        return call_error(unique_id, "SecurityError", "Charger details are not identical")
+
+    # 3. 재연결 폭주 시 한 번에 수락하는 수를 제한하고, 나머지는 흩어진 interval 뒤에 다시 보내게 합니다.
+    retry_after = boot_admission.admit(charger_id)
+    if retry_after is not None:
+        frame_log.event(charger_id, 'boot_pending', DEBUG, interval=math.ceil(retry_after))
+        return call_result(unique_id, {
+            "status": "Pending",
+            "currentTime": datetime.now(timezone.utc).isoformat() + "Z",
+            "interval": math.ceil(retry_after)
+        })
+
     response_payload = {
         "status": "Accepted",
         "currentTime": datetime.now(timezone.utc).isoformat() + "Z",
-        "interval": hb_interval
+        # Heartbeat 도 같은 시각에 몰리지 않도록 HB_INTERVAL 이하로 흩어 둡니다.
+        "interval": random.randint(int(HB_INTERVAL * 0.9), HB_INTERVAL)
     }
-    return json.dumps([3, unique_id, response_payload])
+    if scheduler.state is not None:
+        # 응답이 송신 큐에 먼저 들어간 뒤 실행되므로 Accepted 다음에 예약 프로파일을 보냅니다.
+        spawn(send_schedule_state(charger_id, scheduler.state))
+    return call_result(unique_id, response_payload)
 
-async def handle_authorize(charger_id: str, unique_id: str, payload: dict, SHARED_DATA: dict) -> str:
+@ocpp_action("Authorize")
+async def handle_authorize(charger_id: str, unique_id: str, payload: dict) -> str:
     """
     Authorize 요청을 처리하고 응답을 생성합니다.
     관리 시스템(SHARED_DATA)에 등록된 ID Tag인지 확인합니다.
@@ -176,84 +798,115 @@ async def handle_authorize(charger_id: str, unique_id: str, payload: dict, SHARE
     if charger_id in pending_responses:
         await set_future_result(charger_id, payload)
 
-    id_tag = payload.get('idTag')
-    SHARED_DATA = data_manager.load_data()
-    
-    if id_tag in SHARED_DATA['registered_id_tags']:
-        tag_info = {
-            'status': SHARED_DATA['registered_id_tags'][id_tag]['status'],
-            'expiryDate': SHARED_DATA['registered_id_tags'][id_tag]['expiryDate']
-        }   
-    else:
-        tag_info = {
-            'status': 'Invalid',
-            'expiryDate': None
-        }
-
     response_payload = {
-        "idTagInfo": tag_info
+        "idTagInfo": await id_tag_info(payload.get('idTag'))
     }
-    return json.dumps([3, unique_id, response_payload])
-
-async def route_ocpp_message(charger_id: str, message: str, websocket, shared_data: dict, hb_interval: int):
+    return call_result(unique_id, response_payload)
+
+@ocpp_action("Heartbeat")
+async def handle_heartbeat(charger_id: str, unique_id: str, payload: dict) -> str:
+    return call_result(unique_id, {"currentTime": datetime.now(timezone.utc).isoformat() + "Z"})
+
+@ocpp_action("DataTransfer")
+async def handle_data_transfer(charger_id: str, unique_id: str, payload: dict) -> str:
+    # 충전기가 서버로 보낸 DataTransfer 요청은 단순히 'Accepted'로 응답합니다.
+    return call_result(unique_id, {"status": "Accepted"})
+
+@ocpp_action("StatusNotification")
+async def handle_status_notification(charger_id: str, unique_id: str, payload: dict) -> str:
+    await push.publish_shared(f"charger:{charger_id}", {
+        "event": "status",
+        "connectorId": payload.get("connectorId"),
+        "status": payload.get("status"),
+        "errorCode": payload.get("errorCode"),
+        "timestamp": payload.get("timestamp"),
+    })
+    return call_result(unique_id, {})
+
+@ocpp_action("StartTransaction")
+async def handle_start_transaction(charger_id: str, unique_id: str, payload: dict) -> str:
+    response_payload = {
+        "transactionId": await next_transaction_id(),
+        "idTagInfo": await id_tag_info(payload.get('idTag'))
+    }
+    return call_result(unique_id, response_payload)
+
+@ocpp_action("StopTransaction")
+async def handle_stop_transaction(charger_id: str, unique_id: str, payload: dict) -> str:
+    response_payload = {}
+    if 'idTag' in payload:
+        response_payload["idTagInfo"] = await id_tag_info(payload['idTag'])
+    return call_result(unique_id, response_payload)
+
+@ocpp_action("MeterValues")
+async def handle_meter_values(charger_id: str, unique_id: str, payload: dict) -> str:
+    return call_result(unique_id, {})
+
+async def handle_call(charger_id: str, unique_id: str, action: str, payload) -> str:
+    """등록된 핸들러로 CALL을 처리합니다. payload가 스키마에 맞지 않으면 CALLERROR를 반환합니다."""
+    entry = OCPP_ACTION_HANDLERS.get(action)
+    if entry is None:
+        # 지원하지 않는 Action
+        return call_error(unique_id, "NotImplemented", "Action not supported")
+    handler, validator = entry
+    if validator is not None:
+        error = validator(payload)
+        if error:
+            error_code, description = error
+            frame_log.event(charger_id, 'validation_failed', WARNING, action=action,
+                            uniqueId=unique_id, errorCode=error_code, description=description)
+            return call_error(unique_id, error_code, description)
+    return await handler(charger_id, unique_id, payload)
+
+async def route_ocpp_message(charger_id: str, message: str, websocket):
     """수신된 OCPP 메시지를 라우팅하고 처리합니다."""
+    liveness.seen(charger_id)
     try:
-        data = json.loads(message)
-        if data[0] == 2 and len(data) == 4:
-            print(f"[{charger_id}] [recv] Request for {data[2]} (ID: {data[1]}): {data[3]}")
-        elif data[0] == 3 and len(data) == 3:
-            print(f"[{charger_id}] [recv] Response for (ID: {data[1]}): {data[2]}")
-        else:
-            print(f"[{charger_id}] [recv] Unknown message format: {data}")
+        data = codec.loads(message)
+        if not isinstance(data, list) or len(data) < 3 or not isinstance(data[1], str):
+            frame_log.event(charger_id, 'unknown_message', WARNING, raw=message)
+            return
+        message_type_id = data[0]
+        unique_id = data[1]
 
         # Call 메시지 형식 확인: [2, <UniqueID>, "<Action>", {<Payload>}]
-        if data[0] == 2 and len(data) == 4:
-            unique_id = data[1]
-            action = data[2]
-            payload = data[3]
-            
-            response_message = None
-            
-            # Action에 따른 처리 로직 분기
-            if action == "BootNotification":
-                # SHARED_DATA와 HB_INTERVAL 인자를 전달
-                response_message = await handle_boot_notification(charger_id, unique_id, payload, shared_data, hb_interval)
-            elif action == "Authorize":
-                # SHARED_DATA 인자를 전달
-                response_message = await handle_authorize(charger_id, unique_id, payload, shared_data)
-            elif action == "Heartbeat":
-                # Heartbeat 처리 로직 datetime.now(timezone.utc).isoformat() + "Z"
-                response_message = json.dumps([3, unique_id, {"currentTime": datetime.now(timezone.utc).isoformat() + "Z"}])
-            elif action == "DataTransfer":
-                # 여기서는 충전기가 서버로 보낸 DataTransfer 요청에 대한 응답을 처리합니다.
-                # 예시: 서버는 단순히 'Accepted'를 응답
-                response_payload = {"status": "Accepted"}
-                response_message = json.dumps([3, unique_id, response_payload])
-            elif action == "StatusNotification":
-                # 여기서는 충전기가 서버로 보낸 DataTransfer 요청에 대한 응답을 처리합니다.
-                # 예시: 서버는 단순히 'Accepted'를 응답
-                response_payload = {}
-                response_message = json.dumps([3, unique_id, response_payload])
+        if message_type_id == CALL:
+            if len(data) != 4 or not isinstance(data[2], str):
+                frame_log.event(charger_id, 'malformed_call', WARNING, raw=message)
+                response_message = call_error(unique_id, "FormationViolation", "CALL must be [2, uniqueId, action, payload]")
+                action = None
             else:
-                # 지원하지 않는 Action
-                error_response = [4, unique_id, "NotImplemented", "Action not supported", {}]
-                response_message = json.dumps(error_response)
-            if response_message:
-                try:
-                    await websocket.send_text(response_message)
-                    print(f"[{charger_id}] [send] Response for {action} (ID: {unique_id}): {response_message}")
-                except Exception as e:
-                    print(f"[{charger_id}] [error] 응답 전송 실패: {e}")
+                action = data[2]
+                frame_log.frame(charger_id, 'recv', CALL, unique_id, action, data[3])
+                limiter = inbound_limiters.get(charger_id)
+                throttled = limiter.allow(action) if limiter is not None else None
+                if throttled:
+                    frame_log.event(charger_id, 'throttled', DEBUG, action=action, uniqueId=unique_id, reason=throttled)
+                    response_message = call_error(unique_id, "GenericError", "Rate limit exceeded", {"reason": throttled})
+                else:
+                    response_message = await handle_call(charger_id, unique_id, action, data[3])
+            try:
+                await send_frame(charger_id, websocket, response_message)
+                frame_log.frame(charger_id, 'send', CALL_RESULT, unique_id, action, response_message, DEBUG)
+            except Exception as e:
+                frame_log.event(charger_id, 'send_failed', ERROR, action=action, uniqueId=unique_id, error=str(e))
         # CallResult 메시지 형식 확인: [3, <UniqueID>, {<Payload>}]
-        elif data[0] == 3 and len(data) == 3:
+        elif message_type_id == CALL_RESULT:
             # 서버가 충전기에 보낸 요청(예: DataTransfer)에 대한 응답 처리
-            unique_id = data[1]
-            response_payload = data[2]
-
-            # await set_future_result(unique_id, response_payload)
+            action = call_manager.resolve(charger_id, unique_id, data[2])
+            frame_log.frame(charger_id, 'recv', CALL_RESULT, unique_id, action, data[2])
+            if action is None:
+                frame_log.event(charger_id, 'unexpected_call_result', WARNING, uniqueId=unique_id)
+        # CallError 메시지 형식 확인: [4, <UniqueID>, "<ErrorCode>", "<ErrorDescription>", {<ErrorDetails>}]
+        elif message_type_id == CALL_ERROR and len(data) == 5:
+            action = call_manager.reject(charger_id, unique_id, data[2], data[3], data[4])
+            frame_log.event(charger_id, 'call_error', WARNING, action=action, uniqueId=unique_id,
+                            errorCode=data[2], description=data[3], details=data[4])
+        else:
+            frame_log.event(charger_id, 'unknown_message', WARNING, raw=message)
 
     except Exception as e:
-        print(f"[{charger_id}] [error] 메시지 처리 중 오류 발생 in route_ocpp_message(): {e}")
+        frame_log.event(charger_id, 'route_error', ERROR, error=str(e))
 
 async def set_future_result(unique_id: str, response_data: dict):
     future = pending_responses.pop(unique_id, None)
@@ -274,10 +927,13 @@ async def set_future_result(unique_id: str, response_data: dict):
 def start_ocpp_server(app):
     # SSL Context를 직접 정의할 필요는 없습니다. Uvicorn에 파일 경로만 전달하면 됩니다.
     # 만약 OCPP 서버가 WSS 포트(예: 443)에서 실행되어야 한다면 포트를 변경합니다.
+    # WORKERS > 1 이면 uvicorn 이 같은 소켓을 나눠 받는 worker 프로세스를 띄웁니다 (앱은 import 문자열로 전달).
     uvicorn.run(
-        app, 
+        "ocpp_message:app" if WORKERS > 1 else app, 
         host="0.0.0.0", 
         port=443, 
+        workers=WORKERS,
+        ws_max_size=WS_MAX_SIZE,  # 기본값 16MB 대신 max_frame 기준으로 제한
         ssl_keyfile=KEY_FILE,    # 💡 키 파일 경로
         ssl_certfile=CERT_FILE  # 💡 인증서 파일 경로
     )
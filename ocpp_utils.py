@@ -1,7 +1,6 @@
-import websocket
-import json
 import subprocess
 from ocpp16.shared_data import OCPP_HOST, OCPP_PORT
+from ocpp16.csms_client import CsmsWebSocket
 
 def connect_wifi(serialnumber):
     ssid = "gre-"+ serialnumber  # Replace with your WiFi SSID
@@ -20,18 +19,13 @@ def connect_wifi(serialnumber):
 # 예시 사용
 # connect_wifi("MyWiFiSSID", "MySecretPassword")
 
+# 요청마다 새로 연결하지 않도록 연결 하나를 재사용합니다.
+ocpp_ws = CsmsWebSocket("ws://127.0.0.1:8003")  # local host and service port
+
 def get_res_from_ocpp_server(message):
     try:
-        ws = websocket.create_connection("ws://127.0.0.1:8003")  # local host and service port
-        request_payload = json.dumps(message)
-        ws.send(request_payload)
-
-        response = ws.recv()
-        data = json.loads(response)
-        ws.close()
-
-        # return data.get(data)
-        return data
+        command = message[2] if isinstance(message, list) and len(message) > 2 else 'ws'
+        return ocpp_ws.request(message, command)
     except Exception as e:
         print("🔧 WebSocket Error:", e)
         return None
\ No newline at end of file
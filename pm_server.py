@@ -1,10 +1,13 @@
 import socket
 import json
 import time
-import redis
 import threading
 import asyncio
-from ocpp16.data_manager import JsonConfigManager
+import redis.asyncio as aioredis
+from ocpp16.data_manager import open_config_manager
+from ocpp16.meter_stream import StreamBatchWriter
+from ocpp16.timeseries import TimeSeriesStore, TS_DIR
+from ocpp16.meter_protocol import MeterStreamDecoder, FrameBufferOverflow, negotiate_format
 
 # 설정값
 UDP_PORT = 4210
@@ -12,14 +15,23 @@ TCP_PORT = 5000
 JSON_FILE = 'ocpp16/shared_data.json'
 SERVER_URL = "https://127.0.0.1:443/send"   # FastAPI 서버 주소
 CERT_FILE = 'certificate/cert.pem' 
+MAX_METERS = 500      # 동시에 연결할 수 있는 계측기 수
+IDLE_TIMEOUT = 30     # 이 시간(초) 동안 데이터가 없으면 연결 종료
+READ_SIZE = 4096      # 한 번에 읽는 최대 바이트
+MAX_BUFFER = 64 * 1024  # 연결별 미처리 데이터 최대 크기 (바이트)
+STATS_INTERVAL = 60   # 수신 통계 출력 주기 (초)
+VERBOSE = False       # True 이면 수신한 측정값을 모두 출력
 
-r = redis.Redis(decode_responses=True)
-channel = 'energy_updates'
+STREAM_MAXLEN = 100_000  # 계측기별 Redis Stream 보관 건수
+TS_FLUSH_INTERVAL = 5    # 시계열 세그먼트를 디스크에 반영하는 주기 (초)
+TS_RETENTION_INTERVAL = 3600  # 보관 기간이 지난 세그먼트 정리 주기 (초)
 
-data_manager = JsonConfigManager(JSON_FILE)
+data_manager = open_config_manager(JSON_FILE, cached=True)
 data = data_manager.load_data()
 REGISTERED_METERS = list(data.get('pm_devices', {}).keys())
 
+ts_store = TimeSeriesStore(TS_DIR)
+
 # UDP 브로드캐스트 수신 및 응답
 def udp_listener():
     udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -37,53 +49,171 @@ def udp_listener():
                 print(f"[UDP] Registered meter: {serial} from {addr[0]}")
 #                 local_ip = socket.gethostbyname(socket.gethostname())
                 local_ip = get_local_ip()
+                # 계측기가 지원하는 형식(formats) 중 하나를 골라 알려줍니다. 없으면 JSON.
+                frame_format = negotiate_format(msg.get("formats"))
                 response = json.dumps({
                     "tcp_host": local_ip,
-                    "tcp_port": TCP_PORT
+                    "tcp_port": TCP_PORT,
+                    "format": frame_format
                 })
                 udp_sock.sendto(response.encode(), addr)
-                print(f"[UDP] Sent TCP info to {addr[0]} → {local_ip}:{TCP_PORT}")
+                print(f"[UDP] Sent TCP info to {addr[0]} → {local_ip}:{TCP_PORT} ({frame_format})")
             else:
                 print(f"[UDP] Unregistered meter: {serial} from {addr[0]}")
         except Exception as e:
             print("[UDP] Invalid message:", e)
 
-# TCP 서버: 계측기와 연결 후 데이터 수신
-def tcp_server():
-    tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    tcp_sock.bind(('', TCP_PORT))
-    tcp_sock.listen(5)
-    print(f"[TCP] Server listening on port {TCP_PORT}...")
+# TCP 서버: 여러 계측기를 동시에 연결하고 데이터 수신
+class IngestStats:
+    """수신 처리량/지연 카운터. 이벤트 루프 안에서만 갱신합니다."""
+    def __init__(self):
+        self.active = 0
+        self.connections = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.overflows = 0
+        self.readings = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._last_readings = 0
+        self._last_time = time.monotonic()
 
-    while True:
-        conn, addr = tcp_sock.accept()
-        print(f"[TCP] Connected by {addr}")
+    def record_reading(self, latency: float) -> None:
+        self.readings += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def report(self) -> str:
+        now = time.monotonic()
+        rate = (self.readings - self._last_readings) / max(now - self._last_time, 1e-9)
+        avg_ms = self.latency_total / self.readings * 1000 if self.readings else 0.0
+        line = (f"[TCP] meters {self.active} (total {self.connections}, rejected {self.rejected}), "
+                f"readings {self.readings} ({rate:.1f}/s), errors {self.errors}, bytes {self.bytes}, "
+                f"timeouts {self.timeouts}, overflows {self.overflows}, "
+                f"latency avg {avg_ms:.2f}ms max {self.latency_max * 1000:.2f}ms")
+        self._last_readings, self._last_time, self.latency_max = self.readings, now, 0.0
+        return line
+
+stats = IngestStats()
+
+def publish_reading(stream_writer, msg):
+    serial = msg.get("serial")
+    voltage = msg.get("voltage")
+    current = msg.get("current")
+    power = msg.get("power")
+    energy = msg.get("energy")
+    frequency = msg.get("frequency")
+    pf = msg.get("pf")
+    timestamp = msg.get("timestamp")
+
+    if not serial or not isinstance(current, (int, float)):
+        raise ValueError(f"serial/current missing: {msg}")
+
+    # Redis 기록은 StreamBatchWriter가 모아서 파이프라인으로 보냅니다 (여기서는 대기하지 않음).
+    stream_writer.submit(msg)
+    ts_store.add(serial, msg)
+
+    if VERBOSE:
+        print(f"[TCP] {serial} → {voltage:.2f}V, {current:.3f}A, {power:.2f}W, {energy}kWh, {frequency:.1f}Hz, pf: {pf:.2f} at {timestamp}")
+
+async def handle_meter(reader, writer, stream_writer):
+    addr = writer.get_extra_info('peername')
+    if stats.active >= MAX_METERS:
+        stats.rejected += 1
+        print(f"[TCP] Too many meters, rejected {addr}")
+        writer.close()
+        return
+
+    stats.active += 1
+    stats.connections += 1
+    print(f"[TCP] Connected by {addr}")
+    decoder = MeterStreamDecoder(MAX_BUFFER)
+    try:
         while True:
             try:
-                data = conn.recv(1024)
-                if not data:
-                    break
-                msg = json.loads(data.decode())
-                serial = msg.get("serial")
-                voltage = msg.get("voltage")
-                current = msg.get("current")
-                power = msg.get("power")
-                energy = msg.get("energy")
-                frequency = msg.get("frequency")
-                pf = msg.get("pf")
-                timestamp = msg.get("timestamp")
-
-                data = f"{current:.3f}A"
-
-                r.publish(channel, data)
-                time.sleep(1)
-
-                print(f"[TCP] {serial} → {voltage:.2f}V, {current:.3f}A, {power:.2f}W, {energy}kWh, {frequency:.1f}Hz, pf: {pf:.2f} at {timestamp}")
-            except Exception as e:
-                print("[TCP] Invalid data:", e)
-        conn.close()
+                chunk = await asyncio.wait_for(reader.read(READ_SIZE), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                print(f"[TCP] Idle timeout ({IDLE_TIMEOUT}s) - {addr}")
+                break
+            if not chunk:
+                break
+            received_at = time.perf_counter()
+            stats.bytes += len(chunk)
+
+            # 여러 건이 붙어 오거나 한 건이 나뉘어 와도 완성된 측정값만 꺼내고 나머지는 보관합니다.
+            errors = decoder.errors
+            try:
+                readings = decoder.feed(chunk)
+            except FrameBufferOverflow as e:
+                # 완성되지 않는 데이터가 계속 쌓이면 연결을 끊어 메모리를 보호합니다.
+                stats.overflows += 1
+                print(f"[TCP] Buffer overflow ({e}) - {addr}")
+                break
+            if decoder.errors != errors:
+                stats.errors += decoder.errors - errors
+                print(f"[TCP] Invalid data: {decoder.errors - errors} frame(s) dropped - {addr}")
+
+            for msg in readings:
+                try:
+                    publish_reading(stream_writer, msg)
+                    stats.record_reading(time.perf_counter() - received_at)
+                except Exception as e:
+                    stats.errors += 1
+                    print("[TCP] Invalid data:", e)
+    except (ConnectionError, OSError) as e:
+        print(f"[TCP] Connection error {addr}: {e}")
+    finally:
+        stats.active -= 1
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
         print(f"[TCP] Disconnected from {addr}")
 
+async def report_stats(stream_writer):
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        print(stats.report())
+        print(stream_writer.report())
+
+async def maintain_timeseries():
+    last_retention = 0.0
+    while True:
+        await asyncio.sleep(TS_FLUSH_INTERVAL)
+        # 디스크 쓰기/삭제는 스레드에서 실행해 계측기 수신 루프를 막지 않습니다 (루프는 레코드를 큐에 넣기만 함).
+        await asyncio.to_thread(ts_store.flush)
+        if time.monotonic() - last_retention >= TS_RETENTION_INTERVAL:
+            last_retention = time.monotonic()
+            removed = await asyncio.to_thread(ts_store.enforce_retention)
+            if removed:
+                print(f"[TS] Removed {removed} expired segment(s)")
+
+async def tcp_server():
+    redis_conn = aioredis.Redis(decode_responses=True)
+    stream_writer = StreamBatchWriter(redis_conn, maxlen=STREAM_MAXLEN)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_meter(reader, writer, stream_writer),
+        '', TCP_PORT, limit=MAX_BUFFER, backlog=MAX_METERS
+    )
+    print(f"[TCP] Server listening on port {TCP_PORT}...")
+    reporter = asyncio.create_task(report_stats(stream_writer))
+    flusher = asyncio.create_task(stream_writer.run())
+    ts_maintainer = asyncio.create_task(maintain_timeseries())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reporter.cancel()
+        flusher.cancel()
+        ts_maintainer.cancel()
+        ts_store.close()
+        await stream_writer.close()
+        await redis_conn.close()
+
 def get_local_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
@@ -101,6 +231,5 @@ if __name__ == "__main__":
     try:
         threading.Thread(target=udp_listener, daemon=True).start()
         asyncio.run(tcp_server())
-        # tcp_server()
     except KeyboardInterrupt:
         print("Server stopped.")
@@ -0,0 +1,37 @@
+# test_load_manager.py
+"""LoadManager: 측정값 하나의 여유는 제어 주기가 여러 번 돌아도 한 번만 반영되는지 확인합니다."""
+from ocpp16.load_manager import LoadManager
+
+CHARGERS = ['CP1', 'CP2']
+
+
+async def _send_profile(charger_id, limit):
+    pass
+
+
+def make_manager(max_current=40.0):
+    return LoadManager(_send_profile, lambda: {'PM1': max_current}, lambda: CHARGERS)
+
+
+def test_repeated_ticks_without_new_reading_keep_limits():
+    manager = make_manager()
+    manager.on_reading('PM1', 20.0, received_at=100.0)
+    first = manager.compute_limits(CHARGERS, now=100.0)
+    total = manager.total_limit
+    # 측정값이 유효한 stale_after (10초) 동안 0.5초마다 제어 주기가 돌아도 한도는 그대로입니다.
+    for tick in range(1, 20):
+        assert manager.compute_limits(CHARGERS, now=100.0 + tick * 0.5) == first
+    assert manager.total_limit == total
+    assert sum(first.values()) <= 40.0
+
+
+def test_new_reading_is_applied_once():
+    manager = make_manager()
+    manager.on_reading('PM1', 20.0, received_at=100.0)
+    manager.compute_limits(CHARGERS, now=100.0)
+    before = manager.total_limit
+    # 과부하 측정값은 한 번만 빼므로 두 번째 주기에 0A 로 떨어지지 않습니다.
+    manager.on_reading('PM1', 45.0, received_at=101.0)
+    once = manager.compute_limits(CHARGERS, now=101.0)
+    assert manager.total_limit == before + (40.0 - manager.margin - 45.0)
+    assert manager.compute_limits(CHARGERS, now=101.5) == once
@@ -0,0 +1,91 @@
+# test_shared_data.py
+"""SharedDataManager: 디스크 기록이 느려도 이벤트 루프가 응답하는지 확인합니다."""
+import asyncio
+import os
+import shutil
+import time
+
+from ocpp16.data_manager import CHARGERS_KEY, JsonConfigManager
+from ocpp16.shared_data import SharedDataManager
+
+SHARED_DATA = os.path.join(os.path.dirname(__file__), '..', 'ocpp16', 'shared_data.json')
+WRITE_DELAY = 0.3    # 모의 디스크의 파일 기록 시간 (초)
+MAX_LOOP_LAG = 0.05  # 허용하는 최대 이벤트 루프 지연 (초)
+
+
+class SlowDiskManager(JsonConfigManager):
+    """파일 기록마다 WRITE_DELAY 초 걸리는 디스크를 흉내 냅니다."""
+    def _write_atomic(self, data):
+        time.sleep(WRITE_DELAY)
+        return super()._write_atomic(data)
+
+
+async def measure_loop_lag(work) -> float:
+    """work() 를 실행하는 동안 10ms 주기 타이머가 가장 늦게 깨어난 시간 (초)."""
+    worst = 0.0
+    stop = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        while not stop.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            worst = max(worst, time.perf_counter() - expected)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.05)
+    try:
+        await work()
+    finally:
+        stop.set()
+        await tick
+    return worst
+
+
+def open_slow_manager(tmp_path):
+    filename = str(tmp_path / 'shared_data.json')
+    shutil.copy(SHARED_DATA, filename)
+    store = SlowDiskManager(filename, cached=True)
+    return store, SharedDataManager(filename, refresh_interval=0, store=store)
+
+
+def test_loop_stays_responsive_during_slow_writes(tmp_path):
+    store, manager = open_slow_manager(tmp_path)
+
+    async def main():
+        await manager.start()
+        charger_id = next(iter(manager.snapshot()[CHARGERS_KEY]))
+        try:
+            started = time.perf_counter()
+            lag = await measure_loop_lag(lambda: asyncio.gather(
+                *(manager.update_connected({charger_id: i % 2 == 0}) for i in range(3))))
+            elapsed = time.perf_counter() - started
+            return lag, elapsed, await manager.get_charger_info(charger_id)
+        finally:
+            await manager.close()
+
+    lag, elapsed, info = asyncio.run(main())
+    # 세 번 모두 느린 디스크에 기록했고 (순서대로), 그동안 루프는 막히지 않았습니다.
+    assert manager.writes == 3
+    assert elapsed >= 3 * WRITE_DELAY * 0.9
+    assert lag < MAX_LOOP_LAG, f"event loop stalled for {lag * 1000:.1f} ms"
+    assert info['connected'] is True
+
+
+def test_inline_slow_writes_stall_the_loop(tmp_path):
+    # 대조군: 같은 기록을 루프에서 직접 하면 지연이 측정되어야 위 테스트가 의미가 있습니다.
+    store, manager = open_slow_manager(tmp_path)
+
+    async def main():
+        await manager.start()
+        charger_id = next(iter(manager.snapshot()[CHARGERS_KEY]))
+
+        async def inline_write():
+            store.update_connected({charger_id: True})
+
+        try:
+            return await measure_loop_lag(inline_write)
+        finally:
+            await manager.close()
+
+    assert asyncio.run(main()) >= WRITE_DELAY * 0.9